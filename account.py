@@ -0,0 +1,92 @@
+# account.py
+import time
+import threading
+from kis_api import parse_holdings
+from config import ACCOUNT_SNAPSHOT_TTL
+
+def parse_orderable_cash(balance):
+    """
+    [주문가능현금 파싱] 모의/실전 데이터 구조 차이 통합 처리
+    (output 또는 output2[0]의 ord_psbl_cash, 없으면 dnca_tot_amt)
+    """
+    try:
+        if 'output' in balance:
+            val = balance['output'].get('ord_psbl_cash') or balance['output'].get('dnca_tot_amt')
+        else:
+            val = balance['output2'][0].get('ord_psbl_cash') or balance['output2'][0].get('dnca_tot_amt')
+        return int(val or 0)
+    except Exception:
+        return 0
+
+class AccountSnapshot:
+    """
+    [계좌 스냅샷] 한 시점의 계좌 상태 (읽기 전용으로 사용)
+    - cash: 예수금
+    - orderable_cash: 주문가능현금
+    - total_eval: 총평가금액
+    - holdings: {종목코드: {qty, buy_price, current_price, name}}
+    - unfilled_count: 미체결 주문 건수
+    """
+    def __init__(self, cash, orderable_cash, total_eval, holdings, unfilled_count, order_seq):
+        self.cash = cash
+        self.orderable_cash = orderable_cash
+        self.total_eval = total_eval
+        self.holdings = holdings
+        self.unfilled_count = unfilled_count
+        self.order_seq = order_seq
+        self.fetched_at = time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+class AccountService:
+    """
+    [계좌 조회 서비스]
+    한 틱 안에서 잔고/보유종목/미체결을 여러 번 조회하지 않도록 스냅샷을 캐시합니다.
+    - ttl초가 지나면 다시 조회
+    - 우리가 주문/취소를 보내면(api.order_seq 변화) 자동으로 무효화
+    """
+    def __init__(self, api, ttl=ACCOUNT_SNAPSHOT_TTL):
+        self.api = api
+        self.ttl = ttl
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self, force=False):
+        with self.lock:
+            snap = self.snapshot
+            if force or snap is None or snap.age() > self.ttl or snap.order_seq != self.api.order_seq:
+                snap = self._fetch()
+                self.snapshot = snap
+            return snap
+
+    def invalidate(self):
+        with self.lock:
+            self.snapshot = None
+
+    def _fetch(self):
+        # 주문 번호를 먼저 읽어둬야 조회 도중 들어간 주문도 다음 get()에서 무효화됨
+        order_seq = self.api.order_seq
+
+        # 1. 잔고조회 (보유 종목 + 총평가) - 1회
+        holdings, cash, total_eval = {}, 0, 0
+        data = self.api.get_all_balance()
+        if data and data.get('rt_cd') == '0':
+            holdings = parse_holdings(data)
+            try:
+                summary = data['output2'][0]
+                cash = int(summary.get('dnca_tot_amt') or 0)
+                total_eval = int(summary.get('tot_evlu_amt') or 0)
+            except (KeyError, IndexError, ValueError):
+                pass
+
+        # 2. 주문가능현금 - 1회
+        balance = self.api.get_balance()
+        orderable_cash = parse_orderable_cash(balance) if balance else 0
+
+        # 3. 미체결 건수 - 로컬 장부 (확인 안 된 주문이 있거나 오래됐을 때만 서버와 동기화)
+        if self.api.order_book.needs_reconcile():
+            self.api.current_unfilled_orders()
+        unfilled_count = self.api.order_book.count()
+
+        return AccountSnapshot(cash, orderable_cash, total_eval, holdings, unfilled_count, order_seq)
@@ -0,0 +1,36 @@
+# async_kis_api.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import SCAN_CONCURRENCY
+
+class AsyncKISApi:
+    """
+    [비동기 KIS API 클라이언트]
+    KISApi와 메서드 이름/인자가 똑같지만, 모두 코루틴(await)으로 호출합니다.
+      예) df = await async_api.fetch_ohlcv("005930", count=60)
+
+    - 실제 HTTP 호출은 원본 KISApi(커넥션 풀 + 호출 한도)를 그대로 사용합니다.
+    - 전용 스레드 풀(max_concurrency개)에서 실행되므로 동시 요청 수가 제한됩니다.
+    - 호출 한도(rate_limiter)는 스레드 간에 공유되므로, 아무리 많이 gather해도
+      계좌 한도를 넘지 않고 '한도만큼' 빠르게 처리됩니다.
+    """
+    def __init__(self, api, max_concurrency=SCAN_CONCURRENCY):
+        self.api = api
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="kis-async")
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(attr, *args, **kwargs))
+
+        return wrapper
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,390 @@
+# backtest.py
+import io
+import glob
+import time
+import contextlib
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import notifier
+from config import SEQ_LEN, TOP_N, MAX_HOLDINGS, FEE_RATE, SELL_TAX_RATE, SLIPPAGE
+from features import PRICE_COLS, WARMUP_BARS, FeatureStore
+from collector import to_input_tensor
+from model import score_batch
+from account import AccountService
+from order_book import OrderBook
+from kis_api import parse_holdings
+from trader import decide_risk, check_mode, is_defense_hold, buy_candidates
+from corpus import RAW_GLOB, symbol_from_path
+
+# [설정]
+BACKTEST_BARS = 130          # 시뮬레이션할 봉 수 (3분봉 130개 = 09:00~15:30 하루)
+WARMUP = WARMUP_BARS + SEQ_LEN   # 장 시작 전에 피쳐 엔진에 미리 넣어둘 봉 수
+MAX_SYMBOLS = 100            # 시뮬레이션 종목 수 (data/raw 파일 순서)
+START_CASH = 10_000_000      # 시작 예수금
+TRADES_PATH = "backtest_trades.csv"
+VERBOSE = False              # True면 trader 함수들의 매매 로그를 그대로 출력
+TIME_COLS = ['stck_bsop_date', 'stck_cntg_hour']   # 분봉 CSV의 영업일자 / 체결시각 (KIS 분봉 응답 필드)
+MAX_MISSING_RATIO = 0.2      # 거래일 봉 중 빈 봉(거래 없음) 비율이 이보다 크면 그 종목은 제외
+
+class MarketData:
+    """
+    [저장된 분봉] data/raw CSV들을 과거 -> 최신 순서의 배열로 읽어 봉 시각 기준으로 맞춥니다.
+    close/volume: (종목 수, 봉 수) 배열, bars[종목][i]: KIS 응답 형식의 봉 dict
+    앞쪽 warmup개 = 거래일 전날까지의 봉 (피쳐 엔진 예열용), open_bar부터 = 거래일 하루 (times: 봉별 시각)
+    - 시각 컬럼(stck_bsop_date, stck_cntg_hour)이 있으면: 파일마다 거래일 하루만 골라 전 종목을 같은 봉 시각에 맞춤
+      거래일 = 파일별 마지막 영업일 중 가장 많은 날, 그날 봉이 없는 종목은 제외
+      빈 봉(거래 없음)은 직전 종가로 채우고 거래량 0, 빈 봉이 MAX_MISSING_RATIO보다 많은 종목은 제외
+    - 시각 컬럼이 없는 옛 CSV뿐이면: 마지막 봉 기준으로 개수만 맞춤 (날짜 경계를 구분할 수 없어 경고 출력)
+    """
+    def __init__(self, file_paths, n_bars, warmup=WARMUP, max_symbols=MAX_SYMBOLS):
+        frames = {}
+        for path in file_paths:
+            try:
+                df = pd.read_csv(path, dtype={col: str for col in TIME_COLS})
+                prices = df[PRICE_COLS].apply(pd.to_numeric, errors='coerce')
+            except Exception:
+                continue
+            if all(col in df.columns for col in TIME_COLS):
+                prices['stamp'] = pd.to_datetime(df['stck_bsop_date'] + df['stck_cntg_hour'].str.zfill(6),
+                                                 format="%Y%m%d%H%M%S", errors='coerce')
+            frames[symbol_from_path(path)] = prices.dropna()
+
+        self.symbols, self.bars, self.times = [], [], None
+        timed = {sym: df for sym, df in frames.items() if 'stamp' in df.columns}
+        if timed:
+            if len(timed) < len(frames):
+                print(f"   ⚠️ 시각 컬럼이 없는 파일 {len(frames) - len(timed)}개는 제외합니다. (run_collector.py로 다시 수집)")
+            closes, volumes = self._load_day(timed, n_bars, warmup, max_symbols)
+        else:
+            if frames:
+                print("   ⚠️ 분봉 CSV에 시각 컬럼이 없어 마지막 봉 기준으로 개수만 맞춥니다. (여러 날의 봉이 이어질 수 있음)")
+            closes, volumes = self._load_tail(frames, warmup + n_bars, max_symbols)
+            self.open_bar = warmup
+
+        self.n_bars = warmup + (len(self.times) if self.times is not None else n_bars)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.close = np.array(closes).reshape(len(self.symbols), self.n_bars)
+        self.volume = np.array(volumes).reshape(len(self.symbols), self.n_bars)
+
+    def _add(self, symbol, df, closes, volumes):
+        self.symbols.append(symbol)
+        self.bars.append(df.to_dict('records'))
+        closes.append(df['stck_prpr'].to_numpy(float))
+        volumes.append(df['cntg_vol'].to_numpy(float))
+
+    def _load_tail(self, frames, n_bars, max_symbols):
+        # 옛 CSV (최신순, 시각 없음) -> 뒤집어서 최근 n_bars개
+        closes, volumes = [], []
+        for sym, df in frames.items():
+            if len(self.symbols) >= max_symbols: break
+            if len(df) < n_bars: continue
+            self._add(sym, df.iloc[::-1].tail(n_bars).reset_index(drop=True), closes, volumes)
+        return closes, volumes
+
+    def _load_day(self, frames, n_bars, warmup, max_symbols):
+        frames = {sym: df.drop_duplicates('stamp').sort_values('stamp') for sym, df in frames.items()}
+        last_days = pd.Series({sym: df['stamp'].iloc[-1].normalize() for sym, df in frames.items() if len(df)})
+        if last_days.empty:
+            return [], []
+        day = last_days.value_counts().idxmax()
+        next_day = day + pd.Timedelta(days=1)
+
+        # 거래일 봉 시각 = 전 종목 봉 시각의 합집합 (앞에서부터 n_bars개)
+        grid = sorted(set().union(*(df.loc[(df['stamp'] >= day) & (df['stamp'] < next_day), 'stamp'] for df in frames.values())))
+        grid = pd.DatetimeIndex(grid[:n_bars], name='stamp')
+        self.open_bar = warmup
+        self.times = list(grid.to_pydatetime())
+
+        closes, volumes, skipped = [], [], 0
+        for sym, df in frames.items():
+            if len(self.symbols) >= max_symbols: break
+            before = df[df['stamp'] < day].tail(warmup)
+            today = df[(df['stamp'] >= day) & (df['stamp'] < next_day)].set_index('stamp').reindex(grid)
+            missing = int(today['stck_prpr'].isna().sum())
+            if len(before) < warmup or missing > len(grid) * MAX_MISSING_RATIO:
+                skipped += 1
+                continue
+
+            # 빈 봉: 직전 종가로 시가/고가/저가/종가를 채우고 거래량 0 (전날 마지막 종가부터 이어짐)
+            close = today['stck_prpr'].ffill().fillna(before['stck_prpr'].iloc[-1])
+            for col in PRICE_COLS:
+                today[col] = today[col].fillna(0 if col == 'cntg_vol' else close)
+            today = today.reset_index()
+
+            df_all = pd.concat([before, today], ignore_index=True)
+            df_all['stck_bsop_date'] = df_all['stamp'].dt.strftime("%Y%m%d")
+            df_all['stck_cntg_hour'] = df_all['stamp'].dt.strftime("%H%M%S")
+            self._add(sym, df_all[PRICE_COLS + TIME_COLS], closes, volumes)
+
+        print(f"   📅 거래일 {day:%Y-%m-%d} ({len(grid)}봉), {len(self.symbols)}종목 사용 / 봉 부족·빈 봉 과다로 {skipped}종목 제외")
+        return closes, volumes
+
+class SimClock:
+    """
+    [가상 시계] 봉 번호 <-> 장중 시각 (장 시작 봉 = open_bar)
+    times가 있으면 실제 봉 시각 (times[0] = 장 시작 봉), 없으면 09:00부터 봉마다 step씩
+    """
+    def __init__(self, open_bar, start=None, step=timedelta(minutes=3), times=None):
+        self.open_bar = open_bar
+        self.times = times
+        self.start = start or (times[0] if times else datetime.now().replace(hour=9, minute=0, second=0, microsecond=0))
+        self.step = step
+        self.bar = 0
+
+    def now(self, bar=None):
+        bar = self.bar if bar is None else bar
+        if self.times and 0 <= bar - self.open_bar < len(self.times):
+            return self.times[bar - self.open_bar]
+        return self.start + self.step * (bar - self.open_bar)
+
+class FakeKISApi:
+    """
+    [가짜 KISApi] 백테스트용 메모리 계좌. trader/account가 쓰는 KISApi 메서드만 흉내냅니다.
+    - 시세는 가상 시계(clock)가 가리키는 봉의 종가
+    - 시장가 주문은 즉시 전량 체결 (수수료/세금/미끄러짐 반영), 미체결 없음
+    - 응답 형식은 실제 API와 같게 (get_all_balance -> output1/output2)
+    """
+    def __init__(self, market, clock, cash=START_CASH):
+        self.market = market
+        self.clock = clock
+        self.cash = cash
+        self.holdings = {}       # symbol -> {'qty', 'buy_price'}
+        self.trades = []
+        self.quote_feed = None
+        self.order_seq = 0
+        self.order_book = OrderBook()
+        self.day_open_bar = clock.open_bar
+
+    def _price(self, symbol):
+        return self.market.close[self.market.index[symbol], self.clock.bar]
+
+    def get_current_price(self, symbol):
+        if symbol not in self.market.index:
+            return 0
+        return int(self._price(symbol))
+
+    def fetch_ohlcv(self, symbol, timeframe='3m', count=60):
+        # 현재 봉까지 최근 count개 (실제 API처럼 최신순 DataFrame)
+        i = self.market.index[symbol]
+        first = max(0, self.clock.bar + 1 - count)
+        rows = []
+        for bar_no in range(first, self.clock.bar + 1):
+            bar = dict(self.market.bars[i][bar_no])
+            bar.setdefault('stck_cntg_hour', self.clock.now(bar_no).strftime("%H%M%S"))
+            rows.append(bar)
+        return pd.DataFrame(rows[::-1])
+
+    def get_top_100(self):
+        # 당일 누적 거래대금 순위
+        day = slice(self.day_open_bar, self.clock.bar + 1)
+        value = (self.market.close[:, day] * self.market.volume[:, day]).sum(axis=1)
+        return [self.market.symbols[i] for i in np.argsort(-value)[:100]]
+
+    def get_market_index(self):
+        # 시뮬레이션 종목 평균 등락률을 코스피/코스닥 대용으로 사용
+        base = self.market.close[:, self.day_open_bar]
+        rate = float(np.mean(self.market.close[:, self.clock.bar] / base - 1) * 100)
+        return round(rate, 2), round(rate, 2)
+
+    def get_stock_name(self, symbol):
+        return symbol
+
+    def get_balance(self):
+        return {'rt_cd': '0', 'output': {'ord_psbl_cash': str(int(self.cash)), 'dnca_tot_amt': str(int(self.cash))}}
+
+    def get_all_balance(self):
+        output1, stock_value = [], 0
+        for sym, info in self.holdings.items():
+            price = self.get_current_price(sym)
+            stock_value += price * info['qty']
+            output1.append({'pdno': sym, 'prdt_name': sym, 'hldg_qty': str(info['qty']),
+                            'pchs_avg_pric': str(info['buy_price']), 'prpr': str(price)})
+        output2 = [{'dnca_tot_amt': str(int(self.cash)), 'tot_evlu_amt': str(int(self.cash + stock_value))}]
+        return {'rt_cd': '0', 'output1': output1, 'output2': output2}
+
+    def get_my_stocks(self):
+        return parse_holdings(self.get_all_balance())
+
+    def current_unfilled_orders(self):
+        self.order_book.reconcile([], time.monotonic())
+        return 0
+
+    def buy_market_order(self, symbol, qty):
+        qty = int(qty)
+        price = self._price(symbol) * (1 + SLIPPAGE)
+        amount = price * qty
+        fee = amount * FEE_RATE
+        if qty <= 0 or amount + fee > self.cash:
+            return {'status': 'fail'}
+
+        self.order_seq += 1
+        self.cash -= amount + fee
+        info = self.holdings.setdefault(symbol, {'qty': 0, 'buy_price': 0.0})
+        info['buy_price'] = (info['buy_price'] * info['qty'] + amount) / (info['qty'] + qty)
+        info['qty'] += qty
+        self._log(symbol, "buy", qty, price, fee, None)
+        return {'status': 'success'}
+
+    def sell_market_order(self, symbol, qty):
+        info = self.holdings.get(symbol)
+        qty = int(qty)
+        if info is None or qty <= 0 or qty > info['qty']:
+            return {'status': 'fail'}
+
+        self.order_seq += 1
+        price = self._price(symbol) * (1 - SLIPPAGE)
+        amount = price * qty
+        fee = amount * (FEE_RATE + SELL_TAX_RATE)
+        self.cash += amount - fee
+        pnl = (price - info['buy_price']) * qty - fee
+        info['qty'] -= qty
+        if info['qty'] == 0:
+            del self.holdings[symbol]
+        self._log(symbol, "sell", qty, price, fee, pnl)
+        return {'status': 'success'}
+
+    def sell_all_holdings(self):
+        for sym, info in list(self.holdings.items()):
+            self.sell_market_order(sym, info['qty'])
+
+    def cancel_all_unfilled_orders(self):
+        return
+
+    def equity(self):
+        return self.cash + sum(self.get_current_price(sym) * info['qty'] for sym, info in self.holdings.items())
+
+    def _log(self, symbol, side, qty, price, fee, pnl):
+        self.trades.append({'time': self.clock.now().strftime("%H:%M"), 'symbol': symbol, 'side': side, 'qty': qty,
+                            'price': round(price, 2), 'fee': round(fee, 2), 'pnl': None if pnl is None else round(pnl, 2)})
+
+class Backtester:
+    """
+    [이벤트 기반 백테스트]
+    저장된 분봉을 봉 단위로 재생하며 실전 main과 같은 순서/함수로 판단합니다.
+    1. 새 봉을 피쳐 엔진(FeatureStore)에 넣고 전 종목 배치 예측 (score_batch)
+    2. 15:20 이후면 전량 청산 후 종료
+    3. 보유 종목 익절/손절 판정 (trader.decide_risk)
+    4. 계좌 스냅샷 -> 모드 판정 (trader.check_mode) -> 후보 매수 (trader.buy_candidates)
+    """
+    def __init__(self, model, file_paths, n_bars=BACKTEST_BARS, warmup=WARMUP, cash=START_CASH,
+                 max_symbols=MAX_SYMBOLS, verbose=VERBOSE):
+        self.model = model
+        self.market = MarketData(file_paths, n_bars, warmup, max_symbols)
+        self.clock = SimClock(open_bar=self.market.open_bar, times=self.market.times)
+        self.api = FakeKISApi(self.market, self.clock, cash)
+        self.account = AccountService(self.api, ttl=0)  # 가상 시간이라 TTL 캐시 대신 매번 조회
+        self.features = FeatureStore(SEQ_LEN)
+        self.start_cash = cash
+        self.verbose = verbose
+        self.equity_curve = []
+
+    def _feed(self, bar_no):
+        # 모든 종목에 봉 1개씩 반영 -> 예측 입력 텐서
+        key = f"{bar_no:06d}"
+        tensors = {}
+        for i, sym in enumerate(self.market.symbols):
+            window = self.features.update(sym, [(key, self.market.bars[i][bar_no])])
+            tensors[sym] = to_input_tensor(window) if window is not None else None
+        return tensors
+
+    def run(self):
+        # 백테스트 중에는 디스코드 알림 끔
+        notifier.DISCORD_WEBHOOK_URL = None
+        started = time.perf_counter()
+
+        if not self.market.symbols:
+            print("❌ 백테스트할 데이터가 없습니다. (봉 수가 부족한 파일만 있음)")
+            return None
+
+        api, market = self.api, self.market
+        for bar_no in range(self.clock.open_bar):
+            self._feed(bar_no)
+
+        invest_amount = self.start_cash / MAX_HOLDINGS
+        print(f"⏪ 백테스트 시작: {len(market.symbols)}종목 x {market.n_bars - self.clock.open_bar}봉, 시작 자금 {self.start_cash:,}원")
+
+        for bar_no in range(self.clock.open_bar, market.n_bars):
+            self.clock.bar = bar_no
+            now = self.clock.now()
+            scores = score_batch(self.model, self._feed(bar_no))
+
+            quiet = contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+            with quiet:
+                # 마감 청산 (15:20) - main과 같은 기준
+                if now.hour == 15 and now.minute >= 20:
+                    api.sell_all_holdings()
+                    self.equity_curve.append((now, api.equity()))
+                    break
+                self._tick(scores, api.get_market_index(), invest_amount)
+
+            self.equity_curve.append((now, api.equity()))
+
+        # 데이터가 15:20 전에 끝나도 마지막 봉에서 청산
+        api.sell_all_holdings()
+        return self.report(time.perf_counter() - started)
+
+    def _tick(self, scores, market_rates, invest_amount):
+        api = self.api
+
+        # [3단계] 보유 종목 관리 (매도 판정)
+        my_stocks = dict(self.account.get().holdings)
+        for sym, info in my_stocks.items():
+            current_price = api.get_current_price(sym)
+            if current_price == 0: continue
+            decision = decide_risk(sym, info['qty'], info['buy_price'], current_price,
+                                   scores.get(sym, 0.0), info.get('name', sym), market_rates)
+            if decision['sell']:
+                api.sell_market_order(sym, decision['qty'])
+
+        # [5단계] 신규 종목 발굴 (매수 판정)
+        snapshot = self.account.get()
+        mode, threshold = check_mode(api, snapshot)
+        if is_defense_hold(mode, my_stocks):
+            return
+
+        target_stocks = api.get_top_100()[:TOP_N]
+        candidates = [sym for sym in target_stocks if sym not in my_stocks]
+        buy_candidates(api, candidates, scores, threshold, my_stocks,
+                       snapshot.orderable_cash, invest_amount, mode)
+
+    def report(self, elapsed):
+        trades = pd.DataFrame(self.api.trades, columns=['time', 'symbol', 'side', 'qty', 'price', 'fee', 'pnl'])
+        sells = trades[trades['side'] == "sell"]
+        end_equity = self.api.equity()
+        profit = end_equity - self.start_cash
+
+        curve = np.array([eq for _, eq in self.equity_curve]) if self.equity_curve else np.array([self.start_cash])
+        peak = np.maximum.accumulate(curve)
+        max_drawdown = float(((curve - peak) / peak).min() * 100)
+
+        summary = {
+            'start': self.start_cash,
+            'end': round(end_equity),
+            'profit': round(profit),
+            'return_pct': round(profit / self.start_cash * 100, 3),
+            'trades': len(trades),
+            'round_trips': len(sells),
+            'win_rate': round(float((sells['pnl'] > 0).mean() * 100), 1) if len(sells) else 0.0,
+            'max_drawdown_pct': round(max_drawdown, 3),
+            'elapsed_sec': round(elapsed, 2),
+        }
+
+        print(f"🏁 백테스트 완료 ({elapsed:.2f}초)")
+        print(f"   💰 {summary['start']:,}원 -> {summary['end']:,}원 ({summary['profit']:+,}원, {summary['return_pct']:+.2f}%)")
+        print(f"   📊 체결 {summary['trades']}건 (매도 {summary['round_trips']}건, 승률 {summary['win_rate']}%), 최대 낙폭 {summary['max_drawdown_pct']:.2f}%")
+        if len(sells):
+            by_symbol = sells.groupby('symbol')['pnl'].sum().sort_values()
+            print(f"   🔻 최대 손실: {by_symbol.index[0]} ({by_symbol.iloc[0]:+,.0f}원) / 🔺 최대 수익: {by_symbol.index[-1]} ({by_symbol.iloc[-1]:+,.0f}원)")
+        return summary, trades
+
+if __name__ == "__main__":
+    from main import load_model
+
+    model = load_model()
+    if model is not None:
+        file_list = sorted(glob.glob(RAW_GLOB))
+        result = Backtester(model, file_list).run()
+        if result is not None:
+            result[1].to_csv(TRADES_PATH, index=False)
+            print(f"📝 체결 내역 저장됨: {TRADES_PATH}")
@@ -0,0 +1,108 @@
+# bench_http_pool.py
+import os
+import ssl
+import json
+import time
+import tempfile
+import datetime
+import threading
+import statistics
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+import urllib3
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from kis_api import create_session
+
+# [설정]
+N_CALLS = 200     # 방식별 호출 횟수
+HOST = "127.0.0.1"
+
+class StubHandler(BaseHTTPRequestHandler):
+    """KIS 시세 응답을 흉내내는 로컬 HTTPS 스텁 (keep-alive 지원)"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 헤더/본문 분할 전송 시 지연(ACK) 방지
+
+    def do_GET(self):
+        body = json.dumps({"rt_cd": "0", "msg1": "정상처리 되었습니다.", "output": {"stck_prpr": "71000"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_self_signed_cert(dir_path):
+    # 벤치마크 전용 자체 서명 인증서 (localhost)
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(dir_path, "cert.pem")
+    key_path = os.path.join(dir_path, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    return cert_path, key_path
+
+def start_stub_server(cert_path, key_path):
+    server = ThreadingHTTPServer((HOST, 0), StubHandler)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert_path, key_path)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def measure(call, url):
+    latencies = []
+    for _ in range(N_CALLS):
+        t0 = time.perf_counter()
+        res = call(url)
+        res.json()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+def report(label, latencies):
+    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28} | 평균 {statistics.mean(latencies):7.2f}ms | p50 {statistics.median(latencies):7.2f}ms | p95 {p95:7.2f}ms")
+
+def run():
+    urllib3.disable_warnings()  # 자체 서명 인증서 경고 숨김
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = make_self_signed_cert(tmp)
+        server = start_stub_server(cert_path, key_path)
+        url = f"https://{HOST}:{server.server_address[1]}/uapi/domestic-stock/v1/quotations/inquire-price"
+
+        print(f"🏁 로컬 HTTPS 스텁 대상 호출 {N_CALLS}회 비교")
+        print("-" * 80)
+
+        # [Before] 모듈 함수 requests.get -> 매번 새 TCP+TLS 연결
+        before = measure(lambda u: requests.get(u, verify=False, timeout=5), url)
+        report("Before (requests.get)", before)
+
+        # [After] KISApi와 같은 풀링 세션 -> 연결 재사용
+        session = create_session()
+        after = measure(lambda u: session.get(u, verify=False, timeout=5), url)
+        report("After (pooled session)", after)
+
+        print("-" * 80)
+        print(f"⚡ 호출당 평균 {statistics.mean(before) - statistics.mean(after):.2f}ms 절약 "
+              f"({statistics.mean(before) / statistics.mean(after):.1f}배)")
+        server.shutdown()
+
+if __name__ == "__main__":
+    run()
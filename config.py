@@ -18,12 +18,47 @@ ACC_NO = os.getenv("KIS_DEV_ACC_NO")
 
 # 실전투자 URL (모의투자는 'https://openapivts.koreainvestment.com:29443')
 # URL_BASE = "https://openapi.koreainvestment.com:9443"
-URL_BASE = "https://openapivts.koreainvestment.com:29443"
+# KIS_URL_BASE 환경변수로 바꿀 수 있음 (예: 로컬 시뮬레이터 kis_sim_server.py -> http://127.0.0.1:8800)
+URL_BASE = os.getenv("KIS_URL_BASE", "https://openapivts.koreainvestment.com:29443")
+# 시장 지수 (네이버 증권). KIS_INDEX_URL로 바꿀 수 있음 (시뮬레이터: http://127.0.0.1:8800/index)
+MARKET_INDEX_URL = os.getenv("KIS_INDEX_URL", "https://m.stock.naver.com/api/index")
 
 if not APP_KEY or not APP_SECRET:
     print("❌ [오류] .env 파일에서 APP_KEY 또는 APP_SECRET을 찾을 수 없습니다.")
     print("   -> .env 파일이 있는지, 변수명이 정확한지 확인해주세요.")
 
+# HTTP 커넥션 풀 설정 (keep-alive 재사용)
+HTTP_POOL_SIZE = 16          # 호스트당 유지할 최대 연결 수
+HTTP_MAX_RETRIES = 2         # 연결 실패/502~504 재시도 횟수 (GET만)
+HTTP_BACKOFF = 0.3           # 재시도 간격 계수 (0.3s, 0.6s, ...)
+HTTP_TIMEOUT = 10            # 요청 타임아웃 (초)
+
+# API 트래픽 녹화/재생 (traffic_log.py) - 장중 세션을 녹화해두고 네트워크 없이 main.main()을 다시 돌려볼 때
+TRAFFIC_MODE = os.getenv("KIS_TRAFFIC_MODE", "")              # "record": 녹화 / "replay": 재생 / "": 끔
+TRAFFIC_LOG_PATH = os.getenv("KIS_TRAFFIC_LOG", "logs/kis_traffic.jsonl")
+REPLAY_SPEED = float(os.getenv("KIS_REPLAY_SPEED", "0"))      # 재생 시 응답 지연 / 루프 대기 배속 (1 = 녹화 그대로, 0 = 대기 없음)
+REPLAY_STRICT = os.getenv("KIS_REPLAY_STRICT", "0") == "1"   # 재생 시 녹화와 정확히 일치하지 않는 요청은 에러로 처리
+
+# 지연 시간 지표 (metrics.py) - API 엔드포인트별 / 메인 루프 단계별 p50/p95/p99
+METRICS_WINDOW = 1000        # 라벨 조합별로 보관할 최근 관측값 개수
+METRICS_DUMP_SEC = 60        # 이 주기(초)마다 파일로 내보냄
+METRICS_JSON_PATH = "logs/metrics.json"
+METRICS_PROM_PATH = "logs/metrics.prom"   # Prometheus node_exporter textfile 수집기용
+
+# API 호출 한도 (초당 요청 수) - 계좌/환경에 맞게 조정하세요
+RATE_LIMIT_REAL = 18         # 실전투자: 초당 20건 (여유 2건)
+RATE_LIMIT_VTS = 4           # 모의투자: 초당 5건 (여유 1건)
+RATE_LIMIT_BURST = 1         # 한 번에 몰아서 보낼 수 있는 최대 건수
+RATE_LIMIT_PER_TR = {        # TR ID별 추가 한도 (예: "CTPF1002R": 1 -> 종목정보 조회는 초당 1건)
+}
+
+# 실시간 시세 WebSocket (실전: 21000 / 모의: 31000)
+WS_URL = "ws://ops.koreainvestment.com:31000" if "vts" in URL_BASE else "ws://ops.koreainvestment.com:21000"
+QUOTE_FEED_ENABLED = os.getenv("KIS_QUOTE_FEED", "1") != "0"  # False면 현재가를 항상 REST로 조회 (KIS_QUOTE_FEED=0)
+WS_MAX_SUBSCRIPTIONS = 40    # 세션당 실시간 등록 한도 (KIS 41건)
+WS_RECONNECT_SEC = 3         # 연결 끊김 시 재접속 대기 (초)
+QUOTE_MAX_AGE_SEC = 30       # 이보다 오래된 실시간 시세는 무시하고 REST 조회
+
 # 2. 하드웨어 설정 (RTX 4060 활용)
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -33,7 +68,54 @@ WINDOW_SIZE = 30             # AI가 학습할 과거 데이터 길이 (3분봉
 DYNAMIC_RATIO = 0.5          # 공격/방어 모드 전환 기준 (잔고의 50%)
 STOP_LOSS_RATE = -0.02       # 손절 라인 (-2%)
 TAKE_PROFIT_RATE = 0.04      # 익절 라인 (+4%)
+TRAIL_STAGES = ((0.02, 0.005), (0.05, 0.03))   # 트레일링 스탑 (발동 수익률, 보존 수익률): +2% -> +0.5% 보존, +5% -> +3% 보존
 SEQ_LEN = 10 
+MAX_HOLDINGS = 19        # 최대 보유 종목 수 (미체결 주문 포함, 종목당 투자금 = 총자산 / 이 값)
 TOP_N = 50                # AI가 학습할 과거 데이터 길이
+SCAN_CONCURRENCY = 8      # 종목 스캔 시 동시에 조회할 종목 수 (HTTP_POOL_SIZE 이하)
+
+# 수집한 분봉 CSV (corpus.py / backtest.py / exit_grid.py)
+RAW_GLOB = "data/raw/*.csv"
+
+# 거래 비용 (backtest.py / exit_grid.py 시뮬레이션)
+FEE_RATE = 0.00015           # 매매 수수료 (매수/매도 각각)
+SELL_TAX_RATE = 0.0018       # 매도 거래세
+SLIPPAGE = 0.0005            # 시장가 체결 미끄러짐 (매수는 비싸게, 매도는 싸게)
+
+# 분봉 캐시 (ohlcv_cache.py)
+OHLCV_CACHE_BARS = 120       # 종목별 보관할 최대 봉 개수 (링버퍼)
+OHLCV_PAGE_SIZE = 30         # 분봉 API 1회 응답 개수 (증분 조회 시 1페이지만 요청)
+OHLCV_REFRESH_SEC = 30       # 이 시간(초) 안에 다시 요청하면 API 호출 없이 캐시 사용
+
+# 종목 마스터 (symbol_master.py) - 종목명 / 시장 / ETF·ETN·스팩·우선주 여부
+SYMBOL_MASTER_PATH = os.getenv("KIS_SYMBOL_MASTER", "data/symbol_master.csv")
+
+# 감시 종목 갱신 (universe.py)
+UNIVERSE_REFRESH_SEC = 60    # 랭킹 재조회 주기(초) - 메인 루프와 별도 스레드
+UNIVERSE_WAIT_SEC = 30       # 첫 감시 목록이 준비될 때까지 메인 루프가 기다리는 최대 시간(초)
+
+# 시장 지수 갱신 (market_index.py)
+MARKET_INDEX_POLL_SEC = 30   # 지수 재조회 주기(초) - 메인 루프와 별도 스레드
+MARKET_INDEX_STALE_SEC = 180 # 마지막 성공 후 이 시간(초)이 지나면 '지연'으로 표시
+MARKET_INDEX_WAIT_SEC = 5    # 첫 지수 조회를 메인 루프가 기다리는 최대 시간(초)
+
+# 계좌 스냅샷 (account.py)
+ACCOUNT_SNAPSHOT_TTL = 10    # 잔고/보유/미체결 스냅샷 유지 시간(초). 우리 주문이 나가면 즉시 무효화
+ORDER_BOOK_RECONCILE_SEC = 60  # 로컬 미체결 장부를 서버와 맞추는 주기(초). 확인 안 된 주문이 있으면 매 스냅샷마다
+
+DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
+
+# 디스코드 알림 (notifier.py) - 백그라운드 전송
+NOTIFY_MAX_QUEUE = 500       # 보내기 전 쌓아둘 수 있는 최대 알림 수 (넘치면 버림)
+NOTIFY_LINGER_SEC = 0.5      # 첫 알림 후 이 시간 동안 들어온 알림을 한 메시지로 묶음 (최대 10개)
+NOTIFY_TIMEOUT = 5           # 웹훅 요청 타임아웃(초)
+NOTIFY_MAX_RETRIES = 3       # 전송 실패 시 재시도 횟수
+NOTIFY_FLUSH_SEC = 10        # 프로그램 종료 시 남은 알림을 보내며 기다리는 최대 시간(초)
 
-DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
\ No newline at end of file
+# 구글 시트 매매일지 (sheet_logger.py) - 백그라운드 기록
+SHEET_BATCH_SEC = 2          # 첫 행 후 이 시간 동안 들어온 행을 append_rows 한 번으로 묶음
+SHEET_MAX_ROWS = 100         # 한 번에 기록할 최대 행 수
+SHEET_MAX_QUEUE = 1000       # 기록 대기열 최대 행 수 (넘치면 버림)
+SHEET_MAX_RETRIES = 5        # 할당량 초과(429)/서버 오류 시 재시도 횟수
+SHEET_RETRY_SEC = 5          # 첫 재시도 대기(초), 이후 두 배씩 (최대 60초)
+SHEET_FLUSH_SEC = 30         # 프로그램 종료 시 남은 행을 기록하며 기다리는 최대 시간(초)
@@ -0,0 +1,100 @@
+# corpus.py
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import Dataset
+from config import RAW_GLOB
+from features import FEATURES, iter_prepared_files
+
+# [설정]
+CORPUS_DIR = "data/corpus"
+DATA_FILE = "features.f32"   # 정규화된 피쳐 (전체 행 수, 10) float32, 행 단위로 이어 붙임
+INDEX_FILE = "index.csv"     # 종목별 위치: symbol, offset(시작 행), length(행 수)
+META_FILE = "meta.json"      # 피쳐 순서 / dtype / 전체 행 수
+
+def symbol_from_path(path):
+    # data/raw/005930_3min.csv -> 005930
+    return os.path.basename(path).split("_")[0]
+
+def build_corpus(file_paths, out_dir=CORPUS_DIR, seq_len=10, workers=None):
+    """
+    [학습 코퍼스 변환] 원본 CSV들을 메모리맵용 바이너리 1개 + 인덱스로 변환합니다.
+    파일을 하나씩 전처리해서 바로 디스크에 이어 쓰므로, 전체 데이터가 메모리에 올라가지 않습니다.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = []
+    offset = 0
+
+    print(f"📦 학습 코퍼스 변환 중... (파일 {len(file_paths)}개 -> {out_dir})")
+    with open(os.path.join(out_dir, DATA_FILE), "wb") as f:
+        # 전처리는 프로세스 풀에서 병렬로, 쓰기는 파일 순서대로
+        for path, arr in iter_prepared_files(file_paths, seq_len, workers):
+            if arr is None: continue
+            f.write(np.ascontiguousarray(arr, dtype=np.float32).tobytes())
+            rows.append({'symbol': symbol_from_path(path), 'offset': offset, 'length': len(arr)})
+            offset += len(arr)
+
+    pd.DataFrame(rows, columns=['symbol', 'offset', 'length']).to_csv(os.path.join(out_dir, INDEX_FILE), index=False)
+    meta = {'features': FEATURES, 'dtype': 'float32', 'rows': offset, 'files': len(rows)}
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✅ 변환 완료! ({len(rows)}개 종목, {offset:,}행, {offset * len(FEATURES) * 4 / 1e6:.1f}MB)")
+    return meta
+
+class CorpusDataset(Dataset):
+    """
+    [메모리맵 학습 데이터셋]
+    build_corpus로 만든 바이너리를 np.memmap으로 열어, 필요한 구간(11행)만 디스크에서 읽습니다.
+    시작 위치 배열도 만들지 않고 종목별 누적 샘플 수로 idx -> 행 위치를 계산 (메모리 = 종목 수에 비례)
+    샘플은 StockDataset과 동일 (종목 경계를 넘는 구간 없음)
+    """
+    def __init__(self, corpus_dir=CORPUS_DIR, seq_len=10):
+        self.seq_len = seq_len
+
+        with open(os.path.join(corpus_dir, META_FILE)) as f:
+            meta = json.load(f)
+        if meta['features'] != FEATURES:
+            raise ValueError(f"코퍼스 피쳐 순서가 현재 코드와 다릅니다. 다시 변환하세요: {corpus_dir}")
+
+        index = pd.read_csv(os.path.join(corpus_dir, INDEX_FILE), dtype={'symbol': str})
+        self.symbols = index['symbol'].tolist()
+
+        if meta['rows'] > 0:
+            self.data = np.memmap(os.path.join(corpus_dir, DATA_FILE), dtype=np.float32, mode="r",
+                                  shape=(meta['rows'], len(FEATURES)))
+        else:
+            self.data = np.empty((0, len(FEATURES)), dtype=np.float32)
+
+        # 종목별 샘플 수 (x 10행 + y 1행이 한 종목 안에 있어야 함)
+        counts = np.maximum(index['length'].to_numpy(np.int64) - seq_len, 0)
+        self.offsets = index['offset'].to_numpy(np.int64)
+        self.file_counts = counts
+        self.cum_counts = np.cumsum(counts)
+
+        print(f"📂 메모리맵 코퍼스 열기: {corpus_dir} ({len(self.symbols)}개 종목, {meta['rows']:,}행)")
+
+    def __len__(self):
+        return int(self.cum_counts[-1]) if len(self.cum_counts) else 0
+
+    def __getitem__(self, idx):
+        # idx번째 샘플이 몇 번째 종목의 몇 번째 구간인지 계산
+        file_no = int(np.searchsorted(self.cum_counts, idx, side="right"))
+        prev = int(self.cum_counts[file_no - 1]) if file_no > 0 else 0
+        i = int(self.offsets[file_no]) + idx - prev
+
+        window = torch.from_numpy(np.array(self.data[i : i+self.seq_len+1]))
+        x = window[:self.seq_len]       # 10일치 데이터 (10개 컬럼)
+        # 예측 목표: 다음날의 '종가(Close)' (0번째 컬럼)
+        y = window[self.seq_len, :1]
+        return x, y
+
+if __name__ == "__main__":
+    file_list = sorted(glob.glob(RAW_GLOB))
+    if not file_list:
+        print("❌ 'data/raw' 폴더에 CSV 파일이 없습니다.")
+    else:
+        build_corpus(file_list)
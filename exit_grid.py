@@ -0,0 +1,146 @@
+# exit_grid.py
+import glob
+import time
+import numpy as np
+import pandas as pd
+from config import TAKE_PROFIT_RATE, STOP_LOSS_RATE, TRAIL_STAGES, FEE_RATE, SELL_TAX_RATE, SLIPPAGE, RAW_GLOB
+
+# [설정]
+HOLD_BARS = 60        # 최대 보유 봉 수 (3분봉 60개 = 3시간, 그때까지 안 팔리면 종가 청산)
+ENTRY_STEP = 1        # 몇 봉마다 가상 진입할지 (1 = 모든 봉)
+TP_GRID = np.round(np.arange(0.01, 0.0801, 0.0025), 4)     # 익절 +1% ~ +8%
+SL_GRID = np.round(np.arange(-0.05, -0.0049, 0.0025), 4)   # 손절 -5% ~ -0.5%
+# 트레일링 스탑 사다리: ((발동 수익률, 보존 수익률), ...) - 최고 수익률이 발동선을 넘을 때마다 손절선을 그 보존선으로 올림
+# 1단 + 2단(실전 trader.decide_risk와 같은 형태, config.TRAIL_STAGES 포함)
+_FIRST = [(trig, lock) for trig in (0.01, 0.015, 0.02, 0.03) for lock in (0.0, 0.005, 0.01) if lock < trig]
+_SECOND = [(0.04, 0.02), (0.05, 0.03), (0.06, 0.04)]
+TRAIL_GRID = list(dict.fromkeys(
+    [()] + [(first,) for first in _FIRST + _SECOND]
+    + [(first, second) for first in _FIRST for second in _SECOND if second[1] > first[1]]
+    + [tuple(TRAIL_STAGES)]
+))
+COST = FEE_RATE * 2 + SELL_TAX_RATE + SLIPPAGE * 2   # 왕복 거래 비용 (수익률에서 차감)
+RESULT_PATH = "exit_grid.csv"
+
+def load_paths(file_paths, hold_bars=HOLD_BARS, step=ENTRY_STEP):
+    """
+    [가상 진입 경로] 각 종목의 step봉마다 종가로 진입했다고 보고,
+    이후 hold_bars개 봉의 누적 수익률 경로를 (진입 수, hold_bars) float32 배열로 만듭니다.
+    """
+    paths = []
+    for path in file_paths:
+        try:
+            close = pd.to_numeric(pd.read_csv(path)['stck_prpr'], errors='coerce').to_numpy(float)[::-1]
+        except Exception:
+            continue
+        close = close[~np.isnan(close)]
+        if len(close) <= hold_bars: continue
+
+        # windows[i, h] = close[i + 1 + h] / close[i] - 1  (strided view -> 복사 1번)
+        future = np.lib.stride_tricks.sliding_window_view(close[1:], hold_bars)
+        entries = close[:len(future)]
+        paths.append((future[::step] / entries[::step, None] - 1).astype(np.float32))
+
+    if not paths:
+        return np.empty((0, hold_bars), dtype=np.float32)
+    return np.concatenate(paths)
+
+def trail_label(stages):
+    """사다리 -> "+2.0%→+0.5% / +5.0%→+3.0%" (없으면 "없음")"""
+    return " / ".join(f"{trig:+.1%}→{lock:+.1%}" for trig, lock in stages) or "없음"
+
+def first_index(mask, default):
+    """각 행에서 처음 True인 열 번호 (없으면 default)"""
+    hit = mask.any(axis=-1)
+    return np.where(hit, mask.argmax(axis=-1), default).astype(np.int16)
+
+def simulate_grid(returns, tp_grid=TP_GRID, sl_grid=SL_GRID, trail_grid=TRAIL_GRID, cost=COST):
+    """
+    [청산 규칙 격자 시뮬레이션]
+    모든 진입 경로 x 모든 (익절, 손절, 트레일링) 조합의 청산 시점/수익률을 배열 연산으로 한 번에 계산합니다.
+    - 익절: 수익률 >= tp 인 첫 봉
+    - 손절: 트레일링 발동 전에는 수익률 <= sl, 발동 후에는 수익률 <= 그때까지 발동한 단계 중 가장 높은 보존선 인 첫 봉
+    - 트레일링 발동: 단계별로 최고 수익률 >= trig 인 첫 봉 (한 번 발동하면 유지)
+    - 셋 다 없으면 마지막 봉에서 청산
+    조합별 기대값(평균 순수익률), 승률, 평균 보유 봉 수를 DataFrame으로 반환합니다.
+    """
+    n, hold = returns.shape
+    never = np.int16(hold)
+    rows = np.arange(n)
+    peak = np.maximum.accumulate(returns, axis=1)
+    trough = np.minimum.accumulate(returns, axis=1)
+
+    # 누적 최고/최저는 단조 -> 첫 통과 봉 = 아직 못 넘은 봉의 개수
+    tp_idx = np.stack([(peak < tp).sum(axis=1) for tp in tp_grid]).astype(np.int16)       # (익절 수, 진입 수)
+    sl_idx = np.stack([(trough > sl).sum(axis=1) for sl in sl_grid]).astype(np.int16)     # (손절 수, 진입 수)
+
+    # 트레일링: 첫 단계 발동 봉(tau)과 봉별 보존선(발동한 단계 중 최고) 이탈 봉
+    bars = np.arange(hold)[None, :]
+    taus, locks = [], []
+    for stages in trail_grid:
+        if not stages:
+            taus.append(np.full(n, never, dtype=np.int16))
+            locks.append(np.full(n, never, dtype=np.int16))
+            continue
+        level = np.full((n, hold), -np.inf, dtype=np.float32)
+        tau = np.full(n, never, dtype=np.int16)
+        for trig, lock in stages:
+            stage_tau = (peak < trig).sum(axis=1).astype(np.int16)
+            level = np.where(bars >= stage_tau[:, None], np.maximum(level, lock), level)
+            tau = np.minimum(tau, stage_tau)
+        taus.append(tau)
+        locks.append(first_index(returns <= level, never))
+    taus, locks = np.stack(taus), np.stack(locks)    # (트레일링 수, 진입 수)
+
+    # 트레일링 전 손절은 발동 전에 걸렸을 때만 유효 (발동 후에는 더 높은 보존선이 먼저 걸림)
+    sl_before = np.where(sl_idx[:, None, :] < taus[None, :, :], sl_idx[:, None, :], never)   # (손절, 트레일링, 진입)
+    stop_idx = np.minimum(sl_before, locks[None, :, :])
+
+    results = []
+    for i, tp in enumerate(tp_grid):
+        exit_idx = np.minimum(np.minimum(stop_idx, tp_idx[i][None, None, :]), never - 1)    # (손절, 트레일링, 진입)
+        net = returns[rows[None, None, :], exit_idx] - cost
+        expectancy = net.mean(axis=-1) * 100
+        win_rate = (net > 0).mean(axis=-1) * 100
+        hold_bars = exit_idx.mean(axis=-1) + 1
+        for j, sl in enumerate(sl_grid):
+            for k, stages in enumerate(trail_grid):
+                results.append((tp, sl, trail_label(stages), expectancy[j, k], win_rate[j, k], hold_bars[j, k]))
+
+    return pd.DataFrame(results, columns=['take_profit', 'stop_loss', 'trail',
+                                          'expectancy_pct', 'win_rate', 'avg_hold_bars'])
+
+def expectancy_surface(table, trail="없음"):
+    """익절 x 손절 기대값 표 (트레일링 사다리 1개 고정, trail_label 문자열)"""
+    sub = table[table['trail'] == trail]
+    return sub.pivot(index='take_profit', columns='stop_loss', values='expectancy_pct')
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    returns = load_paths(sorted(glob.glob(RAW_GLOB)))
+    if len(returns) == 0:
+        print("❌ 'data/raw' 폴더에 시뮬레이션할 데이터가 없습니다.")
+        raise SystemExit(1)
+
+    n_combo = len(TP_GRID) * len(SL_GRID) * len(TRAIL_GRID)
+    print(f"🧮 청산 규칙 격자 시뮬레이션: 진입 {len(returns):,}건 x 조합 {n_combo:,}개 (보유 최대 {HOLD_BARS}봉)")
+    table = simulate_grid(returns)
+    table = table.sort_values('expectancy_pct', ascending=False).reset_index(drop=True)
+    table.to_csv(RESULT_PATH, index=False)
+    print(f"✅ 완료 ({time.perf_counter() - start:.1f}초) 결과 저장됨: {RESULT_PATH}")
+
+    # 현재 설정 (config: 익절 / 손절 / 2단 트레일링) 과 비교
+    current_trail = trail_label(TRAIL_STAGES)
+    current = table[np.isclose(table['take_profit'], TAKE_PROFIT_RATE) & np.isclose(table['stop_loss'], STOP_LOSS_RATE)
+                    & (table['trail'] == current_trail)]
+    print("\n🏆 기대값 상위 10개 조합")
+    print(table.head(10).to_string(index=False))
+    if len(current):
+        row = current.iloc[0]
+        print(f"\n📍 현재 설정 (익절 {TAKE_PROFIT_RATE:+.1%}, 손절 {STOP_LOSS_RATE:+.1%}, 트레일링 {current_trail}): "
+              f"기대값 {row['expectancy_pct']:+.3f}%, 승률 {row['win_rate']:.1f}%")
+
+    best = table.iloc[0]
+    surface = expectancy_surface(table, best['trail'])
+    print(f"\n🗺️ 기대값 지도 (행: 익절, 열: 손절, 트레일링 {best['trail']})")
+    print(surface.round(3).to_string())
@@ -0,0 +1,287 @@
+# features.py
+import os
+import math
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# AI 입력 피쳐 10개 (순서 중요! 학습/실전 모두 이 순서를 사용)
+PRICE_COLS = ['stck_prpr', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'cntg_vol']
+FEATURES = PRICE_COLS + ['disp5', 'disp20', 'rsi', 'log_ret', 'vol_chg']
+
+# 지표 계산에 필요한 최소 봉 개수 (20일 이평선이 가장 김)
+WARMUP_BARS = 20
+
+def add_advanced_features(df):
+    """
+    [Feature Engineering - 배치 모드]
+    AI가 시장을 더 잘 이해하도록 보조지표 5개를 추가합니다.
+    총 10개 피쳐: [종가, 시가, 고가, 저가, 거래량] + [이격도5, 이격도20, RSI, 변동성, 거래량변화]
+    학습(train.py)과 실시간(StreamingFeatures 검증용) 모두 이 함수를 기준으로 합니다.
+    """
+    df = df.copy()
+
+    # 0. 기본 전처리 (숫자 변환)
+    for col in PRICE_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # [중요] 시간 순서 정렬 (과거 -> 미래)
+    # API 데이터는 보통 역순(최신이 위)이므로 뒤집어줘야 함
+    df = df.iloc[::-1].reset_index(drop=True)
+
+    # 1. 이동평균 이격도 (Disparity)
+    # 가격이 평균보다 얼마나 높냐/낮냐 (1.05 = 5% 비쌈)
+    df['ma5'] = df['stck_prpr'].rolling(window=5).mean()
+    df['ma20'] = df['stck_prpr'].rolling(window=20).mean()
+    df['disp5'] = df['stck_prpr'] / (df['ma5'] + 1e-8)
+    df['disp20'] = df['stck_prpr'] / (df['ma20'] + 1e-8)
+
+    # 2. RSI (상대강도지수)
+    delta = df['stck_prpr'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / (loss + 1e-8)
+    df['rsi'] = 100 - (100 / (1 + rs))
+
+    # 3. 로그 수익률 (변동성)
+    df['log_ret'] = np.log(df['stck_prpr'] / df['stck_prpr'].shift(1))
+
+    # 4. 거래량 변화율
+    df['vol_chg'] = df['cntg_vol'] / (df['cntg_vol'].shift(1) + 1e-8)
+
+    # NaN 제거 (지표 계산하느라 앞부분 20개 정도 빔)
+    df = df.dropna().reset_index(drop=True)
+
+    return df
+
+def minmax_scale(data):
+    """
+    [정규화] 컬럼별 MinMax Scaling (0~1). 범위가 0인 컬럼은 분모 0 방지.
+    """
+    min_vals = data.min(axis=0)
+    max_vals = data.max(axis=0)
+    ranges = max_vals - min_vals
+    ranges[ranges == 0] = 1e-8
+    return (data - min_vals) / ranges
+
+def prepare_file(path, seq_len=10):
+    """
+    [파일 1개 전처리] CSV -> 보조지표 -> 정규화된 (행 수, 10) float32 배열
+    학습에 못 쓰는 파일(데이터 부족/깨짐)은 None
+    """
+    try:
+        raw_df = pd.read_csv(path)
+        if len(raw_df) < 30: return None # 데이터 너무 적으면 패스
+
+        # ★ 보조지표 추가 (Feature Engineering)
+        df = add_advanced_features(raw_df)
+        
+        if len(df) < seq_len + 1: return None
+
+        # 사용할 컬럼 10개 선정
+        data = df[FEATURES].values
+        
+        # 정규화 (MinMax Scaling 0~1)
+        # 각 컬럼별로 최대/최소 구해서 정규화
+        return minmax_scale(data).astype(np.float32)
+            
+    except Exception as e:
+        # print(f"⚠️ 에러({path}): {e}")
+        return None
+
+def _prepare_file_timed(task):
+    # 작업 프로세스에서 실행: 결과 + (프로세스 번호, 걸린 시간)
+    path, seq_len = task
+    start = time.perf_counter()
+    arr = prepare_file(path, seq_len)
+    return arr, os.getpid(), time.perf_counter() - start
+
+def _bounded_map(pool, fn, tasks, window):
+    # pool.map과 같은 순서로 결과를 내보내되, 제출해 둔 작업은 window개까지만
+    pending = deque()
+    tasks = iter(tasks)
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            break
+    while pending:
+        yield pending.popleft().result()
+        # 하나를 소비한 뒤에만 다음 작업 제출
+        for task in tasks:
+            pending.append(pool.submit(fn, task))
+            break
+
+def iter_prepared_files(file_paths, seq_len=10, workers=None):
+    """
+    [병렬 전처리] 여러 CSV의 prepare_file을 프로세스 풀에서 나눠 실행합니다.
+    결과는 항상 file_paths 순서대로 (path, 배열 또는 None)를 내보냅니다.
+    동시에 제출하는 파일은 최대 workers*2개 -> 하나를 내보낸 뒤에야 다음 파일을 제출
+    (소비가 느려도 끝난 배열이 부모 프로세스에 쌓이지 않음 = build_corpus의 메모리 상한 유지)
+    workers가 1 이하면 현재 프로세스에서 순서대로 처리. 끝나면 작업자별 처리량을 출력합니다.
+    """
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(file_paths)) or 1
+    tasks = [(path, seq_len) for path in file_paths]
+    stats = {}  # pid -> [파일 수, 행 수, 작업 시간]
+    start = time.perf_counter()
+
+    if workers <= 1:
+        results = map(_prepare_file_timed, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = _bounded_map(pool, _prepare_file_timed, tasks, window=workers * 2)
+
+    try:
+        for path, (arr, pid, elapsed) in zip(file_paths, results):
+            s = stats.setdefault(pid, [0, 0, 0.0])
+            s[0] += 1
+            s[1] += 0 if arr is None else len(arr)
+            s[2] += elapsed
+            yield path, arr
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    total = time.perf_counter() - start
+    print(f"⚙️ 전처리 완료: 파일 {len(file_paths)}개, 작업자 {workers}명, {total:.2f}초")
+    for no, (pid, (files, rows, busy)) in enumerate(sorted(stats.items()), 1):
+        rate = files / busy if busy > 0 else 0
+        print(f"   👷 작업자 {no} (pid {pid}): 파일 {files}개, {rows:,}행, {busy:.2f}초 ({rate:.1f}파일/초)")
+
+class StreamingFeatures:
+    """
+    [실시간 피쳐 엔진 - 스트리밍 모드]
+    봉이 하나 들어올 때마다 이동합계만 갱신해서 10개 피쳐를 O(1)로 계산합니다.
+    (add_advanced_features와 같은 수식 -> 학습/실전 피쳐 일치)
+    - 같은 키(시간)의 봉이 다시 들어오면 '진행 중인 봉'으로 보고 직전 상태로 되돌린 뒤 다시 계산
+    - 최근 seq_len개의 피쳐 행만 보관
+    """
+    def __init__(self, seq_len=10):
+        self.seq_len = seq_len
+        self.last_key = None
+        self.prev_state = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self.closes = deque(maxlen=20)   # 최근 종가 20개 (이평선용)
+        self.sum5 = 0.0
+        self.sum20 = 0.0
+        self.gains = deque(maxlen=14)    # 최근 상승폭 14개 (RSI용)
+        self.losses = deque(maxlen=14)   # 최근 하락폭 14개
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.prev_close = None
+        self.prev_vol = None
+        self.rows = deque(maxlen=self.seq_len)
+
+    def _snapshot(self):
+        return (deque(self.closes, maxlen=20), self.sum5, self.sum20,
+                deque(self.gains, maxlen=14), deque(self.losses, maxlen=14), self.gain_sum, self.loss_sum,
+                self.prev_close, self.prev_vol, deque(self.rows, maxlen=self.seq_len))
+
+    def _restore(self, state):
+        (self.closes, self.sum5, self.sum20, self.gains, self.losses, self.gain_sum, self.loss_sum,
+         self.prev_close, self.prev_vol, self.rows) = state
+
+    def update(self, key, bar):
+        """
+        봉 1개 반영. bar는 KIS 응답 형식(dict, 문자열 숫자도 가능)
+        key가 직전 봉과 같으면 진행 중인 봉을 갱신합니다.
+        """
+        try:
+            values = [float(bar[col]) for col in PRICE_COLS]
+        except (KeyError, TypeError, ValueError):
+            return  # 숫자가 아닌 봉은 무시
+        if any(math.isnan(v) for v in values):
+            return
+
+        if key is not None and key == self.last_key:
+            self._restore(self.prev_state)
+        self.prev_state = self._snapshot()
+        self.last_key = key
+
+        close, _, _, _, vol = values
+
+        # 1. 이동평균 (이동합계 갱신)
+        if len(self.closes) >= 5:
+            self.sum5 -= self.closes[-5]
+        if len(self.closes) == 20:
+            self.sum20 -= self.closes[0]
+        self.closes.append(close)
+        self.sum5 += close
+        self.sum20 += close
+
+        # 2. RSI 상승/하락폭 (첫 봉은 0으로 취급 - pandas where와 동일)
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if len(self.gains) == 14:
+            self.gain_sum -= self.gains[0]
+            self.loss_sum -= self.losses[0]
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.gain_sum += gain
+        self.loss_sum += loss
+
+        prev_close, prev_vol = self.prev_close, self.prev_vol
+        self.prev_close, self.prev_vol = close, vol
+
+        # 지표가 다 채워지기 전(20봉 미만)에는 행을 만들지 않음 (배치 모드의 dropna와 동일)
+        if len(self.closes) < WARMUP_BARS or prev_close is None:
+            return
+
+        disp5 = close / (self.sum5 / 5 + 1e-8)
+        disp20 = close / (self.sum20 / 20 + 1e-8)
+        rs = (self.gain_sum / 14) / (self.loss_sum / 14 + 1e-8)
+        rsi = 100 - (100 / (1 + rs))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_ret = float(np.log(np.float64(close) / prev_close))
+        vol_chg = vol / (prev_vol + 1e-8)
+
+        self.rows.append(values + [disp5, disp20, rsi, log_ret, vol_chg])
+
+    def window(self):
+        """최근 seq_len개 피쳐 행 (seq_len, 10). 아직 부족하면 None"""
+        if len(self.rows) < self.seq_len:
+            return None
+        return np.array(self.rows, dtype=float)
+
+class FeatureStore:
+    """
+    [종목별 피쳐 엔진 보관소]
+    분봉 캐시에서 새로 들어온 봉만 골라 각 종목의 StreamingFeatures에 흘려보냅니다.
+    """
+    def __init__(self, seq_len=10):
+        self.seq_len = seq_len
+        self.engines = {}
+        self.lock = threading.Lock()
+
+    def last_key(self, symbol):
+        engine = self.engines.get(symbol)
+        return engine.last_key if engine else None
+
+    def update(self, symbol, bars, reset=False):
+        """
+        bars: [(key, bar), ...] 과거 -> 최신 순서 (보통 새로 생긴 봉 1~2개)
+        reset=True면 엔진을 새로 만들어 처음부터 계산합니다. 최근 피쳐 창을 반환
+        """
+        with self.lock:
+            engine = self.engines.get(symbol)
+            if engine is None or reset:
+                engine = StreamingFeatures(self.seq_len)
+                self.engines[symbol] = engine
+
+            for key, bar in bars:
+                engine.update(key, bar)
+            return engine.window()
+
+    def retain(self, symbols):
+        keep = set(symbols)
+        with self.lock:
+            for sym in list(self.engines):
+                if sym not in keep:
+                    del self.engines[sym]
@@ -2,12 +2,78 @@
 import requests
 import json
 import time
+import threading
 from datetime import datetime
+from urllib.parse import urlparse
 import pandas as pd
 import numpy as np
 import yfinance as yf # 야후 파이낸스 추가
-from config import APP_KEY, APP_SECRET, ACC_NO, URL_BASE
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import APP_KEY, APP_SECRET, ACC_NO, URL_BASE, MARKET_INDEX_URL
+from config import HTTP_POOL_SIZE, HTTP_MAX_RETRIES, HTTP_BACKOFF, HTTP_TIMEOUT
+from config import RATE_LIMIT_REAL, RATE_LIMIT_VTS, RATE_LIMIT_BURST, RATE_LIMIT_PER_TR
+from config import TRAFFIC_MODE, TRAFFIC_LOG_PATH, REPLAY_SPEED, REPLAY_STRICT, QUOTE_FEED_ENABLED
 from notifier import send_message
+from rate_limiter import RateLimiter
+from order_book import OrderBook
+from traffic_log import TrafficRecorder, TrafficReplayer, WallClock, ReplayClock
+from metrics import observe
+from symbol_master import SymbolMaster
+
+def create_session(pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, backoff=HTTP_BACKOFF):
+    """
+    [커넥션 풀] keep-alive 세션 생성
+    매 요청마다 TCP+TLS 핸드셰이크를 새로 하지 않고, 열어둔 연결을 재사용합니다.
+    - pool_size: 호스트당 유지할 최대 연결 수 (동시 요청 수보다 크게)
+    - max_retries: 연결 실패/게이트웨이 오류(502~504) 시 재시도 횟수
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff,
+        status_forcelist=(502, 503, 504),
+        # [중요] POST(주문)는 재시도 금지 -> 중복 주문 방지
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def endpoint_label(url):
+    # 지표 라벨용 경로: .../uapi/domestic-stock/v1/quotations/inquire-price -> quotations/inquire-price
+    path = urlparse(url).path
+    return path.split("/v1/", 1)[1] if "/v1/" in path else path
+
+def retry_count(res):
+    # urllib3가 재시도한 횟수 (재생 응답 등 raw가 없으면 0)
+    retries = getattr(res.raw, "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+def parse_holdings(data):
+    """
+    [보유 종목 파싱] 잔고조회(inquire-balance) 응답의 output1 -> {종목코드: {qty, buy_price, current_price, name}}
+    """
+    stock_dict = {}
+    for item in data.get('output1', []):
+        # 보유수량 파싱 (모의: ord_psbl_qty / 실전: hldg_qty)
+        qty = int(item.get('hldg_qty') or item.get('ord_psbl_qty') or 0)
+
+        if qty > 0:
+            symbol = item['pdno']
+            buy_price = float(item.get('pchs_avg_pric') or 0)
+            current_price = int(item.get('prpr') or 0)
+
+            stock_dict[symbol] = {
+            'qty': qty, 
+            'buy_price': buy_price, 
+            'current_price': current_price,
+            'name': item['prdt_name'] 
+            }
+    return stock_dict
 
 class KISApi:
     def __init__(self):
@@ -16,8 +82,70 @@ class KISApi:
             print("   👉 모의투자(VTS) 모드로 동작합니다.")
         else:
             print("   👉 실전투자(Real) 모드로 동작합니다.")
-            
+
+        # 모든 API 호출이 공유하는 커넥션 풀 (토큰 발급보다 먼저 만들어야 함)
+        self.session = create_session()
+        # 초당 호출 한도 관리 (고정 sleep 대신 예산이 바닥났을 때만 대기)
+        rate = RATE_LIMIT_VTS if "vts" in URL_BASE else RATE_LIMIT_REAL
+        per_tr = RATE_LIMIT_PER_TR
+        if TRAFFIC_MODE == "replay" and REPLAY_SPEED > 0:
+            # 재생 배속만큼 서버 호출 한도도 늘림 (배속 0 = 한도 없음)
+            rate, per_tr = rate * REPLAY_SPEED, {tr: n * REPLAY_SPEED for tr, n in per_tr.items()}
+        self.rate_limiter = RateLimiter(rate, per_tr=per_tr, burst=RATE_LIMIT_BURST)
+        # 실시간 시세표 (QuoteFeed). 연결되면 get_current_price가 REST 대신 여기서 읽음
+        self.quote_feed = None
+        # 주문 일련번호: 주문/취소할 때마다 증가 -> 계좌 스냅샷(AccountService) 무효화 기준
+        self.order_seq = 0
+        self.order_lock = threading.Lock()
+        # 로컬 미체결 장부 (풀방 체크를 API 호출 없이 처리)
+        self.order_book = OrderBook()
+        # 종목 마스터 (종목명 / 시장 / ETF·ETN·스팩·우선주 여부를 API 없이 조회)
+        self.symbol_master = SymbolMaster().load()
+        # 트래픽 녹화/재생 (KIS_TRAFFIC_MODE=record/replay)
+        self.recorder = TrafficRecorder(TRAFFIC_LOG_PATH) if TRAFFIC_MODE == "record" else None
+        self.replayer = TrafficReplayer(TRAFFIC_LOG_PATH, REPLAY_SPEED, REPLAY_STRICT) if TRAFFIC_MODE == "replay" else None
+        # main 루프의 시계: 재생 모드면 녹화 시각을 따라가는 가상 시계 (대기도 배속만큼 줄어듦)
+        self.clock = ReplayClock(self.replayer, REPLAY_SPEED) if self.replayer is not None else WallClock()
+        if self.recorder is not None and QUOTE_FEED_ENABLED:
+            print("   ⚠️ 실시간 시세(WebSocket)는 녹화되지 않습니다. 재생용 녹화는 KIS_QUOTE_FEED=0 권장")
         self.access_token = self.get_access_token()
+
+    def _request(self, method, url, headers=None, params=None, data=None, timeout=HTTP_TIMEOUT):
+        """
+        [공통 HTTP 호출] 모든 엔드포인트는 이 함수를 거쳐 세션(커넥션 풀)을 사용합니다.
+        tr_id 헤더가 있는 KIS 호출은 호출 한도(rate_limiter)를 먼저 통과해야 합니다.
+        녹화 모드면 요청/응답을 로그에 남기고, 재생 모드면 네트워크 대신 로그의 응답을 돌려줍니다.
+        호출 한도 대기 / 응답 시간은 지표(metrics)로 기록됩니다. (엔드포인트, tr_id, 상태코드, 재시도 횟수)
+        """
+        tr_id = headers.get("tr_id") if headers else None
+        if tr_id and not (self.replayer is not None and not REPLAY_SPEED):
+            waited = self.rate_limiter.acquire(tr_id)
+            observe("kis_rate_limit_wait_seconds", waited, tr_id=tr_id)
+
+        started = time.monotonic()
+        labels = {'endpoint': endpoint_label(url), 'tr_id': tr_id or ""}
+        try:
+            if self.replayer is not None:
+                res = self.replayer.request(method, url, tr_id, params, data)
+            else:
+                res = self.session.request(method, url, headers=headers, params=params, data=data, timeout=timeout)
+        except Exception as e:
+            latency = time.monotonic() - started
+            observe("kis_http_request_seconds", latency, status="error", retry="0", **labels)
+            if self.recorder is not None:
+                self.recorder.record(method, url, tr_id, params, data, started, latency, error=e, when=self.clock.now())
+            raise
+
+        latency = time.monotonic() - started
+        observe("kis_http_request_seconds", latency, status=res.status_code, retry=retry_count(res), **labels)
+        if self.recorder is not None:
+            self.recorder.record(method, url, tr_id, params, data, started, latency, res=res, when=self.clock.now())
+        return res
+
+    def _mark_order(self):
+        # 주문/취소를 보냈음을 기록 (계좌 정보가 바뀌었을 수 있음)
+        with self.order_lock:
+            self.order_seq += 1
     
     def get_access_token(self):
         headers = {"content-type": "application/json"}
@@ -27,7 +155,7 @@ class KISApi:
             "appsecret": APP_SECRET
         }
         try:
-            res = requests.post(f"{URL_BASE}/oauth2/tokenP", headers=headers, data=json.dumps(body))
+            res = self._request("POST", f"{URL_BASE}/oauth2/tokenP", headers=headers, data=json.dumps(body))
             data = res.json()
             if 'access_token' in data:
                 return data['access_token']
@@ -38,6 +166,27 @@ class KISApi:
             print(f"❌ 연결 실패: {e}")
             return None
 
+    def get_approval_key(self):
+        """
+        [실시간 접속키 발급] WebSocket(실시간 시세) 접속에 필요한 approval_key
+        """
+        headers = {"content-type": "application/json"}
+        body = {
+            "grant_type": "client_credentials",
+            "appkey": APP_KEY,
+            "secretkey": APP_SECRET
+        }
+        try:
+            res = self._request("POST", f"{URL_BASE}/oauth2/Approval", headers=headers, data=json.dumps(body))
+            data = res.json()
+            if 'approval_key' in data:
+                return data['approval_key']
+            print(f"❌ 실시간 접속키 발급 실패: {data}")
+            return None
+        except Exception as e:
+            print(f"❌ 실시간 접속키 발급 실패: {e}")
+            return None
+
     def get_headers(self, tr_id):
         return {
             "Content-Type": "application/json",
@@ -47,35 +196,14 @@ class KISApi:
             "tr_id": tr_id
         }
     
-    def is_dirty_stock(self, name):
+    def is_dirty_stock(self, name, symbol=None):
         """
-        [필터링 함수] 종목명에 ETF, ETN, 스팩 등이 포함되어 있는지 검사
+        [필터링 함수] ETF, ETN, 스팩, 우선주 등 매매 제외 대상인지 검사
         True 반환 -> 더러운 종목 (제외 대상)
         False 반환 -> 깨끗한 주식 (수집 대상)
+        종목 마스터에 있으면 미리 계산한 플래그를 쓰고, 없으면 종목명 키워드로 검사합니다.
         """
-        # 1. 이름이 없으면 위험하니까 제외
-        if not name: 
-            return True
-        
-        # 2. 대문자로 변환 (KODEX, kodex 모두 잡기 위함)
-        name_upper = name.upper()
-        
-        # 제외할 키워드 목록
-        exclude_keywords = [
-            "ETN", "스팩", "인버스", "레버리지", "선물", "우B", "우선주", "리츠", "홀딩스", # 기타 상품
-            "TRUE", "QV", "SMART", "삼성머스트", "신한제", "유안타제", "하나금융", "엔에이치" # 스팩 관련
-        ]
-        
-        # 3. 우선주 체크 (종목명 끝에 '우' 혹은 '우B'가 붙음)
-        if name.endswith("우") or name.endswith("우B"):
-            return True
-
-        # 4. 키워드 포함 여부 체크
-        for keyword in exclude_keywords:
-            if keyword in name_upper:
-                return True # 더러운 종목
-        
-        return False # 깨끗한 종목
+        return self.symbol_master.is_dirty(symbol, name)
 
     def get_top_100(self):
         """
@@ -132,10 +260,9 @@ class KISApi:
             "fid_div_cls_code": "0", "fid_input_price_1": "", "fid_input_price_2": "", 
             "fid_vol_cnt": "", "fid_trgt_cls_code": "0"
         }
-        time.sleep(1)
         success_amt = False
         try:
-            res = requests.get(f"{URL_BASE}/uapi/domestic-stock/v1/ranking/volume-power", headers=headers_amt, params=params_amt)
+            res = self._request("GET", f"{URL_BASE}/uapi/domestic-stock/v1/ranking/volume-power", headers=headers_amt, params=params_amt)
             # [핵심 수정] 응답 내용이 비어있는지 먼저 확인
             if not res.text:
                 raise Exception("서버 응답이 비어있습니다 (Blank Response)")
@@ -147,7 +274,7 @@ class KISApi:
                     sym = item['stck_shrn_iscd']
                     name = item.get('hts_kor_isnm') or item.get('stck_shrn_isnm') or ""
                     
-                    if sym[0].isdigit() and not self.is_dirty_stock(name):
+                    if sym[0].isdigit() and not self.is_dirty_stock(name, sym):
                         all_symbols.add(sym)
                         count += 1
                 print(f"   👉 체결강도 폭발 종목 {count}개 선정 완료")
@@ -164,7 +291,6 @@ class KISApi:
         # ---------------------------------------------------------
         if not success_amt:
             print("📡 [대안] 급등주 상위 종목으로 재시도 중...")
-            time.sleep(1)
             try:
                 headers_up = self.get_headers("FHPST01700000")
                 params_up = {
@@ -174,7 +300,7 @@ class KISApi:
                     "fid_input_price_1": "", "fid_input_price_2": "", "fid_vol_cnt": "", 
                     "fid_trgt_cls_code": "0", "fid_trgt_exls_cls_code": "0", "fid_div_cls_code": "0", "fid_rsfl_rate1": ""
                 }
-                res = requests.get(f"{URL_BASE}/uapi/domestic-stock/v1/ranking/fluctuation", headers=headers_up, params=params_up)
+                res = self._request("GET", f"{URL_BASE}/uapi/domestic-stock/v1/ranking/fluctuation", headers=headers_up, params=params_up)
                 data = res.json()
                 if data['rt_cd'] == '0':
                     count = 0
@@ -182,7 +308,7 @@ class KISApi:
                         sym = item['mksc_shrn_iscd']
                         name = item.get('hts_kor_isnm') or item.get('stck_shrn_isnm') or ""
                         
-                        if sym[0].isdigit() and not self.is_dirty_stock(name):
+                        if sym[0].isdigit() and not self.is_dirty_stock(name, sym):
                             all_symbols.add(sym)
                             count += 1
                     print(f"   👉 급등주 {count}개 추가 선정")
@@ -200,16 +326,15 @@ class KISApi:
             "fid_trgt_exls_cls_code": "000000", "fid_input_price_1": "", "fid_input_price_2": "", "fid_vol_cnt": "", "fid_input_date_1": ""
         }
         try:
-            time.sleep(1)
             # 여기도 timeout 추가
-            res = requests.get(f"{URL_BASE}/uapi/domestic-stock/v1/quotations/volume-rank", headers=headers_vol, params=params_vol)
+            res = self._request("GET", f"{URL_BASE}/uapi/domestic-stock/v1/quotations/volume-rank", headers=headers_vol, params=params_vol)
             data = res.json()
             if data['rt_cd'] == '0':
                 count = 0
                 for item in data['output'][:40]:
                     sym = item['mksc_shrn_iscd']
                     name = item.get('hts_kor_isnm') or item.get('stck_shrn_isnm') or ""
-                    if sym[0].isdigit() and not self.is_dirty_stock(name):
+                    if sym[0].isdigit() and not self.is_dirty_stock(name, sym):
                         all_symbols.add(sym)
                         count += 1
                 print(f"   👉 거래량 상위에서 {count}개 종목 선정 (대체 완료)")
@@ -246,11 +371,8 @@ class KISApi:
             }
             
             try:
-                # 너무 빠르면 차단되므로 0.2초 대기
-                time.sleep(0.2)
-                
                 url = f"{URL_BASE}/uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice"
-                res = requests.get(url, headers=headers, params=params, timeout=2)
+                res = self._request("GET", url, headers=headers, params=params, timeout=2)
                 
                 if res.json()['rt_cd'] == '0':
                     items = res.json()['output2']
@@ -284,7 +406,8 @@ class KISApi:
         if all_data:
             # 중복 제거 (혹시 모르니)
             df = pd.DataFrame(all_data)
-            df = df.drop_duplicates(subset=['stck_cntg_hour'])
+            # 여러 날에 걸치면 같은 시각이 날마다 있으므로 영업일자까지 같아야 중복
+            df = df.drop_duplicates(subset=[col for col in ('stck_bsop_date', 'stck_cntg_hour') if col in df.columns])
             
             # 요청한 개수만큼 자르기
             return df.head(count)
@@ -296,18 +419,15 @@ class KISApi:
         [구원투수] 야후 파이낸스에서 분봉 데이터 긴급 공수
         """
         try:
-            ks_ticker = f"{symbol}.KS"
-            kq_ticker = f"{symbol}.KQ"
-            # 최근 5일치, 5분봉 데이터 다운로드
-            KS_ticker = yf.download(ks_ticker, period="5d", interval="5m", progress=False)
-            KQ_ticker = yf.download(kq_ticker, period="5d", interval="5m", progress=False)
-
-            if len(KS_ticker) > 10:
-                data = KS_ticker
-            elif len(KQ_ticker) > 10:
-                data = KQ_ticker
-            else:
-                data = []
+            # 종목 마스터로 시장을 알면 한 번만 다운로드 (모르면 코스피 -> 코스닥 순서로)
+            market = self.symbol_master.market(symbol)
+            suffixes = {"KOSPI": [".KS"], "KOSDAQ": [".KQ"]}.get(market, [".KS", ".KQ"])
+            data = []
+            for suffix in suffixes:
+                # 최근 5일치, 5분봉 데이터 다운로드
+                data = yf.download(f"{symbol}{suffix}", period="5d", interval="5m", progress=False)
+                if len(data) > 10:
+                    break
             
             
             if len(data) > 10:
@@ -333,16 +453,26 @@ class KISApi:
         
     def get_stock_name(self, symbol):
         """
-        [종목명 조회 - 최종 수정]
-        기존 '현재가 조회(inquire-price)' 대신 '상품정보조회(search-stock-info)' API를 사용하여
-        종목명을 확실하게 가져옵니다.
+        [종목명 조회]
+        종목 마스터에 있으면 바로 반환하고, 없을 때만 상품정보조회(search-stock-info) API로 가져와
+        마스터에 추가합니다. (다음부터는 API 호출 없음)
         """
-        # 1. 캐시(미리 저장된 이름) 확인 (API 절약)
-        if hasattr(self, 'name_cache') and symbol in self.name_cache:
-            return self.name_cache[symbol]
+        # 1. 종목 마스터 확인 (API 절약)
+        name = self.symbol_master.name(symbol)
+        if name:
+            return name
 
         # 2. 상품 기본정보 조회 API (CTPF1002R)
-        # 이 API는 가격이 아니라 종목 정보를 전문으로 다룹니다.
+        info = self.get_stock_info(symbol)
+        if info is None:
+            return symbol # 실패하면 코드 반환
+        return self.symbol_master.learn(symbol, info).name or symbol
+
+    def get_stock_info(self, symbol):
+        """
+        [상품 기본정보 조회] search-stock-info(CTPF1002R) 응답의 output (실패 시 None)
+        이 API는 가격이 아니라 종목 정보(종목명, 시장, 증권그룹)를 전문으로 다룹니다.
+        """
         tr_id = "CTPF1002R"
         url = f"{URL_BASE}/uapi/domestic-stock/v1/quotations/search-stock-info"
         
@@ -353,22 +483,19 @@ class KISApi:
         }
         
         try:
-            # 0.5초 대기 (과부하 방지)
-            time.sleep(0.5)
-            
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request("GET", url, headers=headers, params=params)
             data = res.json()
             
             if data['rt_cd'] == '0':
-                # search-stock-info API의 응답 구조: output -> prdt_name
-                return data['output']['prdt_name']
+                # search-stock-info API의 응답 구조: output -> prdt_name, mket_id_cd, scty_grp_id_cd
+                return data['output']
             else:
-                # print(f"   ⚠️ 이름 조회 실패({symbol}): {data.get('msg1')}")
-                return symbol # 실패하면 코드 반환
+                # print(f"   ⚠️ 종목정보 조회 실패({symbol}): {data.get('msg1')}")
+                return None
 
         except Exception as e:
-            print(f"   ❌ 종목명 에러({symbol}): {e}")
-            return symbol
+            print(f"   ❌ 종목정보 에러({symbol}): {e}")
+            return None
 
     def get_all_balance(self):
         self.is_vts = "vts" in URL_BASE
@@ -404,8 +531,7 @@ class KISApi:
 
         headers = self.get_headers(tr_id)
         try:
-            time.sleep(0.5) # 호출 제한 방지
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request("GET", url, headers=headers, params=params)
             data = res.json()
             
             if data['rt_cd'] != '0':
@@ -457,8 +583,7 @@ class KISApi:
 
         headers = self.get_headers(tr_id)
         try:
-            time.sleep(0.5) # 호출 제한 방지
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request("GET", url, headers=headers, params=params)
             data = res.json()
             
             if data['rt_cd'] != '0':
@@ -519,29 +644,11 @@ class KISApi:
         stock_dict = {}
         
         try:
-            # [속도 제한 방지]
-            time.sleep(0.2)
-            
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request("GET", url, headers=headers, params=params)
             data = res.json()
             
             if data['rt_cd'] == '0':
-                if 'output1' in data:
-                    for item in data['output1']:
-                        # 보유수량 파싱 (모의: ord_psbl_qty / 실전: hldg_qty)
-                        qty = int(item.get('hldg_qty') or item.get('ord_psbl_qty') or 0)
-                        
-                        if qty > 0:
-                            symbol = item['pdno']
-                            buy_price = float(item.get('pchs_avg_pric') or 0)
-                            current_price = int(item.get('prpr') or 0)
-                            
-                            stock_dict[symbol] = {
-                            'qty': qty, 
-                            'buy_price': buy_price, 
-                            'current_price': current_price,
-                            'name': item['prdt_name'] 
-                            }
+                stock_dict = parse_holdings(data)
             else:
                 # ❌ 실패 시 로직 (else 블록으로 이동됨)
                 print(f"⚠️ 잔고 조회 실패: {data.get('msg1')}")
@@ -551,18 +658,22 @@ class KISApi:
         return stock_dict
 
     def get_current_price(self, symbol):
+        # 1. 실시간 시세표 확인 (API 호출 X)
+        if self.quote_feed is not None:
+            price = self.quote_feed.get_price(symbol)
+            if price:
+                return price
+
+        # 2. 없으면 REST 조회
         headers = self.get_headers("FHKST01010100")
         params = {"fid_cond_mrkt_div_code": "J", "fid_input_iscd": symbol}
         try:
-            res = requests.get(f"{URL_BASE}/uapi/domestic-stock/v1/quotations/inquire-price", headers=headers, params=params)
+            res = self._request("GET", f"{URL_BASE}/uapi/domestic-stock/v1/quotations/inquire-price", headers=headers, params=params)
             return int(res.json()['output']['stck_prpr'])
         except:
             return 0
 
     def buy_market_order(self, symbol, qty):
-
-        time.sleep(1.0)
-
         tr_id = "VTTC0802U" if "vts" in URL_BASE else "TTTC0802U"
         headers = self.get_headers(tr_id)
 
@@ -575,10 +686,12 @@ class KISApi:
         params = {
             "CANO": ACC_NO, "ACNT_PRDT_CD": "01", "PDNO": symbol, "ORD_DVSN": "01", "ORD_QTY": str(qty), "ORD_UNPR": "0"
         }
-        res = requests.post(f"{URL_BASE}/uapi/domestic-stock/v1/trading/order-cash", headers=headers, data=json.dumps(params))
+        res = self._request("POST", f"{URL_BASE}/uapi/domestic-stock/v1/trading/order-cash", headers=headers, data=json.dumps(params))
+        self._mark_order()
         result = res.json()
         if result['rt_cd'] == '0':
             print(f"   ✅ 매수 주문 성공! (주문번호: {result['output']['ODNO']})")
+            self.order_book.add(result['output']['ODNO'], symbol, "buy", qty)
             return {'status': 'success'}
         else:
             print(f"   ❌ 매수 주문 실패: {result['msg1']}")
@@ -598,11 +711,13 @@ class KISApi:
             "CANO": ACC_NO, "ACNT_PRDT_CD": "01", "PDNO": symbol, "ORD_DVSN": "01", 
             "ORD_QTY": str(qty), "ORD_UNPR": "0"
         }
-        res = requests.post(f"{URL_BASE}/uapi/domestic-stock/v1/trading/order-cash", headers=headers, data=json.dumps(params))
+        res = self._request("POST", f"{URL_BASE}/uapi/domestic-stock/v1/trading/order-cash", headers=headers, data=json.dumps(params))
+        self._mark_order()
         
         result = res.json()
         if result['rt_cd'] == '0':
             print(f"   ✅ 매도 주문 성공! (주문번호: {result['output']['ODNO']})")
+            self.order_book.add(result['output']['ODNO'], symbol, "sell", qty)
             return {'status': 'success'}
         else:
             print(f"   ❌ 매도 주문 실패: {result['msg1']}")
@@ -621,7 +736,6 @@ class KISApi:
             qty = info['qty']
             print(f"   📤 [{sym}] {qty}주 일괄 매도 중...")
             self.sell_market_order(sym, qty)
-            time.sleep(0.2) # API 과부하 방지
 
     def get_live_ranking(self, count=30):
         return self.get_top_100()[:count]
@@ -633,15 +747,13 @@ class KISApi:
         for _ in range(299): prices.append(prices[-1] * (1 + np.random.uniform(-0.005, 0.005)))
         return pd.DataFrame({'stck_prpr': prices, 'stck_oprc': prices, 'stck_hgpr': prices, 'stck_lwpr': prices, 'cntg_vol': np.random.randint(1000, 50000, 300)})
 
-    def cancel_all_unfilled_orders(self):
+    def inquire_unfilled_orders(self):
         """
-        [청소부] 미체결된 주문을 모두 찾아서 일괄 취소합니다.
-        (self.is_vts 에러 방지 수정판)
+        [미체결 내역 조회] 서버의 미체결 주문 목록(output1)을 반환하고 로컬 장부(order_book)도 맞춥니다.
         """
         # [수정] 클래스 변수 대신 여기서 직접 확인 (에러 방지)
         is_vts_mode = "vts" in URL_BASE
 
-        # 1. 미체결 내역 조회
         tr_id = "VTTC8001R" if is_vts_mode else "TTTC8001R"
         url = f"{URL_BASE}/uapi/domestic-stock/v1/trading/inquire-daily-ccld"
         
@@ -652,13 +764,27 @@ class KISApi:
             "ORD_GNO_BRNO": "", "ODNO": "", "INQR_DVSN_3": "00", "INQR_DVSN_1": "", "CTX_AREA_FK100": "", "CTX_AREA_NK100": ""
         }
 
+        started_at = time.monotonic()
+        res = self._request("GET", url, headers=headers, params=params)
+        data = res.json()
+        
+        unfilled_list = []
+        if data['rt_cd'] == '0' and 'output1' in data:
+            unfilled_list = data['output1']
+            # 조회 성공했을 때만 장부 교체 (실패 응답으로 장부를 비우면 안 됨)
+            self.order_book.reconcile(unfilled_list, started_at)
+        return unfilled_list
+
+    def cancel_all_unfilled_orders(self):
+        """
+        [청소부] 미체결된 주문을 모두 찾아서 일괄 취소합니다.
+        (self.is_vts 에러 방지 수정판)
+        """
+        is_vts_mode = "vts" in URL_BASE
+
         try:
-            res = requests.get(url, headers=headers, params=params)
-            data = res.json()
-            
-            unfilled_list = []
-            if data['rt_cd'] == '0' and 'output1' in data:
-                unfilled_list = data['output1']
+            # 1. 미체결 내역 조회
+            unfilled_list = self.inquire_unfilled_orders()
             
             if len(unfilled_list) == 0:
                 # 미체결 없음 -> 조용히 리턴
@@ -689,13 +815,13 @@ class KISApi:
                     "ORD_UNPR": "0", "QTY_ALL_ORD_YN": "Y" 
                 }
                 
-                res = requests.post(cancel_url, headers=cancel_headers, data=json.dumps(cancel_params))
+                res = self._request("POST", cancel_url, headers=cancel_headers, data=json.dumps(cancel_params))
+                self._mark_order()
                 if res.json()['rt_cd'] == '0':
+                    self.order_book.remove(odno)
                     print(f"   🗑️ 주문취소 성공: {item['prdt_name']} (주문번호: {odno})")
                 else:
                     print(f"   ⚠️ 주문취소 실패: {res.json()['msg1']}")
-                
-                time.sleep(0.2)
 
         except Exception as e:
             print(f"❌ 미체결 정리 중 오류: {e}")
@@ -705,27 +831,8 @@ class KISApi:
         [청소부] 미체결된 주문을 모두 찾아서 일괄 취소합니다.
         (self.is_vts 에러 방지 수정판)
         """
-        # [수정] 클래스 변수 대신 여기서 직접 확인 (에러 방지)
-        is_vts_mode = "vts" in URL_BASE
-
-        # 1. 미체결 내역 조회
-        tr_id = "VTTC8001R" if is_vts_mode else "TTTC8001R"
-        url = f"{URL_BASE}/uapi/domestic-stock/v1/trading/inquire-daily-ccld"
-        
-        headers = self.get_headers(tr_id)
-        params = {
-            "CANO": ACC_NO, "ACNT_PRDT_CD": "01", "INQR_STRT_DT": "20240101", "INQR_END_DT": "20301231",
-            "SLL_BUY_DVSN_CD": "00", "INQR_DVSN": "00", "PDNO": "", "CCLD_DVSN": "02", # 02: 미체결만
-            "ORD_GNO_BRNO": "", "ODNO": "", "INQR_DVSN_3": "00", "INQR_DVSN_1": "", "CTX_AREA_FK100": "", "CTX_AREA_NK100": ""
-        }
-
         try:
-            res = requests.get(url, headers=headers, params=params)
-            data = res.json()
-            
-            unfilled_list = []
-            if data['rt_cd'] == '0' and 'output1' in data:
-                unfilled_list = data['output1']
+            unfilled_list = self.inquire_unfilled_orders()
             
             if len(unfilled_list) == 0 or not unfilled_list:
                 # 미체결 없음 -> 0을 리턴턴
@@ -737,13 +844,26 @@ class KISApi:
             print(f"❌ 미체결 확보 중 오류: {e}")
 
     def get_market_index(self):
+        """
+        [시장 지수 조회] (코스피 등락률, 코스닥 등락률) - 실패 시 (0.0, 0.0)
+        메인 루프는 market_index.MarketIndexService(백그라운드 갱신)를 사용합니다.
+        """
+        data = self.fetch_market_index()
+        return data['kospi'], data['kosdaq']
+
+    def fetch_market_index(self):
         """
         [시장 지수 조회 - 하이브리드]
         1순위: 네이버 (실시간)
         2순위: 야후 파이낸스 (네이버 실패 시 자동 전환)
+        반환: {kospi, kosdaq: 등락률(%), kospi_value, kosdaq_value: 지수(모르면 None),
+               source: 값을 채운 곳 "naver"/"yahoo"/"naver+yahoo"(시장별로 다름)/""(실패)}
         """
         kospi = 0.0
         kosdaq = 0.0
+        kospi_value = None
+        kosdaq_value = None
+        filled_by = {}   # 시장 -> 실제로 값을 채운 곳 ("naver" / "yahoo")
         
         # ---------------------------------------------------------
         # [1차 시도] 네이버 증권 (Naver)
@@ -756,29 +876,40 @@ class KISApi:
             }
             
             # KOSPI
-            url_ksp = "https://m.stock.naver.com/api/index/KOSPI/basic"
-            res = requests.get(url_ksp, headers=headers, timeout=2)
+            url_ksp = f"{MARKET_INDEX_URL}/KOSPI/basic"
+            res = self._request("GET", url_ksp, headers=headers, timeout=2)
             if res.status_code == 200:
                 data = res.json()
                 # 키값이 있는지 확인 후 가져오기
                 if 'fluctuationRate' in data:
                     kospi = float(data['fluctuationRate'])
+                    filled_by['KOSPI'] = "naver"
                 elif 'chgRate' in data: # 키 이름이 다를 경우 대비
                     kospi = float(data['chgRate'])
+                    filled_by['KOSPI'] = "naver"
+                if data.get('closePrice'):
+                    kospi_value = float(str(data['closePrice']).replace(",", ""))
+                    filled_by['KOSPI'] = "naver"
 
             # KOSDAQ
-            url_ksd = "https://m.stock.naver.com/api/index/KOSDAQ/basic"
-            res = requests.get(url_ksd, headers=headers, timeout=2)
+            url_ksd = f"{MARKET_INDEX_URL}/KOSDAQ/basic"
+            res = self._request("GET", url_ksd, headers=headers, timeout=2)
             if res.status_code == 200:
                 data = res.json()
                 if 'fluctuationRate' in data:
                     kosdaq = float(data['fluctuationRate'])
+                    filled_by['KOSDAQ'] = "naver"
                 elif 'chgRate' in data:
                     kosdaq = float(data['chgRate'])
+                    filled_by['KOSDAQ'] = "naver"
+                if data.get('closePrice'):
+                    kosdaq_value = float(str(data['closePrice']).replace(",", ""))
+                    filled_by['KOSDAQ'] = "naver"
 
             # 둘 중 하나라도 성공했으면 반환
             if kospi != 0.0 or kosdaq != 0.0:
-                return kospi, kosdaq
+                return {'kospi': kospi, 'kosdaq': kosdaq, 'kospi_value': kospi_value,
+                        'kosdaq_value': kosdaq_value, 'source': "naver"}
 
         except Exception as e:
             # 네이버 실패 시 조용히 로그만 남기고 야후로 넘어감
@@ -803,14 +934,20 @@ class KISApi:
                 close_today = ks_df['Close'].iloc[-1]
                 close_prev = ks_df['Close'].iloc[-2]
                 kospi = ((close_today - close_prev) / close_prev) * 100
+                kospi_value = float(close_today)
+                filled_by['KOSPI'] = "yahoo"
 
             # 코스닥 계산
             if len(kq_df) >= 2:
                 close_today = kq_df['Close'].iloc[-1]
                 close_prev = kq_df['Close'].iloc[-2]
                 kosdaq = ((close_today - close_prev) / close_prev) * 100
+                kosdaq_value = float(close_today)
+                filled_by['KOSDAQ'] = "yahoo"
 
         except Exception as e:
             print(f"   ❌ [야후 실패] 지수 조회 불가: {e}")
 
-        return round(kospi, 2), round(kosdaq, 2)
\ No newline at end of file
+        source = "+".join(sorted(set(filled_by.values())))
+        return {'kospi': round(kospi, 2), 'kosdaq': round(kosdaq, 2), 'kospi_value': kospi_value,
+                'kosdaq_value': kosdaq_value, 'source': source}
\ No newline at end of file
@@ -0,0 +1,385 @@
+# kis_sim_server.py
+import json
+import time
+import zlib
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# [설정]
+SIM_HOST = "127.0.0.1"
+SIM_PORT = 8800
+SIM_SYMBOLS = 200            # 랭킹에 나오는 가상 종목 수 (그 외 6자리 코드도 시세 조회 가능)
+SIM_START = "10:30"          # 서버 시작 시점의 가상 장중 시각 (분봉이 충분히 쌓여 있도록)
+SIM_SPEED = 1.0              # 가상 시간 배속 (60 -> 실제 1초 = 가상 1분)
+SIM_CASH = 10_000_000        # 시작 예수금
+LATENCY_MS = 30              # 응답 지연 평균 (ms)
+JITTER_MS = 20               # 응답 지연 흔들림 (+- ms)
+ERROR_RATE = 0.0             # 서버 에러(500) 비율 (0.01 = 1%)
+RATE_LIMIT = 20              # 초당 허용 요청 수 (초과 시 EGW00201 거절, 0 = 무제한)
+UNFILLED_RATE = 0.0          # 시장가 주문이 미체결로 남을 비율 (취소 로직 점검용)
+BARS_PER_PAGE = 30           # 분봉 1회 응답 개수 (KIS와 동일)
+
+OK = {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다."}
+RATE_LIMITED = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+SERVER_ERROR = {"rt_cd": "1", "msg_cd": "EGW00500", "msg1": "시뮬레이터 에러 주입"}
+
+class SimMarket:
+    """
+    [가상 시장] 종목코드마다 고정 시드의 랜덤워크로 3분봉을 만듭니다 (같은 코드 = 항상 같은 시세).
+    가상 시각은 09:00 기준 봉 번호로 관리하고, 서버 시작 후 흐른 시간 x 배속만큼 진행합니다.
+    """
+    def __init__(self, start=SIM_START, speed=SIM_SPEED, n_symbols=SIM_SYMBOLS):
+        hour, minute = map(int, start.split(":"))
+        today = datetime.now().replace(second=0, microsecond=0)
+        self.open_time = today.replace(hour=9, minute=0)
+        self.start_time = today.replace(hour=hour, minute=minute)
+        self.speed = speed
+        self.started = time.monotonic()
+        self.symbols = [f"9{i:04d}0" for i in range(n_symbols)]   # 끝자리 0 = 보통주 (우선주 판정 회피)
+        self.paths = {}    # symbol -> [(가격, 거래량), ...] 봉 번호 순
+        self.lock = threading.Lock()
+
+    def now(self):
+        return self.start_time + timedelta(seconds=(time.monotonic() - self.started) * self.speed)
+
+    def bar_no(self, when=None):
+        when = when or self.now()
+        return max(0, int((when - self.open_time).total_seconds() // 180))
+
+    def bar_time(self, bar_no):
+        return self.open_time + timedelta(minutes=3 * bar_no)
+
+    def _path(self, symbol, upto):
+        with self.lock:
+            path = self.paths.get(symbol)
+            if path is None:
+                seed = zlib.crc32(symbol.encode())
+                path = {'rng': random.Random(seed), 'bars': [], 'price': 5000 + seed % 200000}
+                self.paths[symbol] = path
+            rng, bars = path['rng'], path['bars']
+            while len(bars) <= upto:
+                path['price'] = max(100, path['price'] * (1 + rng.gauss(0, 0.004)))
+                bars.append((int(path['price']), rng.randint(1000, 200000)))
+            return bars
+
+    def price(self, symbol):
+        bar_no = self.bar_no()
+        return self._path(symbol, bar_no)[bar_no][0]
+
+    def day_change(self, symbol):
+        bars = self._path(symbol, self.bar_no())
+        return (bars[-1][0] / bars[0][0] - 1) * 100
+
+    def day_volume(self, symbol):
+        return sum(vol for _, vol in self._path(symbol, self.bar_no()))
+
+    def name(self, symbol):
+        return f"가상종목{symbol[-4:-1]}"
+
+    def bars_before(self, symbol, hhmmss, count=BARS_PER_PAGE):
+        """hhmmss(포함) 이전 분봉 count개를 최신순으로 (KIS inquire-time-itemchartprice output2 형식)"""
+        last = self.bar_no()
+        if hhmmss:
+            when = self.open_time.replace(hour=int(hhmmss[:2]), minute=int(hhmmss[2:4]))
+            last = min(last, self.bar_no(when))
+        bars = self._path(symbol, last)
+        rows = []
+        for bar_no in range(last, max(-1, last - count), -1):
+            price, vol = bars[bar_no]
+            prev = bars[bar_no - 1][0] if bar_no > 0 else price
+            rows.append({
+                "stck_bsop_date": self.bar_time(bar_no).strftime("%Y%m%d"),
+                "stck_cntg_hour": self.bar_time(bar_no).strftime("%H%M%S"),
+                "stck_prpr": str(price), "stck_oprc": str(prev),
+                "stck_hgpr": str(max(price, prev)), "stck_lwpr": str(min(price, prev)),
+                "cntg_vol": str(vol), "acml_tr_pbmn": str(price * vol)
+            })
+        return rows
+
+class SimAccount:
+    """[가상 계좌] 예수금 / 보유 종목 / 미체결 주문 (시장가는 현재가로 즉시 체결)"""
+    def __init__(self, market, cash=SIM_CASH, unfilled_rate=UNFILLED_RATE):
+        self.market = market
+        self.cash = cash
+        self.holdings = {}     # symbol -> {'qty', 'avg'}
+        self.open_orders = {}  # odno -> {...}
+        self.unfilled_rate = unfilled_rate
+        self.next_odno = 1
+        self.lock = threading.Lock()
+
+    def order(self, symbol, qty, side):
+        with self.lock:
+            odno = f"{self.next_odno:010d}"
+            self.next_odno += 1
+            price = self.market.price(symbol)
+            if side == "buy" and price * qty > self.cash:
+                return None, "주문가능금액을 초과 했습니다"
+            if side == "sell" and self.holdings.get(symbol, {}).get('qty', 0) < qty:
+                return None, "주문 가능한 수량을 초과하였습니다."
+
+            if random.random() < self.unfilled_rate:
+                self.open_orders[odno] = {'pdno': symbol, 'side': side, 'qty': qty}
+                return odno, None
+
+            if side == "buy":
+                self.cash -= price * qty
+                info = self.holdings.setdefault(symbol, {'qty': 0, 'avg': 0.0})
+                info['avg'] = (info['avg'] * info['qty'] + price * qty) / (info['qty'] + qty)
+                info['qty'] += qty
+            else:
+                self.cash += price * qty
+                info = self.holdings[symbol]
+                info['qty'] -= qty
+                if info['qty'] == 0:
+                    del self.holdings[symbol]
+            return odno, None
+
+    def cancel(self, odno):
+        with self.lock:
+            return self.open_orders.pop(odno, None) is not None
+
+    def balance(self):
+        with self.lock:
+            output1, stock_value = [], 0
+            for sym, info in self.holdings.items():
+                price = self.market.price(sym)
+                stock_value += price * info['qty']
+                output1.append({
+                    "pdno": sym, "prdt_name": self.market.name(sym),
+                    "hldg_qty": str(info['qty']), "ord_psbl_qty": str(info['qty']),
+                    "pchs_avg_pric": f"{info['avg']:.4f}", "prpr": str(price),
+                    "evlu_amt": str(price * info['qty']),
+                    "evlu_pfls_amt": str(int((price - info['avg']) * info['qty']))
+                })
+            total = int(self.cash + stock_value)
+            output2 = [{"dnca_tot_amt": str(int(self.cash)), "scts_evlu_amt": str(int(stock_value)),
+                        "tot_evlu_amt": str(total), "nass_amt": str(total)}]
+            return output1, output2
+
+class SimHandler(BaseHTTPRequestHandler):
+    """KIS Open API 엔드포인트를 흉내내는 요청 처리기 (keep-alive 지원)"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method):
+        sim = self.server.sim
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        body = {}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                body = {}
+
+        status, data = sim.dispatch(method, url.path, self.headers.get("tr_id", ""), query, body)
+        payload = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class KISSimServer:
+    """
+    [로컬 KIS 시뮬레이터]
+    실제 VTS 서버 없이 봇 전체(main.main())를 돌려볼 수 있는 대역 서버입니다.
+    - 토큰/실시간키, 분봉, 현재가, 잔고, 주문가능, 주문/정정취소, 미체결, 랭킹, 종목정보, 시장 지수
+    - 응답 지연(latency/jitter), 에러 주입(error_rate), 초당 호출 한도(EGW00201 거절) 설정 가능
+    - GET /sim/stats: 엔드포인트별 호출 수 / 거절 수
+    사용법: start() 후 KIS_URL_BASE=url, KIS_INDEX_URL=url/index, KIS_QUOTE_FEED=0 으로 봇 실행
+    """
+    def __init__(self, host=SIM_HOST, port=SIM_PORT, latency_ms=LATENCY_MS, jitter_ms=JITTER_MS,
+                 error_rate=ERROR_RATE, rate_limit=RATE_LIMIT, unfilled_rate=UNFILLED_RATE,
+                 start=SIM_START, speed=SIM_SPEED, cash=SIM_CASH):
+        self.market = SimMarket(start, speed)
+        self.account = SimAccount(self.market, cash, unfilled_rate)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.recent = deque()     # 최근 1초 요청 시각 (호출 한도 판정용)
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "by_path": {}}
+        self.lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), SimHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.sim = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="kis-sim", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _admit(self, path):
+        # 통계 + 호출 한도 (지난 1초 요청 수) + 에러 주입. 거절 시 (상태코드, 응답) 반환
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_path"][path] = self.stats["by_path"].get(path, 0) + 1
+            if self.rate_limit and path.startswith("/uapi"):
+                while self.recent and now - self.recent[0] >= 1.0:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rate_limit:
+                    self.stats["rate_limited"] += 1
+                    return 500, RATE_LIMITED
+                self.recent.append(now)
+            if self.error_rate and random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 500, SERVER_ERROR
+        return None
+
+    def dispatch(self, method, path, tr_id, query, body):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if path == "/sim/stats":
+            with self.lock:
+                return 200, json.loads(json.dumps(self.stats))
+
+        rejected = self._admit(path)
+        if rejected:
+            return rejected
+
+        handler = ROUTES.get(path)
+        if handler is None:
+            return 404, {"rt_cd": "1", "msg_cd": "EGW00404", "msg1": f"없는 엔드포인트: {path}"}
+        return handler(self, method, tr_id, query, body)
+
+    # ---------------- 엔드포인트 ----------------
+    def token(self, method, tr_id, query, body):
+        expires = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+        return 200, {"access_token": "sim-access-token", "token_type": "Bearer",
+                     "expires_in": 86400, "access_token_token_expired": expires}
+
+    def approval(self, method, tr_id, query, body):
+        return 200, {"approval_key": "sim-approval-key"}
+
+    def chart(self, method, tr_id, query, body):
+        symbol = query.get("fid_input_iscd", "")
+        rows = self.market.bars_before(symbol, query.get("fid_input_hour_1", ""))
+        price = self.market.price(symbol)
+        output1 = {"stck_prpr": str(price), "prdy_ctrt": f"{self.market.day_change(symbol):.2f}",
+                   "hts_kor_isnm": self.market.name(symbol)}
+        return 200, {**OK, "output1": output1, "output2": rows}
+
+    def price(self, method, tr_id, query, body):
+        symbol = query.get("fid_input_iscd", "")
+        output = {"stck_prpr": str(self.market.price(symbol)), "prdy_ctrt": f"{self.market.day_change(symbol):.2f}",
+                  "acml_vol": str(self.market.day_volume(symbol))}
+        return 200, {**OK, "output": output}
+
+    def balance(self, method, tr_id, query, body):
+        output1, output2 = self.account.balance()
+        return 200, {**OK, "ctx_area_fk100": "", "ctx_area_nk100": "", "output1": output1, "output2": output2}
+
+    def psbl_order(self, method, tr_id, query, body):
+        cash = int(self.account.cash)
+        price = int(query.get("ORD_UNPR") or 0) or 1
+        return 200, {**OK, "output": {"ord_psbl_cash": str(cash), "nrcvb_buy_amt": str(cash),
+                                      "max_buy_qty": str(cash // price)}}
+
+    def order_cash(self, method, tr_id, query, body):
+        side = "sell" if tr_id.endswith("0801U") else "buy"
+        odno, error = self.account.order(body.get("PDNO", ""), int(body.get("ORD_QTY") or 0), side)
+        if odno is None:
+            return 200, {"rt_cd": "1", "msg_cd": "APBK0952", "msg1": error}
+        output = {"KRX_FWDG_ORD_ORGNO": "91252", "ODNO": odno, "ORD_TMD": self.market.now().strftime("%H%M%S")}
+        return 200, {**OK, "msg1": "주문 전송 완료 되었습니다.", "output": output}
+
+    def daily_ccld(self, method, tr_id, query, body):
+        with self.account.lock:
+            output1 = [{"odno": odno, "ord_gno_brno": "91252", "pdno": order['pdno'],
+                        "prdt_name": self.market.name(order['pdno']),
+                        "sll_buy_dvsn_cd": "01" if order['side'] == "sell" else "02",
+                        "ord_qty": str(order['qty']), "tot_ccld_qty": "0", "rmn_qty": str(order['qty'])}
+                       for odno, order in self.account.open_orders.items()]
+        return 200, {**OK, "output1": output1, "output2": {"tot_ord_qty": str(len(output1))}}
+
+    def cancel(self, method, tr_id, query, body):
+        if not self.account.cancel(body.get("ORGN_ODNO", "")):
+            return 200, {"rt_cd": "1", "msg_cd": "APBK0650", "msg1": "취소할 수량이 없습니다."}
+        return 200, {**OK, "output": {"KRX_FWDG_ORD_ORGNO": "91252", "ODNO": body.get("ORGN_ODNO", "")}}
+
+    def _ranked(self, key, code_field, count=30):
+        ranked = sorted(self.market.symbols, key=key, reverse=True)[:count]
+        return [{code_field: sym, "hts_kor_isnm": self.market.name(sym), "stck_prpr": str(self.market.price(sym)),
+                 "prdy_ctrt": f"{self.market.day_change(sym):.2f}", "acml_vol": str(self.market.day_volume(sym))}
+                for sym in ranked]
+
+    def volume_power(self, method, tr_id, query, body):
+        return 200, {**OK, "output": self._ranked(self.market.day_change, "stck_shrn_iscd")}
+
+    def fluctuation(self, method, tr_id, query, body):
+        return 200, {**OK, "output": self._ranked(self.market.day_change, "mksc_shrn_iscd")}
+
+    def volume_rank(self, method, tr_id, query, body):
+        return 200, {**OK, "output": self._ranked(self.market.day_volume, "mksc_shrn_iscd")}
+
+    def stock_info(self, method, tr_id, query, body):
+        symbol = query.get("PDNO", "000")
+        output = {"pdno": symbol, "prdt_name": self.market.name(symbol), "prdt_abrv_name": self.market.name(symbol),
+                  "mket_id_cd": "STK", "scty_grp_id_cd": "ST"}
+        return 200, {**OK, "output": output}
+
+    def index(self, method, tr_id, query, body):
+        # 가상 종목 평균 등락률 (네이버 증권 응답 형식)
+        sample = self.market.symbols[:50]
+        rate = sum(self.market.day_change(sym) for sym in sample) / len(sample)
+        return 200, {"fluctuationRate": f"{rate:.2f}", "closePrice": f"{2500 * (1 + rate / 100):,.2f}"}
+
+ROUTES = {
+    "/oauth2/tokenP": KISSimServer.token,
+    "/oauth2/Approval": KISSimServer.approval,
+    "/uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice": KISSimServer.chart,
+    "/uapi/domestic-stock/v1/quotations/inquire-price": KISSimServer.price,
+    "/uapi/domestic-stock/v1/quotations/search-stock-info": KISSimServer.stock_info,
+    "/uapi/domestic-stock/v1/quotations/volume-rank": KISSimServer.volume_rank,
+    "/uapi/domestic-stock/v1/ranking/volume-power": KISSimServer.volume_power,
+    "/uapi/domestic-stock/v1/ranking/fluctuation": KISSimServer.fluctuation,
+    "/uapi/domestic-stock/v1/trading/inquire-balance": KISSimServer.balance,
+    "/uapi/domestic-stock/v1/trading/inquire-psbl-order": KISSimServer.psbl_order,
+    "/uapi/domestic-stock/v1/trading/order-cash": KISSimServer.order_cash,
+    "/uapi/domestic-stock/v1/trading/inquire-daily-ccld": KISSimServer.daily_ccld,
+    "/uapi/domestic-stock/v1/trading/order-rvsecncl": KISSimServer.cancel,
+    "/index/KOSPI/basic": KISSimServer.index,
+    "/index/KOSDAQ/basic": KISSimServer.index,
+}
+
+if __name__ == "__main__":
+    server = KISSimServer().start()
+    print(f"🧪 KIS 시뮬레이터 가동: {server.url} (가상 시각 {SIM_START}, 배속 x{SIM_SPEED})")
+    print(f"   지연 {LATENCY_MS}±{JITTER_MS}ms, 에러 {ERROR_RATE:.1%}, 호출 한도 초당 {RATE_LIMIT}건")
+    print("   봇 실행 시 환경변수:")
+    print(f"   KIS_URL_BASE={server.url} KIS_INDEX_URL={server.url}/index KIS_QUOTE_FEED=0 python main.py")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        print("시뮬레이터 종료")
@@ -1,5 +1,6 @@
 # main.py
 import time
+import asyncio
 import datetime
 from datetime import datetime
 import torch
@@ -7,13 +8,20 @@ import traceback
 import pandas as pd
 import numpy as np
 from kis_api import KISApi
-from trader import check_mode, manage_risk, check_available_budget
+from async_kis_api import AsyncKISApi
+from quote_feed import QuoteFeed
+from account import AccountService
+from universe import UniverseRefresher
+from market_index import MarketIndexService
+from trader import check_mode, manage_holdings, is_defense_hold, buy_candidates, free_slots
 from notifier import send_message
-from model import ScalpingLSTM
-from config import DEVICE, SEQ_LEN, TOP_N
+from model import ScalpingLSTM, score_batch
+from config import DEVICE, SEQ_LEN, TOP_N, QUOTE_FEED_ENABLED, MAX_HOLDINGS
+from config import METRICS_DUMP_SEC, METRICS_JSON_PATH, METRICS_PROM_PATH
+from metrics import registry, timer, observe
 from sheet_logger import log_to_sheet
 # [핵심] 전처리기는 collector에서 가져옵니다
-from collector import preprocess_data 
+from collector import preprocess_many, retain
 
 def load_model():
     print("🧠 AI 모델을 메모리에 로드합니다...")
@@ -31,48 +39,40 @@ def load_model():
         print("💡 힌트: train.py를 먼저 실행해서 scalping_model.pth를 만드셨나요?")
         return None
 
-def predict(model, input_tensor):
-    """
-    [AI 예측 함수]
-    collector가 만들어준 텐서(input_tensor)를 넣고 점수를 받습니다.
-    """
+def get_total_balance(account):
+    # 보고용 총평가금액은 항상 새로 조회 (스냅샷 캐시 무시)
     try:
-        with torch.no_grad():
-            model.eval()
-            output = model(input_tensor)
-            prediction = output.item() # AI 예측가 (0~1)
-            
-            # 현재 가격 (마지막 시점의 0번째 피쳐 = 정규화된 종가)
-            # input_tensor shape: (Batch, Seq, Feature) -> (0, -1, 0)
-            current_scaled_price = input_tensor[0, -1, 0].item()
-            
-            # 점수 = 상승 여력 (예측가 - 현재가)
-            score = prediction - current_scaled_price
-            
-            return score
-
-    except Exception as e:
-        # print(f"⚠️ 예측 에러: {e}")
-        return 0.0
-
-def get_total_balance(api):
-    try:
-        balance = api.get_all_balance()
-        # 모의투자는 output2, 실전은 output2 등 구조 확인 필요
-        # 안전하게 예외처리
-        if 'output2' in balance and len(balance['output2']) > 0:
-            return int(balance['output2'][0]['tot_evlu_amt'])
-        return 0
+        return account.get(force=True).total_eval
     except:
         return 0
 
-def main():
+def main(clock=None):
     api = KISApi()
+    # 루프 시계 (now / sleep): 기본은 실시간, 재생 모드면 녹화 시각을 따라가는 가상 시계
+    # 외부에서 넘기면 그 시계를 씀 (녹화되는 요청 시각도 같은 시계 기준)
+    if clock is not None:
+        api.clock = clock
+    clock = api.clock
+    async_api = AsyncKISApi(api) # 종목 스캔용 동시 조회 클라이언트
+    account = AccountService(api) # 잔고/보유/미체결 스냅샷 (틱당 1회 조회)
+    universe = UniverseRefresher(api) # 감시 종목은 백그라운드에서 주기적으로 갱신
+    universe.start()
+    market_index = MarketIndexService(api) # 시장 지수도 백그라운드에서 주기적으로 갱신
+    market_index.start()
+
+    # 실시간 시세 수신 (보유/후보 종목 현재가를 REST 대신 WebSocket으로)
+    quote_feed = None
+    if QUOTE_FEED_ENABLED:
+        approval_key = api.get_approval_key()
+        if approval_key:
+            quote_feed = QuoteFeed(approval_key)
+            quote_feed.start()
+            api.quote_feed = quote_feed
 
     # [1] 자산 조회 및 투자금 설정
-    start_balance = get_total_balance(api)
+    start_balance = get_total_balance(account)
     if start_balance > 0:
-        INVEST_AMOUNT_PER_STOCK = start_balance / 19
+        INVEST_AMOUNT_PER_STOCK = start_balance / MAX_HOLDINGS
     else:
         INVEST_AMOUNT_PER_STOCK = 500000 
 
@@ -85,17 +85,27 @@ def main():
         return
 
     mid_report_sent = False
+    candidates = [] # 직전 스캔의 매수 후보 (실시간 시세 구독용)
+    last_metrics_dump = time.monotonic()
 
     print("⏳ 장 시작 대기 및 종목 감시 중...")
     
     while True:
-        now = datetime.now()
+        # 재생 모드: 녹화분을 다 돌려줬으면 끝 (녹화된 하루를 그대로 다시 돌린 것)
+        if api.replayer is not None and api.replayer.finished():
+            print(f"\n⏹️ 재생 완료: {api.replayer.summary()}")
+            break
+
+        now = clock.now()
+        tick_start = time.perf_counter()
 
         # ======================================================
         # [0] 시장 지수 업데이트 (1분마다 갱신)
         # ======================================================
-        ksp, ksd = api.get_market_index()
-        print(f"\r📊 시장 지수 업데이트: {ksp} ({ksd}%)", end='')
+        with timer("bot_stage_seconds", stage="index"):
+            ksp, ksd = market_index.rates()
+        stale_mark = " (⚠️ 갱신 지연)" if market_index.stale else ""
+        print(f"\r📊 시장 지수 업데이트: {ksp} ({ksd}%){stale_mark}", end='')
         current_market_rates = (ksp, ksd)
             # 0.0이 아닐 때만 업데이트 (가끔 API 실패 시 기존 값 유지)
         if not current_market_rates:
@@ -107,7 +117,7 @@ def main():
         if now.hour < 9:
             remain_seconds = (datetime(now.year, now.month, now.day, 9, 0, 0) - now).total_seconds()
             print(f"\r⏰ 장 시작 전입니다! {int(remain_seconds)}초 남았습니다... ", end='')
-            time.sleep(1)
+            clock.sleep(1)
             continue
 
         if now.hour >= 15 and now.minute >= 30:
@@ -120,12 +130,12 @@ def main():
         # 점심 보고
         if now.hour == 12 and now.minute == 0:
             if not mid_report_sent:
-                curr_bal = get_total_balance(api)
+                curr_bal = get_total_balance(account)
                 profit = curr_bal - start_balance
                 prof_rate = (profit/start_balance*100) if start_balance>0 else 0
                 msg = f"**🍱 점심 보고**\n손익: {profit:+,}원 ({prof_rate:+.2f}%)"
                 send_message("점심 보고", msg, 0x00ff00)
-                log_to_sheet("중간점검", start_balance, curr_bal, profit)
+                log_to_sheet("중간점검", start_balance, curr_bal, profit, market_index)
                 mid_report_sent = True 
         if now.hour == 12 and now.minute > 1: mid_report_sent = False
 
@@ -133,17 +143,18 @@ def main():
         if now.hour == 15 and now.minute >= 20:
             print("\n⏰ 장 마감! 전량 매도합니다.")
             api.cancel_all_unfilled_orders()
-            time.sleep(2)
+            clock.sleep(2)
             api.sell_all_holdings()
-            time.sleep(5)
+            clock.sleep(5)
             
-            end_bal = get_total_balance(api)
+            end_bal = get_total_balance(account)
             profit = end_bal - start_balance
             prof_rate = (profit/start_balance*100) if start_balance>0 else 0
             
             msg = f"**🏁 마감 정산**\n최종 손익: {profit:+,}원 ({prof_rate:+.2f}%)"
             send_message("마감 정산", msg, 0x00ff00 if profit>=0 else 0xff0000)
-            log_to_sheet("마감정산", start_balance, end_bal, profit)
+            log_to_sheet("마감정산", start_balance, end_bal, profit, market_index)
+            registry.dump(METRICS_JSON_PATH, METRICS_PROM_PATH)
             break
         
         # 미체결 청소 (10분 주기)
@@ -153,14 +164,17 @@ def main():
         # ==========================================
         # [3단계] 보유 종목 관리 (매도 판정)
         # ==========================================
-        my_stocks = api.get_my_stocks()
+        with timer("bot_stage_seconds", stage="account"):
+            snapshot = account.get()
+        my_stocks = dict(snapshot.holdings)
+        if quote_feed is not None:
+            # 보유 종목은 항상 우선 구독 (후보 종목은 직전 스캔 목록 유지)
+            quote_feed.set_symbols(list(my_stocks) + candidates)
         if my_stocks:
             print(f"\n💼 보유 종목 관리 중 ({len(my_stocks)}개)...")
-            for symbol, info in my_stocks.items():
-                stock_name = info.get('name', symbol)
-                # trader.py의 manage_risk 호출 (시장 지수 전달)
-                manage_risk(api, symbol, info['qty'], info['buy_price'], model, predict, stock_name, current_market_rates)
-                time.sleep(0.2)
+            # 조회 -> 배치 예측 -> 판정 -> 매도 제출을 전 종목 병렬로 처리
+            with timer("bot_stage_seconds", stage="holdings"):
+                asyncio.run(manage_holdings(async_api, model, my_stocks, market_index))
 
         # ==========================================
         # [4단계] 신규 종목 발굴 (매수 판정)
@@ -168,96 +182,57 @@ def main():
         # ==========================================
         # [5단계] 신규 종목 발굴 (매수 판정)
         # ==========================================
-        mode, threshold = check_mode(api)
+        # 매도 주문이 나갔으면 스냅샷이 무효화되어 여기서 새로 조회됨
+        with timer("bot_stage_seconds", stage="account"):
+            snapshot = account.get()
+        with timer("bot_stage_seconds", stage="check_mode"):
+            mode, threshold = check_mode(api, snapshot)
         
-        if mode == "DEFENSE" and len(my_stocks) >= 3:
+        if is_defense_hold(mode, my_stocks):
             print("🛡️ [방어 모드] 보유 종목이 많아 신규 매수를 자제합니다.")
         else:
             print(f"\n🔍 종목 스캔 중... (모드: {mode}, 시장: 코스피 {current_market_rates[0]}%)")
             
-            target_stocks = api.get_top_100()[:TOP_N]
-            MAX_HOLDINGS = 19 
+            with timer("bot_stage_seconds", stage="universe"):
+                target_stocks = list(universe.get().symbols[:TOP_N])
             
             # ---------------------------------------------------------
-            # [최적화] 잔고 조회는 루프 밖에서 딱 1번만 수행! (API 과부하 방지)
+            # [최적화] 잔고는 계좌 스냅샷 값을 사용 (API 재조회 X)
             # ---------------------------------------------------------
-            current_deposit = 0
-            try:
-                balance_info = api.get_balance()
-                if balance_info:
-                    # 모의/실전 데이터 구조 차이 통합 처리
-                    if 'output' in balance_info:
-                        val = balance_info['output'].get('ord_psbl_cash') or balance_info['output'].get('dnca_tot_amt')
-                    else:
-                        val = balance_info['output2'][0].get('ord_psbl_cash') or balance_info['output2'][0].get('dnca_tot_amt')
-                    current_deposit = int(val or 0)
-            except:
-                current_deposit = 0
+            current_deposit = snapshot.orderable_cash
             # ---------------------------------------------------------
 
-            for symbol in target_stocks:
-                if symbol in my_stocks: continue
-                
-                # 미체결 포함 풀방 체크
-                unfulled = api.current_unfilled_orders()
-                if len(my_stocks) + int(unfulled) >= MAX_HOLDINGS:
-                    print(f"   🔒 [매수 제한] 포트폴리오 가득 참.")
-                    break 
-
-                # API 호출 속도 조절 (너무 빠르면 차단됨)
-                time.sleep(0.1) 
-
-                # 1. 데이터 전처리 (collector 사용)
-                input_tensor = preprocess_data(api, symbol)
-                if input_tensor is None: continue
-                
-                # 2. AI 예측
-                score = predict(model, input_tensor)
-                
-                if score > threshold: 
-                    curr_price = api.get_current_price(symbol)
-                    if curr_price <= 0: continue
-
-                    # 3. [최적화] API 호출 없이, 아까 저장해둔 변수(current_deposit) 확인
-                    target_amt = min(INVEST_AMOUNT_PER_STOCK, current_deposit)
-                    
-                    if target_amt < 10000:
-                        # 돈 없으면 루프 종료 (더 봐봤자 못 삼)
-                        print(f"   ⚠️ [매수 중단] 잔고 부족 ({current_deposit:,}원)")
-                        break 
-
-                    buy_qty = int(target_amt / curr_price)
-                    
-                    if buy_qty > 0:
-                        print(f"   🚀 [{symbol}] 매수 포착! 점수: {score:.4f}")
-                        
-                        # 실제 매수 주문
-                        result = api.buy_market_order(symbol, qty=buy_qty)
-                        
-                        if result['status'] == 'success':
-                            stock_name = api.get_stock_name(symbol)
-                            msg = (
-                                f"**🚀 매수 체결**\n"
-                                f"종목: {stock_name}\n"
-                                f"가격: {curr_price:,}원\n"
-                                f"수량: {buy_qty:,}주\n"
-                                f"AI점수: {score:.4f}\n"
-                                f"모드: {mode}"
-                            )
-                            send_message("매수 알림", msg, 0x0000ff)
-                            
-                            # 중복 매수 방지 등록
-                            my_stocks[symbol] = {'qty': buy_qty, 'buy_price': curr_price, 'name': stock_name}
-                            
-                            # [중요] 사용한 금액만큼 내 변수에서 차감 (서버 조회 X)
-                            used_amount = curr_price * buy_qty
-                            current_deposit -= used_amount
-                            print(f"   💰 잔고 차감: -{used_amount:,}원 (남은 돈: {current_deposit:,}원)")
-                            
-                            time.sleep(1) # 매수 후엔 좀 쉬어줌
+            # [최적화] 후보 종목 분봉을 한 번에 동시 조회 (호출 한도 내에서 병렬 처리)
+            candidates = [sym for sym in target_stocks if sym not in my_stocks]
+            if quote_feed is not None:
+                quote_feed.set_symbols(list(my_stocks) + candidates)
+            # 감시 대상에서 빠진 종목은 분봉 캐시/피쳐 엔진에서 제거
+            retain(set(target_stocks) | set(my_stocks))
+            # 풀방이면 살 수 없는 후보의 분봉 조회/예측은 건너뜀 (호출 한도 아끼기)
+            if free_slots(api, my_stocks) <= 0:
+                print(f"   🔒 [매수 제한] 포트폴리오 가득 참. (후보 {len(candidates)}개 스캔 생략)")
+            else:
+                with timer("bot_stage_seconds", stage="preprocessing"):
+                    input_tensors = asyncio.run(preprocess_many(async_api, candidates))
+                # [최적화] 후보 전체를 (N, SEQ_LEN, 10) 한 배치로 묶어 1번만 예측
+                with timer("bot_stage_seconds", stage="inference"):
+                    candidate_scores = score_batch(model, input_tensors)
+
+                with timer("bot_stage_seconds", stage="orders"):
+                    buy_candidates(api, candidates, candidate_scores, threshold, my_stocks,
+                                   current_deposit, INVEST_AMOUNT_PER_STOCK, mode)
+
+        # 틱 전체 소요 시간 + 주기적으로 지표 파일 내보내기
+        observe("bot_tick_seconds", time.perf_counter() - tick_start)
+        if time.monotonic() - last_metrics_dump >= METRICS_DUMP_SEC:
+            registry.dump(METRICS_JSON_PATH, METRICS_PROM_PATH)
+            last_metrics_dump = time.monotonic()
 
         print("💤 10초 대기...")
-        time.sleep(10)
+        clock.sleep(10)
+
+    universe.stop()
+    market_index.stop()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,105 @@
+# market_index.py
+import time
+import threading
+from datetime import datetime
+from config import MARKET_INDEX_POLL_SEC, MARKET_INDEX_STALE_SEC, MARKET_INDEX_WAIT_SEC
+
+class IndexSnapshot:
+    """
+    [시장 지수 스냅샷] 한 번의 조회 결과 (읽기 전용으로 사용)
+    - kospi / kosdaq: 전일 대비 등락률(%)
+    - kospi_value / kosdaq_value: 지수 (모르면 None)
+    - source: "naver" / "yahoo" / "naver+yahoo" / "" (아직 조회 성공 전)
+    - fetched_at: 조회 시각 (datetime)
+    """
+    def __init__(self, kospi=0.0, kosdaq=0.0, kospi_value=None, kosdaq_value=None, source=""):
+        self.kospi = kospi
+        self.kosdaq = kosdaq
+        self.kospi_value = kospi_value
+        self.kosdaq_value = kosdaq_value
+        self.source = source
+        self.fetched_at = datetime.now()
+        self.updated = time.monotonic()
+
+    @property
+    def rates(self):
+        return self.kospi, self.kosdaq
+
+    def age(self):
+        return time.monotonic() - self.updated
+
+class MarketIndexService:
+    """
+    [시장 지수 백그라운드 갱신기]
+    네이버(실패 시 야후) 지수 조회를 별도 스레드에서 poll_sec마다 실행하고, 최신 값을 메모리에 보관합니다.
+    main / trader / sheet_logger는 get() / rates()로 기다림 없이 읽기만 합니다.
+    - 조회에 실패하면 직전 값을 유지하고, stale_sec보다 오래되면 stale로 표시
+    """
+    def __init__(self, api, poll_sec=MARKET_INDEX_POLL_SEC, stale_sec=MARKET_INDEX_STALE_SEC):
+        self.api = api
+        self.poll_sec = poll_sec
+        self.stale_sec = stale_sec
+        self.snapshot = IndexSnapshot()
+        self.ready = threading.Event()    # 첫 조회 성공
+        self.waited = False               # 첫 조회를 한 번 기다렸는지 (이후로는 기다리지 않음)
+        self.wake = threading.Event()     # 종료
+        self.failures = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="market-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def get(self, wait=MARKET_INDEX_WAIT_SEC):
+        """
+        최신 스냅샷. 첫 조회가 아직이면 처음 한 번만 최대 wait초까지 기다림 (그래도 없으면 0.0 / source "")
+        조회가 계속 실패해도 이후 호출은 기다리지 않고 바로 반환 (매 틱 멈추지 않도록)
+        """
+        if not self.ready.is_set() and not self.waited:
+            self.waited = True
+            self.ready.wait(wait)
+        return self.snapshot
+
+    def rates(self):
+        """(코스피 등락률, 코스닥 등락률)"""
+        return self.get().rates
+
+    @property
+    def stale(self):
+        snap = self.snapshot
+        return not snap.source or snap.age() > self.stale_sec
+
+    def refresh(self):
+        """지수를 다시 조회해 스냅샷을 교체합니다. 성공하면 True"""
+        data = self.api.fetch_market_index()
+        if not data['source']:
+            self.failures += 1
+            return False
+        self.snapshot = IndexSnapshot(data['kospi'], data['kosdaq'], data['kospi_value'],
+                                      data['kosdaq_value'], data['source'])
+        self.failures = 0
+        self.ready.set()
+        return True
+
+    def _run(self):
+        while self.running:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failures += 1
+                print(f"   ⚠️ [시장 지수] 갱신 실패: {e}")
+            self.wake.wait(self.poll_sec)
+
+def as_rates(market):
+    """(코스피, 코스닥) 튜플 또는 MarketIndexService -> (코스피, 코스닥) 등락률"""
+    if isinstance(market, MarketIndexService):
+        return market.rates()
+    return market
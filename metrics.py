@@ -0,0 +1,124 @@
+# metrics.py
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from config import METRICS_WINDOW
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class RollingHistogram:
+    """
+    [이동 히스토그램] 최근 window개 관측값으로 p50/p95/p99를 계산합니다.
+    count/sum은 프로그램 시작 후 누적 (Prometheus summary 형식)
+    """
+    def __init__(self, window=METRICS_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.samples:
+            return {q: 0.0 for q in qs}
+        values = np.quantile(np.fromiter(self.samples, dtype=float), qs)
+        return dict(zip(qs, values.tolist()))
+
+class MetricsRegistry:
+    """
+    [지연 시간 수집기] 이름 + 라벨 조합별 이동 히스토그램 (여러 스레드에서 동시에 기록 가능)
+    - observe("kis_http_request_seconds", 0.12, endpoint=..., tr_id=..., status="200", retry="0")
+    - with timer("bot_stage_seconds", stage="inference"): ...
+    to_json() / to_prometheus()로 내보냅니다.
+    """
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.series = {}   # (이름, ((라벨, 값), ...)) -> RollingHistogram
+        self.lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            hist = self.series.get(key)
+            if hist is None:
+                hist = self.series[key] = RollingHistogram(self.window)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """[{name, labels, count, sum, max, p50, p95, p99}, ...] (이름, 누적 시간 큰 순)"""
+        with self.lock:
+            items = [(name, labels, hist.count, hist.sum, hist.max, hist.quantiles())
+                     for (name, labels), hist in self.series.items()]
+        rows = []
+        for name, labels, count, total, peak, qs in items:
+            row = {'name': name, 'labels': dict(labels), 'count': count, 'sum': round(total, 6), 'max': round(peak, 6)}
+            row.update({f"p{int(q * 100)}": round(v, 6) for q, v in qs.items()})
+            rows.append(row)
+        rows.sort(key=lambda r: (r['name'], -r['sum']))
+        return rows
+
+    def to_json(self):
+        return json.dumps({'generated_at': time.strftime("%Y-%m-%d %H:%M:%S"), 'window': self.window,
+                           'metrics': self.snapshot()}, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus 텍스트 형식 (summary: quantile 라벨 + _sum + _count)"""
+        lines, typed = [], set()
+        for row in self.snapshot():
+            name = row['name']
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            base = [f'{k}="{_escape(v)}"' for k, v in row['labels'].items()]
+            for q in QUANTILES:
+                labels = ",".join(base + [f'quantile="{q}"'])
+                lines.append(f"{name}{{{labels}}} {row[f'p{int(q * 100)}']}")
+            labels = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{name}_sum{labels} {row['sum']}")
+            lines.append(f"{name}_count{labels} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, json_path=None, prom_path=None):
+        # 임시 파일에 쓰고 교체 (수집기가 반쯤 쓴 파일을 읽지 않도록)
+        for path, text in ((json_path, self.to_json), (prom_path, self.to_prometheus)):
+            if not path: continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text())
+            os.replace(tmp, path)
+
+    def report(self, name, top=10):
+        """사람이 읽는 요약표 (누적 시간 상위 top개)"""
+        rows = [r for r in self.snapshot() if r['name'] == name][:top]
+        lines = [f"⏱️ {name} (누적 시간 순)"]
+        for r in rows:
+            label = " ".join(f"{k}={v}" for k, v in r['labels'].items())
+            lines.append(f"   {label:<60} n={r['count']:<5} p50={r['p50'] * 1000:7.1f}ms "
+                         f"p95={r['p95'] * 1000:7.1f}ms p99={r['p99'] * 1000:7.1f}ms 합계={r['sum']:.2f}s")
+        return "\n".join(lines)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# 프로세스 전체가 공유하는 기본 수집기
+registry = MetricsRegistry()
+observe = registry.observe
+timer = registry.timer
@@ -34,4 +34,31 @@ class ScalpingLSTM(nn.Module):
         
         # 마지막 시간대의 결과만 사용
         out = self.fc(out[:, -1, :])
-        return out
\ No newline at end of file
+        return out
+
+def score_batch(model, input_tensors):
+    """
+    [배치 예측] 여러 종목을 한 번의 forward로 채점합니다.
+    - input_tensors: {종목코드: (1, SEQ_LEN, 10) 텐서 또는 None}
+    - 반환: {종목코드: 점수} (점수 = AI 예측가 - 현재 정규화 종가 = 상승 여력)
+    None(전처리 실패) 종목은 결과에서 빠집니다.
+    """
+    symbols = [sym for sym, tensor in input_tensors.items() if tensor is not None]
+    if not symbols:
+        return {}
+
+    try:
+        # (N, SEQ_LEN, 10) 한 덩어리로 쌓아서 LSTM 1회 호출
+        batch = torch.cat([input_tensors[sym] for sym in symbols], dim=0)
+        with torch.no_grad():
+            model.eval()
+            predictions = model(batch).squeeze(1)   # (N,) AI 예측가 (0~1)
+
+        # 현재 가격 = 마지막 시점의 0번째 피쳐 (정규화된 종가)
+        current_scaled_prices = batch[:, -1, 0]
+        scores = (predictions - current_scaled_prices).cpu().tolist()
+        return dict(zip(symbols, scores))
+
+    except Exception as e:
+        # print(f"⚠️ 배치 예측 에러: {e}")
+        return {sym: 0.0 for sym in symbols}
\ No newline at end of file
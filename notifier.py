@@ -1,40 +1,163 @@
 # notifier.py
-import requests
 import json
+import time
+import queue
+import atexit
+import threading
 from datetime import datetime
+import requests
 from config import DISCORD_WEBHOOK_URL
+from config import NOTIFY_MAX_QUEUE, NOTIFY_LINGER_SEC, NOTIFY_TIMEOUT, NOTIFY_MAX_RETRIES, NOTIFY_FLUSH_SEC
+
+# 디스코드 웹훅 한도: 메시지 1개당 embed 10개, embed 글자 수 합계 6000자, 설명 4096자
+MAX_EMBEDS = 10
+MAX_TOTAL_CHARS = 6000
+MAX_DESCRIPTION = 4096
+
+def make_embed(title, description, color=0x00ff00):
+    # 현재 시간을 "2023-10-25 09:30:00" 같은 문자열로 예쁘게 만듭니다. (보낼 때가 아니라 만들 때 시각)
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "title": str(title)[:256],
+        "description": str(description)[:MAX_DESCRIPTION],
+        "color": color,
+        # [수정] timestamp 필드를 삭제하여 디스코드의 자동 변환을 막습니다.
+        # 대신 footer(꼬리말)에 시간을 직접 적습니다.
+        "footer": {
+            "text": f"알림 시간: {now_str}"
+        }
+    }
+
+def embed_size(embed):
+    return len(embed["title"]) + len(embed["description"]) + len(embed["footer"]["text"])
+
+class Notifier:
+    """
+    [비동기 디스코드 알림]
+    send()는 큐에 넣고 바로 반환하고, 백그라운드 스레드가 웹훅으로 전송합니다. (매매 루프를 절대 막지 않음)
+    - 몰려온 알림(전량 매도 등)은 linger초 동안 모아 메시지 1개에 embed 최대 10개씩 묶어 전송 (보낸 순서 유지)
+    - 429(너무 많은 요청)면 retry_after만큼 쉬고 같은 묶음을 재전송, 그 외 실패는 점점 길게 쉬며 재시도
+    - 큐가 가득 차면 새 알림은 버림 (dropped 카운트)
+    - flush(): 남은 알림을 다 보낼 때까지 (최대 timeout초) 기다림 - 프로그램 종료 시 자동 호출
+    """
+    def __init__(self, webhook_url, max_queue=NOTIFY_MAX_QUEUE, linger=NOTIFY_LINGER_SEC,
+                 timeout=NOTIFY_TIMEOUT, max_retries=NOTIFY_MAX_RETRIES):
+        self.webhook_url = webhook_url
+        self.linger = linger
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        self.carry = None    # 직전 묶음에 못 넣은 알림 (큐에서 꺼냈지만 아직 전송 전)
+        self.stats = {"queued": 0, "sent": 0, "posts": 0, "dropped": 0, "rate_limited": 0, "failed": 0}
+        self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self.thread.start()
+
+    def send(self, embed):
+        try:
+            self.queue.put_nowait(embed)
+            self.stats["queued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def flush(self, timeout=NOTIFY_FLUSH_SEC):
+        """큐가 빌 때까지 기다림. 시간 안에 다 보냈으면 True"""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _take_batch(self, first):
+        # 첫 알림 이후 linger초 동안 들어오는 알림을 한도(10개 / 6000자)까지 모음
+        batch, chars = [first], embed_size(first)
+        deadline = time.monotonic() + self.linger
+        while len(batch) < MAX_EMBEDS:
+            remaining = deadline - time.monotonic()
+            try:
+                embed = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if chars + embed_size(embed) > MAX_TOTAL_CHARS:
+                self.carry = embed    # 글자 수 한도를 넘기는 알림은 다음 묶음의 첫 알림으로 (순서 유지)
+                break
+            batch.append(embed)
+            chars += embed_size(embed)
+        return batch
+
+    def _run(self):
+        while True:
+            if self.carry is not None:
+                first, self.carry = self.carry, None
+            else:
+                first = self.queue.get()
+            batch = self._take_batch(first)
+            try:
+                self._post(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _post(self, embeds):
+        backoff = 1.0
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    self.webhook_url,
+                    data=json.dumps({"embeds": embeds}),
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.timeout
+                )
+                self.stats["posts"] += 1
+                if response.status_code in (200, 204):
+                    self.stats["sent"] += len(embeds)
+                    return True
+                if response.status_code == 429:
+                    # 디스코드가 알려준 대기 시간 (본문 retry_after 또는 Retry-After 헤더, 초)
+                    self.stats["rate_limited"] += 1
+                    try:
+                        wait = float(response.json().get("retry_after", 0))
+                    except ValueError:
+                        wait = 0
+                    time.sleep(wait or float(response.headers.get("Retry-After", backoff)))
+                    continue
+                print(f"⚠️ 디스코드 전송 실패: {response.status_code}")
+                if response.status_code < 500:
+                    break   # 잘못된 요청은 재시도해도 같음
+            except Exception as e:
+                print(f"⚠️ 알림 전송 중 에러 발생: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+        self.stats["failed"] += len(embeds)
+        return False
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+def get_notifier():
+    """프로세스 공용 Notifier (처음 쓸 때 생성 + 종료 시 flush 등록)"""
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None or _notifier.webhook_url != DISCORD_WEBHOOK_URL:
+            _notifier = Notifier(DISCORD_WEBHOOK_URL)
+            atexit.register(_notifier.flush)
+        return _notifier
 
 def send_message(title, description, color=0x00ff00):
     """
-    디스코드 채널로 메시지 전송 (시간 오류 수정 버전)
+    디스코드 채널로 메시지 전송 (큐에 넣고 바로 반환, 실제 전송은 백그라운드)
     """
     if not DISCORD_WEBHOOK_URL:
         # URL이 없으면 조용히 리턴 (에러 로그 출력 X)
         return
+    get_notifier().send(make_embed(title, description, color))
 
-    # 현재 시간을 "2023-10-25 09:30:00" 같은 문자열로 예쁘게 만듭니다.
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    data = {
-        "embeds": [{
-            "title": title,
-            "description": description,
-            "color": color,
-            # [수정] timestamp 필드를 삭제하여 디스코드의 자동 변환을 막습니다.
-            # 대신 footer(꼬리말)에 시간을 직접 적습니다.
-            "footer": {
-                "text": f"알림 시간: {now_str}" 
-            }
-        }]
-    }
-
-    try:
-        response = requests.post(
-            DISCORD_WEBHOOK_URL, 
-            data=json.dumps(data), 
-            headers={"Content-Type": "application/json"}
-        )
-        if response.status_code != 204:
-            print(f"⚠️ 디스코드 전송 실패: {response.status_code}")
-    except Exception as e:
-        print(f"⚠️ 알림 전송 중 에러 발생: {e}")
\ No newline at end of file
+def flush(timeout=NOTIFY_FLUSH_SEC):
+    """보내지 못한 알림이 있으면 다 보낼 때까지 기다림 (최대 timeout초)"""
+    if _notifier is not None:
+        return _notifier.flush(timeout)
+    return True
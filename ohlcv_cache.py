@@ -0,0 +1,161 @@
+# ohlcv_cache.py
+import time
+import threading
+from collections import deque
+import pandas as pd
+from config import OHLCV_CACHE_BARS, OHLCV_PAGE_SIZE, OHLCV_REFRESH_SEC
+
+def bar_key(bar):
+    # 봉 식별 키: 영업일자 + 체결시간 (날짜가 없으면 시간만)
+    return f"{bar.get('stck_bsop_date', '')}{bar['stck_cntg_hour']}"
+
+class OHLCVCache:
+    """
+    [종목별 분봉 캐시]
+    매 루프마다 60개를 통째로 다시 받지 않고, 새로 생긴 봉만 받아서 이어 붙입니다.
+    - 종목별로 최대 max_bars개를 링버퍼(deque)에 보관 (stck_cntg_hour 기준, 과거 -> 최신)
+    - 캐시가 충분하면 최신 1페이지(30개)만 조회해서 병합
+      (같은 시간의 봉은 덮어씀 -> 진행 중인 마지막 봉 갱신)
+    - refresh_sec 이내에 다시 요청하면 API 호출 없이 캐시 반환
+    - 중간이 비면(장 시작/장기 미조회) 전체 재조회
+    반환 형식은 KISApi.fetch_ohlcv와 같습니다 (최신순 DataFrame).
+    """
+    def __init__(self, max_bars=OHLCV_CACHE_BARS, refresh_sec=OHLCV_REFRESH_SEC):
+        self.max_bars = max_bars
+        self.refresh_sec = refresh_sec
+        self.bars = {}          # symbol -> deque[(key, bar)]
+        self.fetched_at = {}    # symbol -> 마지막 조회 시각
+        self.lock = threading.Lock()
+        self.stats = {"full": 0, "incremental": 0, "hit": 0}
+
+    def fetch(self, api, symbol, count=60):
+        """최근 count개 분봉을 최신순 DataFrame으로 반환 (KISApi.fetch_ohlcv 대체)"""
+        fallback = self._refresh(api, symbol, count)
+        return self._view(symbol, count, fallback=fallback)
+
+    async def fetch_async(self, async_api, symbol, count=60):
+        """fetch와 동일 (AsyncKISApi용)"""
+        fallback = await self._refresh_async(async_api, symbol, count)
+        return self._view(symbol, count, fallback=fallback)
+
+    def refresh(self, api, symbol, count=60):
+        """DataFrame 변환 없이 캐시만 갱신합니다. 보관 중인 봉 개수를 반환"""
+        self._refresh(api, symbol, count)
+        return self.size(symbol)
+
+    async def refresh_async(self, async_api, symbol, count=60):
+        await self._refresh_async(async_api, symbol, count)
+        return self.size(symbol)
+
+    def size(self, symbol):
+        with self.lock:
+            return len(self.bars.get(symbol, ()))
+
+    def bars_since(self, symbol, key):
+        """
+        key 이후(key 포함)의 봉 목록 [(key, bar), ...] (과거 -> 최신)과 리셋 여부를 반환합니다.
+        key가 None이거나 캐시가 key보다 뒤에서 시작하면(중간 공백) 전체 봉 + reset=True.
+        새 봉 개수만큼만 뒤에서부터 훑으므로 보통 1~2개만 반환됩니다.
+        """
+        with self.lock:
+            buf = self.bars.get(symbol)
+            if not buf:
+                return [], True
+            if key is None or buf[0][0] > key:
+                return list(buf), True
+            out = []
+            for item in reversed(buf):
+                if item[0] < key:
+                    break
+                out.append(item)
+            return out[::-1], False
+
+    def _refresh(self, api, symbol, count):
+        # 필요한 만큼만 API 조회 후 병합. 캐시할 수 없는 응답이면 그 DataFrame을 반환
+        request_count = self._plan(symbol, count)
+        if request_count == 0:
+            return None
+
+        df = api.fetch_ohlcv(symbol, timeframe='3m', count=request_count)
+        if not self._merge(symbol, df, full=(request_count >= count)):
+            # 중간이 빔 -> 전체 재조회
+            df = api.fetch_ohlcv(symbol, timeframe='3m', count=count)
+            self._merge(symbol, df, full=True)
+        return df
+
+    async def _refresh_async(self, async_api, symbol, count):
+        request_count = self._plan(symbol, count)
+        if request_count == 0:
+            return None
+
+        df = await async_api.fetch_ohlcv(symbol, timeframe='3m', count=request_count)
+        if not self._merge(symbol, df, full=(request_count >= count)):
+            df = await async_api.fetch_ohlcv(symbol, timeframe='3m', count=count)
+            self._merge(symbol, df, full=True)
+        return df
+
+    def retain(self, symbols):
+        """감시 대상(유니버스 + 보유 종목)에서 빠진 종목의 캐시를 삭제합니다."""
+        keep = set(symbols)
+        with self.lock:
+            for sym in list(self.bars):
+                if sym not in keep:
+                    del self.bars[sym]
+                    self.fetched_at.pop(sym, None)
+
+    def _plan(self, symbol, count):
+        # 이번에 API로 요청할 봉 개수 (0 = 호출 불필요)
+        with self.lock:
+            buf = self.bars.get(symbol)
+            if buf is None or len(buf) < count:
+                self.stats["full"] += 1
+                return count
+            if time.monotonic() - self.fetched_at[symbol] < self.refresh_sec:
+                self.stats["hit"] += 1
+                return 0
+            self.stats["incremental"] += 1
+            return OHLCV_PAGE_SIZE
+
+    def _merge(self, symbol, df, full):
+        # 조회 결과를 캐시에 반영. 이어 붙일 수 없으면(중간 공백) False 반환
+        if df is None or df.empty or 'stck_cntg_hour' not in df.columns:
+            return True
+
+        # API 응답은 최신순 -> 과거순으로 뒤집어서 처리
+        records = df.to_dict('records')[::-1]
+
+        with self.lock:
+            buf = self.bars.get(symbol)
+            if full or buf is None or not buf:
+                buf = deque(maxlen=self.max_bars)
+                for bar in records:
+                    key = bar_key(bar)
+                    if buf and buf[-1][0] == key:
+                        buf[-1] = (key, bar)
+                    elif not buf or key > buf[-1][0]:
+                        buf.append((key, bar))
+                self.bars[symbol] = buf
+                self.fetched_at[symbol] = time.monotonic()
+                return True
+
+            last_key = buf[-1][0]
+            if bar_key(records[0]) > last_key:
+                return False
+
+            for bar in records:
+                key = bar_key(bar)
+                if key == buf[-1][0]:
+                    buf[-1] = (key, bar)    # 진행 중이던 봉 갱신
+                elif key > buf[-1][0]:
+                    buf.append((key, bar))  # 새 봉 추가
+            self.fetched_at[symbol] = time.monotonic()
+            return True
+
+    def _view(self, symbol, count, fallback=None):
+        # 캐시에서 최근 count개를 최신순 DataFrame으로 반환
+        with self.lock:
+            buf = self.bars.get(symbol)
+            if not buf:
+                return fallback
+            bars = [bar for _, bar in list(buf)[-count:]]
+        return pd.DataFrame(bars[::-1])
@@ -0,0 +1,66 @@
+# order_book.py
+import time
+import threading
+from config import ORDER_BOOK_RECONCILE_SEC
+
+class OrderBook:
+    """
+    [로컬 미체결 주문 장부]
+    매수/매도/취소할 때 메모리에서 바로 갱신하고, 주기적으로 서버 미체결 내역(inquire-daily-ccld)과 맞춥니다.
+    - 풀방 체크 같은 '미체결 몇 건?' 질문은 API 호출 없이 여기서 답함
+    - reconcile()은 서버 목록으로 통째로 교체 (단, 조회 도중 새로 낸 주문은 유지)
+    - 시장가 주문은 보통 바로 체결되므로 다음 동기화 때 장부에서 빠짐
+    """
+    def __init__(self, reconcile_sec=ORDER_BOOK_RECONCILE_SEC):
+        self.reconcile_sec = reconcile_sec
+        self.orders = {}        # 주문번호 -> {symbol, side, qty, submitted_at}
+        self.synced_at = None   # 마지막 서버 동기화 시각
+        self.lock = threading.Lock()
+
+    def add(self, odno, symbol, side, qty):
+        # side: "buy" / "sell"
+        with self.lock:
+            self.orders[odno] = {'symbol': symbol, 'side': side, 'qty': int(qty), 'submitted_at': time.monotonic()}
+
+    def remove(self, odno):
+        with self.lock:
+            self.orders.pop(odno, None)
+
+    def count(self):
+        with self.lock:
+            return len(self.orders)
+
+    def pending_count(self, exclude=()):
+        """exclude(보통 보유 종목)에 없는 종목의 미체결 건수 -> 보유 슬롯을 추가로 차지할 주문"""
+        with self.lock:
+            return sum(1 for order in self.orders.values() if order['symbol'] not in exclude)
+
+    def needs_reconcile(self):
+        """아직 서버로 확인 안 된 주문이 남아 있거나, 마지막 동기화가 오래됐으면 True"""
+        with self.lock:
+            if self.synced_at is None or self.orders:
+                return True
+            return time.monotonic() - self.synced_at > self.reconcile_sec
+
+    def reconcile(self, unfilled_list, started_at):
+        """
+        서버 미체결 목록으로 장부를 교체합니다.
+        started_at: 서버 조회를 시작한 시각 (그 이후에 낸 로컬 주문은 서버 목록에 없어도 유지)
+        """
+        orders = {}
+        for item in unfilled_list:
+            odno = item.get('odno')
+            if not odno:
+                continue
+            orders[odno] = {
+                'symbol': item.get('pdno', ''),
+                'side': "sell" if item.get('sll_buy_dvsn_cd') == "01" else "buy",
+                'qty': int(item.get('rmn_qty') or item.get('ord_qty') or 0),
+                'submitted_at': started_at
+            }
+        with self.lock:
+            for odno, order in self.orders.items():
+                if order['submitted_at'] > started_at and odno not in orders:
+                    orders[odno] = order
+            self.orders = orders
+            self.synced_at = started_at
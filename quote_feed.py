@@ -0,0 +1,167 @@
+# quote_feed.py
+import json
+import time
+import threading
+import websocket
+from config import WS_URL, WS_MAX_SUBSCRIPTIONS, WS_RECONNECT_SEC, QUOTE_MAX_AGE_SEC
+
+QUOTE_TR_ID = "H0STCNT0"  # 국내주식 실시간 체결가
+
+class QuoteFeed:
+    """
+    [실시간 시세 수신기 - WebSocket]
+    REST로 현재가를 매번 조회하는 대신, 체결가를 실시간으로 받아 메모리 시세표에 보관합니다.
+    - set_symbols()로 구독 종목(보유 + 후보)을 지정하면 차이만 구독/해지
+    - 끊기면 자동 재접속 후 전체 재구독
+    - get_price()는 메모리 조회 (오래된 시세/미연결이면 None -> 호출자가 REST로 대체)
+    url을 바꾸면 로컬 테스트 서버에도 붙일 수 있습니다.
+    """
+    def __init__(self, approval_key, url=WS_URL, max_subscriptions=WS_MAX_SUBSCRIPTIONS):
+        self.approval_key = approval_key
+        self.url = url
+        self.max_subscriptions = max_subscriptions
+
+        self.prices = {}        # symbol -> (현재가, 수신 시각)
+        self.wanted = []        # 구독 희망 목록 (우선순위 순서)
+        self.subscribed = set() # 실제 구독 요청을 보낸 종목
+        self.lock = threading.Lock()
+
+        self.ws = None
+        self.connected = False
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="quote-feed", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.ws is not None:
+            self.ws.close()
+
+    def set_symbols(self, symbols):
+        """
+        구독할 종목 목록 지정 (앞쪽이 우선순위 높음, 최대 max_subscriptions개)
+        보유 종목을 먼저 넘기면 한도를 넘어도 보유 종목은 항상 구독됩니다.
+        """
+        wanted = list(dict.fromkeys(symbols))[:self.max_subscriptions]
+        with self.lock:
+            self.wanted = wanted
+            to_remove = [sym for sym in self.subscribed if sym not in wanted]
+            to_add = [sym for sym in wanted if sym not in self.subscribed]
+
+        if not self.connected:
+            return  # 접속되면 on_open에서 일괄 구독
+        for sym in to_remove:
+            self._send(sym, "2")
+        for sym in to_add:
+            self._send(sym, "1")
+
+    def get_price(self, symbol, max_age=QUOTE_MAX_AGE_SEC):
+        """실시간 체결가 (없거나 max_age초보다 오래됐으면 None)"""
+        if not self.connected:
+            return None
+        with self.lock:
+            item = self.prices.get(symbol)
+        if item is None:
+            return None
+        price, received_at = item
+        if time.monotonic() - received_at > max_age:
+            return None
+        return price
+
+    def _run(self):
+        while self.running:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self.ws.run_forever()
+            self.connected = False
+            if self.running:
+                print(f"   ⚠️ [시세 수신] 연결 끊김 -> {WS_RECONNECT_SEC}초 후 재접속")
+                time.sleep(WS_RECONNECT_SEC)
+
+    def _send(self, symbol, tr_type):
+        # tr_type: "1" 구독, "2" 해지
+        msg = {
+            "header": {
+                "approval_key": self.approval_key,
+                "custtype": "P",
+                "tr_type": tr_type,
+                "content-type": "utf-8"
+            },
+            "body": {"input": {"tr_id": QUOTE_TR_ID, "tr_key": symbol}}
+        }
+        try:
+            self.ws.send(json.dumps(msg))
+        except Exception as e:
+            print(f"   ⚠️ [시세 수신] 구독 요청 실패({symbol}): {e}")
+            return
+
+        with self.lock:
+            if tr_type == "1":
+                self.subscribed.add(symbol)
+            else:
+                self.subscribed.discard(symbol)
+                self.prices.pop(symbol, None)
+
+    def _on_open(self, ws):
+        self.connected = True
+        with self.lock:
+            self.subscribed.clear()
+            wanted = list(self.wanted)
+        print(f"📶 [시세 수신] WebSocket 연결 완료 ({len(wanted)}종목 구독)")
+        for sym in wanted:
+            self._send(sym, "1")
+
+    def _on_message(self, ws, message):
+        if not message:
+            return   # 빈 프레임
+        # 실시간 데이터: "0|H0STCNT0|건수|필드^필드^..." (0: 평문, 1: 암호화)
+        if message[0] in ("0", "1"):
+            parts = message.split("|", 3)
+            if len(parts) < 4 or parts[0] != "0" or parts[1] != QUOTE_TR_ID:
+                return
+            self._handle_trades(int(parts[2]), parts[3].split("^"))
+            return
+
+        # 그 외: JSON (구독 응답, PINGPONG)
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        tr_id = data.get("header", {}).get("tr_id")
+        if tr_id == "PINGPONG":
+            ws.send(message)  # 서버 핑에 그대로 응답해야 연결 유지
+            return
+        body = data.get("body", {})
+        if body.get("rt_cd") not in (None, "0"):
+            print(f"   ⚠️ [시세 수신] {data['header'].get('tr_key')}: {body.get('msg1')}")
+
+    def _handle_trades(self, count, fields):
+        # 여러 건이 한 메시지로 오면 필드를 건수만큼 나눔 (0: 종목코드, 2: 체결가)
+        if count <= 0:
+            return
+        size = len(fields) // count
+        now = time.monotonic()
+        with self.lock:
+            for i in range(count):
+                record = fields[i * size:(i + 1) * size]
+                try:
+                    self.prices[record[0]] = (int(record[2]), now)
+                except (IndexError, ValueError):
+                    continue
+
+    def _on_error(self, ws, error):
+        print(f"   ⚠️ [시세 수신] 에러: {error}")
+
+    def _on_close(self, ws, status_code, msg):
+        self.connected = False
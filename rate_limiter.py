@@ -0,0 +1,57 @@
+# rate_limiter.py
+import time
+import threading
+
+class TokenBucket:
+    """
+    [토큰 버킷] 초당 rate개의 토큰이 채워지고, 최대 capacity개까지 쌓입니다.
+    호출 1건 = 토큰 1개. 토큰이 남아 있으면 기다리지 않고 바로 통과합니다.
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(max(capacity, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, n=1):
+        """
+        토큰 n개를 예약하고, 실제로 쓸 수 있을 때까지 기다려야 할 시간(초)을 반환합니다.
+        (토큰이 모자라면 빚을 지는 방식 -> 여러 스레드가 동시에 불러도 순서대로 간격이 벌어짐)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= n
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class RateLimiter:
+    """
+    [API 호출 한도 관리자]
+    - 계좌 전체 한도(초당 N건)를 전역 버킷 하나로 관리
+    - 특정 TR ID에 별도 한도가 있으면 TR 전용 버킷을 추가로 적용
+    예산이 남아 있으면 즉시 통과, 다 썼을 때만 필요한 만큼 대기합니다.
+    """
+    def __init__(self, rate, per_tr=None, burst=1):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.tr_buckets = {}
+        for tr_id, tr_rate in (per_tr or {}).items():
+            self.tr_buckets[tr_id] = TokenBucket(tr_rate, 1)
+
+    def reserve(self, tr_id=None):
+        """대기해야 할 시간(초)을 반환 (sleep은 호출자가 직접 -> asyncio에서도 사용 가능)"""
+        wait = self.global_bucket.reserve()
+        bucket = self.tr_buckets.get(tr_id)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve())
+        return wait
+
+    def acquire(self, tr_id=None):
+        """예산이 생길 때까지 블록한 뒤 반환합니다. (대기한 시간 반환)"""
+        wait = self.reserve(tr_id)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
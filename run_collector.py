@@ -1,6 +1,5 @@
 # run_collector.py
 import os
-import time
 import pandas as pd
 from kis_api import KISApi
 
@@ -34,17 +33,16 @@ def run():
         df = api.fetch_ohlcv(symbol, timeframe='3m', count=500)
         
         if df is not None and not df.empty:
-            # 필요한 기본 컬럼 선택 (API 응답 키값 기준)
-            df_save = df[['stck_prpr', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'cntg_vol']]
+            # 필요한 기본 컬럼 선택 (API 응답 키값 기준) + 영업일자/체결시각 (백테스트가 거래일 단위로 맞출 때 사용)
+            # (야후 대체 데이터처럼 시각 컬럼이 없으면 가격/거래량만)
+            cols = ['stck_bsop_date', 'stck_cntg_hour', 'stck_prpr', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'cntg_vol']
+            df_save = df[[col for col in cols if col in df.columns]]
             
             # CSV 저장
             df_save.to_csv(f"data/raw/{symbol}_3min.csv", index=False)
             print("완료")
         else:
             print("실패 (데이터 없음)")
-        
-        # API 호출 제한 방지
-        time.sleep(0.3)
 
     print("\n🎉 모든 데이터 수집이 완료되었습니다!")
     print("이제 'python train.py'를 실행하여 똑똑해진 AI를 학습시키세요.")
@@ -1,11 +1,16 @@
 # sheet_logger.py
+import time
+import queue
+import atexit
+import threading
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import yfinance as yf
 from datetime import datetime
+from config import SHEET_BATCH_SEC, SHEET_MAX_ROWS, SHEET_MAX_QUEUE, SHEET_MAX_RETRIES, SHEET_RETRY_SEC, SHEET_FLUSH_SEC
 
 # 1. 인증 설정 (JSON 파일 필요)
-def get_sheet():
+def open_sheet():
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     try:
         creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", scope)
@@ -17,6 +22,17 @@ def get_sheet():
         print(f"⚠️ 구글 시트 연결 실패: {e} (JSON 키 파일과 공유 설정을 확인하세요)")
         return None
 
+_sheet = None
+_sheet_lock = threading.Lock()
+
+def get_sheet(refresh=False):
+    """인증 + 시트 열기는 처음 한 번만 하고 재사용 (refresh=True면 다시 연결, 실패했으면 다음 호출 때 재시도)"""
+    global _sheet
+    with _sheet_lock:
+        if _sheet is None or refresh:
+            _sheet = open_sheet()
+        return _sheet
+
 # 2. 시장 지수 가져오기 (야후 파이낸스)
 # 2. 시장 지수 및 등락률 가져오기 (야후 파이낸스)
 def get_market_indices():
@@ -51,12 +67,135 @@ def get_market_indices():
         print(f"⚠️ 지수 조회 실패: {e}")
         return "0.00", "0.00%", "0.00", "0.00%"
 
+def format_market_indices(snapshot):
+    """MarketIndexService 스냅샷 -> get_market_indices()와 같은 형식 (지수를 모르면 "-")"""
+    def fmt(value, rate):
+        return (f"{value:.2f}" if value is not None else "-"), f"{rate:+.2f}%"
+    ks_val, ks_rate = fmt(snapshot.kospi_value, snapshot.kospi)
+    kq_val, kq_rate = fmt(snapshot.kosdaq_value, snapshot.kosdaq)
+    return ks_val, ks_rate, kq_val, kq_rate
+
+def error_status(e):
+    # gspread.exceptions.APIError 등 -> HTTP 상태코드 (모르면 None)
+    return getattr(getattr(e, "response", None), "status_code", None)
+
+class SheetWriter:
+    """
+    [비동기 구글 시트 기록기]
+    append()는 행을 큐에 넣고 바로 반환하고, 백그라운드 스레드가 모아서 append_rows 한 번으로 기록합니다.
+    - 첫 행 이후 batch_sec초 동안 들어온 행을 최대 max_rows개까지 묶음
+    - 할당량 초과(429) / 서버 오류(5xx)면 retry_sec부터 두 배씩 쉬며 재시도, 그 외 오류는 시트를 다시 열고 재시도
+    - 지수 칸이 비어 있는 행은 기록 직전에 yfinance로 채움 (메인 루프에서 다운로드하지 않도록)
+    - sheet_factory(refresh)만 바꾸면 가짜 gspread 시트로 테스트할 수 있습니다.
+    """
+    def __init__(self, sheet_factory=get_sheet, batch_sec=SHEET_BATCH_SEC, max_rows=SHEET_MAX_ROWS,
+                 max_queue=SHEET_MAX_QUEUE, max_retries=SHEET_MAX_RETRIES, retry_sec=SHEET_RETRY_SEC):
+        self.sheet_factory = sheet_factory
+        self.batch_sec = batch_sec
+        self.max_rows = max_rows
+        self.max_retries = max_retries
+        self.retry_sec = retry_sec
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {"queued": 0, "written": 0, "writes": 0, "retries": 0, "dropped": 0, "failed": 0}
+        self.thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self.thread.start()
+
+    def append(self, row, needs_index=False):
+        try:
+            self.queue.put_nowait((row, needs_index))
+            self.stats["queued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+            print("⚠️ 시트 기록 대기열이 가득 차서 1행을 버립니다.")
+
+    def flush(self, timeout=SHEET_FLUSH_SEC):
+        """대기 중인 행을 다 기록할 때까지 기다림. 시간 안에 끝났으면 True"""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _take_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.batch_sec
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(self.queue.get())
+            try:
+                rows = [row for row, _ in batch]
+                if any(needs_index for _, needs_index in batch):
+                    ks_val, ks_rate, kq_val, kq_rate = get_market_indices()
+                    rows = [row + [f"{ks_val} ({ks_rate})", f"{kq_val} ({kq_rate})"] if needs_index else row
+                            for row, needs_index in batch]
+                self._write(rows)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                print(f"❌ 시트 기록 중 에러: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, rows):
+        wait = self.retry_sec
+        refresh = False
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                time.sleep(wait)
+                wait = min(wait * 2, 60)
+
+            sheet = self.sheet_factory(refresh=refresh)
+            if sheet is None:
+                refresh = True
+                continue
+            try:
+                sheet.append_rows(rows)
+                self.stats["writes"] += 1
+                self.stats["written"] += len(rows)
+                print(f"📝 구글 시트 기록 완료! ({len(rows)}행)")
+                return True
+            except Exception as e:
+                status = error_status(e)
+                if status == 429 or (status is not None and status >= 500):
+                    print(f"⚠️ 구글 시트 할당량/서버 오류({status}) -> {wait}초 후 재시도")
+                else:
+                    print(f"⚠️ 시트 기록 실패: {e} -> 다시 연결 후 재시도")
+                    refresh = True
+
+        self.stats["failed"] += len(rows)
+        print(f"❌ 시트 기록 포기: {len(rows)}행")
+        return False
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """프로세스 공용 SheetWriter (처음 쓸 때 생성 + 종료 시 flush 등록)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SheetWriter()
+            atexit.register(_writer.flush)
+        return _writer
+
 # 3. 로그 기록 함수
 # 3. 로그 기록 함수
-def log_to_sheet(report_type, start_money, current_money, profit):
-    sheet = get_sheet()
-    if sheet is None: return
-
+def log_to_sheet(report_type, start_money, current_money, profit, market_index=None, writer=None):
+    """
+    [매매일지 기록] 행을 만들어 기록 대기열에 넣고 바로 반환합니다. (실제 기록은 SheetWriter 스레드)
+    """
     now = datetime.now()
     date_str = now.strftime("%Y-%m-%d")
     time_str = now.strftime("%H:%M:%S")
@@ -64,9 +203,6 @@ def log_to_sheet(report_type, start_money, current_money, profit):
     # 내 수익률
     profit_rate = (profit / start_money * 100) if start_money > 0 else 0
     
-    # 시장 지수 (지수, 등락률)
-    ks_val, ks_rate, kq_val, kq_rate = get_market_indices()
-    
     # 행 데이터 생성 (컬럼이 늘어납니다)
     row = [
         date_str, 
@@ -76,12 +212,21 @@ def log_to_sheet(report_type, start_money, current_money, profit):
         f"{current_money:,}", # 현재자산
         f"{profit:,}",        # 손익금
         f"{profit_rate:+.2f}%",# 내 수익률
-        f"{ks_val} ({ks_rate})", # 코스피 (예: 2500.00 (+1.2%))
-        f"{kq_val} ({kq_rate})"  # 코스닥 (예: 800.00 (-0.5%))
     ]
-    
-    try:
-        sheet.append_row(row)
-        print(f"📝 구글 시트 기록 완료! (코스피: {ks_rate}, 코스닥: {kq_rate})")
-    except Exception as e:
-        print(f"❌ 시트 기록 중 에러: {e}")
\ No newline at end of file
+
+    # 시장 지수 (지수, 등락률) - 백그라운드 갱신 값이 있으면 재조회 없이 사용, 없으면 기록 스레드가 채움
+    needs_index = market_index is None or market_index.stale
+    if not needs_index:
+        ks_val, ks_rate, kq_val, kq_rate = format_market_indices(market_index.get())
+        row += [
+            f"{ks_val} ({ks_rate})", # 코스피 (예: 2500.00 (+1.2%))
+            f"{kq_val} ({kq_rate})"  # 코스닥 (예: 800.00 (-0.5%))
+        ]
+
+    (writer or get_writer()).append(row, needs_index)
+
+def flush(timeout=SHEET_FLUSH_SEC):
+    """기록하지 못한 행이 있으면 다 기록할 때까지 기다림 (최대 timeout초)"""
+    if _writer is not None:
+        return _writer.flush(timeout)
+    return True
@@ -0,0 +1,149 @@
+# sweep.py
+import os
+import glob
+import time
+import random
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader
+from model import ScalpingLSTM
+from config import TOP_N
+from corpus import CorpusDataset, CORPUS_DIR, RAW_GLOB, META_FILE, build_corpus
+from train import time_split, fit, PREP_WORKERS
+
+# [설정]
+SWEEP_MODE = "grid"        # "grid": 전체 조합 / "random": N_TRIALS개 무작위 추출
+N_TRIALS = 20
+SWEEP_WORKERS = 4          # 동시에 돌릴 실험 수 (프로세스)
+THREADS_PER_TRIAL = max(1, (os.cpu_count() or 1) // SWEEP_WORKERS)  # 실험당 CPU 스레드 (과다 경쟁 방지)
+SWEEP_EPOCHS = 30          # 실험당 최대 Epoch (조기 종료 적용)
+SWEEP_PATIENCE = 5
+SWEEP_TIME_BUDGET_MIN = 20 # 실험당 시간 예산(분)
+RESULT_PATH = "sweep_results.csv"
+SEED = 42
+
+# 탐색 범위 (model.ScalpingLSTM / train.py 설정값)
+SEARCH_SPACE = {
+    'hidden_size': [32, 64, 128],
+    'num_layers': [1, 2],
+    'dropout': [0.0, 0.2],
+    'seq_len': [10, 20],
+    'batch_size': [32, 128],
+    'lr': [0.001, 0.0003],
+}
+
+def grid_trials(space):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+def random_trials(space, n, seed=SEED):
+    # 전체 조합 중 중복 없이 n개 (조합 수보다 많이 달라면 전체)
+    trials = grid_trials(space)
+    random.Random(seed).shuffle(trials)
+    return trials[:n]
+
+def _init_worker(threads):
+    # 실험 1개가 CPU 전체를 잡아먹지 않도록 스레드 수 제한
+    torch.set_num_threads(threads)
+
+def measure_inference(model, seq_len, batch=TOP_N, repeat=20):
+    """실전과 같은 형태 (후보 TOP_N개, seq_len, 10) 1배치 예측 시간(ms)"""
+    model.eval()
+    x = torch.rand(batch, seq_len, 10)
+    with torch.no_grad():
+        for _ in range(3):
+            model(x)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model(x)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def run_trial(trial_no, params, corpus_dir=CORPUS_DIR, epochs=SWEEP_EPOCHS, patience=SWEEP_PATIENCE,
+              time_budget_sec=SWEEP_TIME_BUDGET_MIN * 60):
+    """
+    실험 1회: 공유 코퍼스(메모리맵)를 열어 학습 -> 검증 손실 / 학습 시간 / 예측 시간을 반환
+    (작업 프로세스에서 실행)
+    """
+    torch.manual_seed(SEED + trial_no)
+
+    dataset = CorpusDataset(corpus_dir, seq_len=params['seq_len'])
+    train_set, val_set = time_split(dataset)
+    train_loader = DataLoader(train_set, batch_size=params['batch_size'], shuffle=True)
+    val_loader = DataLoader(val_set, batch_size=params['batch_size'] * 4, shuffle=False)
+
+    model = ScalpingLSTM(input_size=10, hidden_size=params['hidden_size'], num_layers=params['num_layers'],
+                         output_size=1, dropout=params['dropout'] if params['num_layers'] > 1 else 0.0)
+    result = fit(model, train_loader, val_loader, lr=params['lr'], epochs=epochs, patience=patience,
+                 time_budget_sec=time_budget_sec, checkpoint_path=None, log_every=epochs + 1)
+
+    return {
+        'trial': trial_no, **params,
+        'val_loss': result['best_loss'],
+        'epochs': result['epochs'],
+        'stop_reason': result['stop_reason'],
+        'train_time_sec': round(result['train_time'], 2),
+        'infer_ms': round(measure_inference(model, params['seq_len']), 3),
+    }
+
+def run_sweep(trials, workers=SWEEP_WORKERS, threads_per_trial=THREADS_PER_TRIAL, corpus_dir=CORPUS_DIR,
+              result_path=RESULT_PATH, **fit_kwargs):
+    """
+    [하이퍼파라미터 탐색] 실험들을 프로세스 풀에서 동시에 실행하고 검증 손실 순위표(CSV)를 저장합니다.
+    모든 실험이 같은 전처리 코퍼스(메모리맵)를 공유하므로 데이터는 한 번만 준비됩니다.
+    """
+    print(f"🧪 하이퍼파라미터 탐색 시작: 실험 {len(trials)}개, 동시 {workers}개 x 스레드 {threads_per_trial}개")
+
+    # spawn: 자식 프로세스가 torch를 새로 import할 때부터 스레드 제한 적용
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_trial)
+    os.environ["MKL_NUM_THREADS"] = str(threads_per_trial)
+    ctx = multiprocessing.get_context("spawn")
+
+    rows = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(threads_per_trial,)) as pool:
+        futures = {pool.submit(run_trial, no, params, corpus_dir, **fit_kwargs): no
+                   for no, params in enumerate(trials)}
+        for future in as_completed(futures):
+            no = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"   ❌ 실험 {no} 실패: {e}")
+                continue
+            rows.append(row)
+            print(f"   ✅ 실험 {no} ({len(rows)}/{len(trials)}): 검증 손실 {row['val_loss']:.6f}, "
+                  f"학습 {row['train_time_sec']:.0f}초, 예측 {row['infer_ms']:.2f}ms")
+
+    if not rows:
+        print("⚠️ 완료된 실험이 없습니다.")
+        return None
+
+    table = pd.DataFrame(rows).sort_values('val_loss').reset_index(drop=True)
+    table.insert(0, 'rank', table.index + 1)
+    table.to_csv(result_path, index=False)
+
+    best = table.iloc[0]
+    print(f"\n🏆 최고 설정 (검증 손실 {best['val_loss']:.6f}): "
+          + ", ".join(f"{k}={best[k]}" for k in SEARCH_SPACE))
+    print(f"🎉 탐색 완료! ({time.perf_counter() - start:.0f}초) 결과 저장됨: {result_path}")
+    return table
+
+if __name__ == "__main__":
+    # 1. 공유 데이터셋 준비 (코퍼스가 없으면 한 번만 변환)
+    if not os.path.exists(os.path.join(CORPUS_DIR, META_FILE)):
+        file_list = sorted(glob.glob(RAW_GLOB))
+        if not file_list:
+            print("❌ 'data/raw' 폴더에 CSV 파일이 없습니다.")
+            raise SystemExit(1)
+        build_corpus(file_list, workers=PREP_WORKERS)
+
+    # 2. 실험 목록 -> 병렬 실행
+    if SWEEP_MODE == "random":
+        trials = random_trials(SEARCH_SPACE, N_TRIALS)
+    else:
+        trials = grid_trials(SEARCH_SPACE)
+    run_sweep(trials)
@@ -0,0 +1,185 @@
+# symbol_master.py
+import os
+import io
+import zipfile
+import threading
+import pandas as pd
+import requests
+from config import SYMBOL_MASTER_PATH
+
+# [설정] KIS 종목정보 마스터 파일 (매일 아침 갱신, cp949 고정폭)
+MASTER_URLS = {
+    "KOSPI": "https://new.real.download.dws.co.kr/common/master/kospi_code.mst.zip",
+    "KOSDAQ": "https://new.real.download.dws.co.kr/common/master/kosdaq_code.mst.zip",
+}
+# 줄 끝 고정폭 영역 길이, 줄바꿈 제외 (앞쪽 = 단축코드 9 + 표준코드 12 + 한글명)
+# KIS 예제 파서의 228 / 222는 줄바꿈(\n)까지 센 값 -> 줄바꿈을 떼고 자르므로 1씩 작음
+MASTER_TAIL = {"KOSPI": 227, "KOSDAQ": 221}
+MASTER_DIR = "data/master"
+
+# 종목명 키워드 필터 (마스터에 없는 종목용 / 마스터 종목도 로드할 때 한 번 적용)
+DIRTY_KEYWORDS = [
+    "ETN", "스팩", "인버스", "레버리지", "선물", "우B", "우선주", "리츠", "홀딩스", # 기타 상품
+    "TRUE", "QV", "SMART", "삼성머스트", "신한제", "유안타제", "하나금융", "엔에이치" # 스팩 관련
+]
+# 증권그룹코드 (ST: 주권, EF: ETF, EN: ETN, RT: 리츠, MF: 뮤추얼펀드, IF: 인프라펀드, DR: 예탁증서 ...)
+STOCK_GROUP = "ST"
+COLUMNS = ['code', 'name', 'market', 'group', 'spac', 'preferred']
+
+def is_dirty_name(name):
+    """
+    [종목명 필터] 종목명에 ETF, ETN, 스팩 등이 포함되어 있는지 검사
+    True 반환 -> 더러운 종목 (제외 대상)
+    """
+    # 이름이 없으면 위험하니까 제외
+    if not name:
+        return True
+    # 우선주 체크 (종목명 끝에 '우' 혹은 '우B'가 붙음)
+    if name.endswith("우") or name.endswith("우B"):
+        return True
+    name_upper = name.upper()
+    return any(keyword in name_upper for keyword in DIRTY_KEYWORDS)
+
+def is_preferred_code(code):
+    # 우선주는 단축코드 끝자리가 0이 아님 (005930 삼성전자 -> 005935 삼성전자우)
+    return len(code) == 6 and code[-1] != "0"
+
+class SymbolInfo:
+    """
+    [종목 기본정보] 마스터 1건
+    - market: "KOSPI" / "KOSDAQ" / "" (모름)
+    - group: 증권그룹코드 ("ST" 주권, "EF" ETF, "EN" ETN, "RT" 리츠 ... / "" 모름)
+    - spac / preferred: 스팩 / 우선주 여부
+    - dirty: 매매 제외 대상 (주권이 아니거나, 스팩/우선주이거나, 종목명 필터에 걸림) - 로드할 때 미리 계산
+    """
+    __slots__ = ('code', 'name', 'market', 'group', 'spac', 'preferred', 'dirty')
+
+    def __init__(self, code, name, market="", group="", spac=False, preferred=False):
+        self.code = code
+        self.name = name
+        self.market = market
+        self.group = group
+        self.spac = bool(spac) or "스팩" in name
+        self.preferred = bool(preferred) or is_preferred_code(code)
+        self.dirty = (bool(group) and group != STOCK_GROUP) or self.spac or self.preferred or is_dirty_name(name)
+
+    @property
+    def is_etf(self):
+        return self.group == "EF"
+
+    @property
+    def is_etn(self):
+        return self.group == "EN"
+
+    def to_row(self):
+        return {'code': self.code, 'name': self.name, 'market': self.market, 'group': self.group,
+                'spac': int(self.spac), 'preferred': int(self.preferred)}
+
+class SymbolMaster:
+    """
+    [종목 마스터] 종목코드 -> 종목명 / 시장(KOSPI, KOSDAQ) / ETF, ETN, 스팩, 우선주 여부
+    시작할 때 CSV(path)를 한 번 읽어 딕셔너리로 보관합니다. (조회 = O(1), API 호출 없음)
+    - refresh_from_files / download: KIS 종목정보 마스터 파일(kospi_code.mst, kosdaq_code.mst)로 전체 갱신
+    - learn: API(search-stock-info)로 알게 된 종목을 추가하고 바로 저장
+    """
+    def __init__(self, path=SYMBOL_MASTER_PATH):
+        self.path = path
+        self.symbols = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, code):
+        return code in self.symbols
+
+    def load(self):
+        if not os.path.exists(self.path):
+            print(f"   ⚠️ 종목 마스터 파일이 없습니다: {self.path} (python symbol_master.py 로 생성)")
+            return self
+        df = pd.read_csv(self.path, dtype={'code': str, 'name': str, 'market': str, 'group': str}, keep_default_na=False)
+        self.symbols = {row.code: SymbolInfo(row.code, row.name, row.market, row.group, int(row.spac), int(row.preferred))
+                        for row in df.itertuples(index=False)}
+        print(f"📇 종목 마스터 로드: {len(self.symbols):,}개 종목")
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock:
+            rows = [info.to_row() for info in self.symbols.values()]
+        tmp = self.path + ".tmp"
+        pd.DataFrame(rows, columns=COLUMNS).sort_values('code').to_csv(tmp, index=False)
+        os.replace(tmp, self.path)
+
+    def get(self, code):
+        return self.symbols.get(code)
+
+    def name(self, code):
+        info = self.symbols.get(code)
+        return info.name if info is not None else None
+
+    def market(self, code):
+        info = self.symbols.get(code)
+        return info.market if info is not None else ""
+
+    def is_dirty(self, code, name=None):
+        """마스터에 있으면 미리 계산한 플래그, 없으면 종목명 키워드 검사"""
+        info = self.symbols.get(code)
+        if info is not None:
+            return info.dirty
+        return is_dirty_name(name)
+
+    def learn(self, code, stock_info):
+        """
+        search-stock-info(CTPF1002R) 응답 output으로 종목 1개 추가/갱신 후 저장
+        (mket_id_cd: STK=KOSPI, KSQ=KOSDAQ / scty_grp_id_cd: 증권그룹코드)
+        """
+        name = stock_info.get('prdt_abrv_name') or stock_info.get('prdt_name') or ""
+        market = {"STK": "KOSPI", "KSQ": "KOSDAQ"}.get(stock_info.get('mket_id_cd', ""), "")
+        info = SymbolInfo(code, name, market, stock_info.get('scty_grp_id_cd', ""))
+        with self.lock:
+            self.symbols[code] = info
+        self.save()
+        return info
+
+    def refresh_from_files(self, files):
+        """{시장: .mst 파일 경로} -> 마스터 전체 교체 후 저장"""
+        symbols = {}
+        for market, path in files.items():
+            for info in parse_master_file(path, market):
+                symbols[info.code] = info
+        with self.lock:
+            self.symbols = symbols
+        self.save()
+        print(f"✅ 종목 마스터 갱신 완료: {len(symbols):,}개 종목 -> {self.path}")
+        return self
+
+    def download(self, out_dir=MASTER_DIR):
+        """KIS 마스터 파일(zip)을 받아 풀고 refresh_from_files"""
+        os.makedirs(out_dir, exist_ok=True)
+        files = {}
+        for market, url in MASTER_URLS.items():
+            print(f"📥 {market} 종목 마스터 다운로드: {url}")
+            res = requests.get(url, timeout=30)
+            res.raise_for_status()
+            with zipfile.ZipFile(io.BytesIO(res.content)) as zf:
+                name = zf.namelist()[0]
+                zf.extract(name, out_dir)
+            files[market] = os.path.join(out_dir, name)
+        return self.refresh_from_files(files)
+
+def parse_master_file(path, market):
+    """kospi_code.mst / kosdaq_code.mst (cp949, 줄 끝 고정폭 영역의 첫 2글자 = 증권그룹코드)"""
+    tail = MASTER_TAIL[market]
+    with open(path, "rb") as f:
+        for raw in f:
+            row = raw.rstrip(b"\r\n")
+            if len(row) <= tail + 21: continue
+            head, fixed = row[:-tail], row[-tail:]
+            code = head[0:9].decode("cp949").strip()
+            name = head[21:].decode("cp949", errors="replace").strip()
+            group = fixed[0:2].decode("cp949").strip()
+            yield SymbolInfo(code, name, market, group)
+
+if __name__ == "__main__":
+    SymbolMaster().download()
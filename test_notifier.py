@@ -0,0 +1,99 @@
+# test_notifier.py
+import json
+import time
+import threading
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import notifier
+
+N_MESSAGES = 25      # 한꺼번에 보낼 알림 수 (전량 매도 상황 흉내)
+SLOW_SEC = 0.5       # 웹훅 응답 지연
+
+class StubWebhook(BaseHTTPRequestHandler):
+    """디스코드 웹훅 대역: 느리게 응답하고, reject_first면 첫 요청은 429로 거절"""
+    protocol_version = "HTTP/1.1"
+    posts = []           # 받은 메시지별 embed 제목 목록 (429로 거절한 요청은 None)
+    reject_first = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(SLOW_SEC)
+        if self.reject_first and not self.posts:
+            self.posts.append(None)
+            payload = json.dumps({"message": "You are being rate limited.", "retry_after": 0.3}).encode()
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.posts.append([embed["title"] for embed in body["embeds"]])
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_webhook(reject_first):
+    StubWebhook.posts = []
+    StubWebhook.reject_first = reject_first
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWebhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/webhook"
+
+def test_notifier():
+    print("🏥 디스코드 알림 큐 점검 (로컬 웹훅 대역 서버)")
+
+    server, url = start_webhook(reject_first=True)
+    try:
+        with mock.patch.object(notifier, "DISCORD_WEBHOOK_URL", url):
+            start = time.perf_counter()
+            for i in range(N_MESSAGES):
+                notifier.send_message(f"매도 알림 {i}", f"테스트 종목 {i} 전량 매도", 0xff0000)
+            enqueue_ms = (time.perf_counter() - start) * 1000
+
+            done = notifier.flush(timeout=30)
+            total = time.perf_counter() - start
+            stats = notifier.get_notifier().stats
+    finally:
+        server.shutdown()
+
+    delivered = [titles for titles in StubWebhook.posts if titles is not None]
+    print(f"   - 알림 {N_MESSAGES}개 호출 시간: {enqueue_ms:.1f}ms (매매 루프가 기다린 시간)")
+    print(f"   - 전송 완료까지: {total:.1f}초, 웹훅 요청 {stats['posts']}번 (429 거절 {stats['rate_limited']}번)")
+    print(f"   - 메시지별 embed 수: {[len(titles) for titles in delivered]}")
+    print(f"   - 통계: {stats}")
+
+    assert done, "flush 시간 안에 다 보내지 못함"
+    assert enqueue_ms < 50
+    assert stats['rate_limited'] == 1 and stats['posts'] == 4
+    assert [len(titles) for titles in delivered] == [10, 10, 5]
+    # 429로 거절된 묶음은 같은 순서로 재전송 -> 전체가 보낸 순서 그대로, 빠짐 / 중복 없음
+    assert sum(delivered, []) == [f"매도 알림 {i}" for i in range(N_MESSAGES)]
+    assert stats['sent'] == N_MESSAGES and stats['dropped'] == 0 and stats['failed'] == 0
+    print("✅ 알림이 루프를 막지 않고, 묶음 + 429 재시도로 순서대로 모두 전송되었습니다.")
+
+def test_notifier_keeps_order_with_long_embeds():
+    print("🏥 글자 수 한도를 넘기는 알림의 전송 순서 점검")
+
+    server, url = start_webhook(reject_first=False)
+    sender = notifier.Notifier(url, linger=0.3)
+    long_text = "가" * 4000   # 2개면 묶음 한도(6000자) 초과
+    try:
+        for title, text in (("A", "짧음"), ("B", long_text), ("C", long_text), ("D", "짧음")):
+            sender.send(notifier.make_embed(title, text))
+        done = sender.flush(timeout=10)
+    finally:
+        server.shutdown()
+
+    print(f"   - 메시지별 embed 제목: {StubWebhook.posts}")
+    assert done
+    # C는 B와 같이 못 묶이므로 다음 묶음의 첫 알림으로 (A, B보다 먼저 나가면 안 됨)
+    assert StubWebhook.posts == [["A", "B"], ["C", "D"]]
+    assert sender.stats['sent'] == 4 and sender.stats['failed'] == 0
+    print("✅ 긴 알림도 보낸 순서대로 전송되었습니다.")
+
+if __name__ == "__main__":
+    test_notifier()
+    test_notifier_keeps_order_with_long_embeds()
@@ -0,0 +1,63 @@
+# test_quote_feed.py
+import json
+import time
+import threading
+from websockets.sync.server import serve
+from quote_feed import QuoteFeed, QUOTE_TR_ID
+
+FIELD_COUNT = 46  # H0STCNT0 체결 데이터 필드 개수
+
+def fake_trade(symbol, price):
+    # KIS 실시간 체결 형식 흉내: 종목코드^체결시간^현재가^... (나머지는 빈 값)
+    return [symbol, time.strftime("%H%M%S"), str(price)] + [""] * (FIELD_COUNT - 3)
+
+def stand_in_handler(ws):
+    """로컬 KIS WebSocket 대역: 구독하면 응답 + 체결 2건 + PINGPONG 전송"""
+    for message in ws:
+        data = json.loads(message)
+        if data["header"].get("tr_id") == "PINGPONG":
+            continue
+        symbol = data["body"]["input"]["tr_key"]
+        ws.send(json.dumps({
+            "header": {"tr_id": QUOTE_TR_ID, "tr_key": symbol, "encrypt": "N"},
+            "body": {"rt_cd": "0", "msg_cd": "OPSP0000", "msg1": "SUBSCRIBE SUCCESS"}
+        }))
+        if data["header"]["tr_type"] == "1":
+            fields = fake_trade(symbol, 71000) + fake_trade(symbol, 71100)
+            ws.send(f"0|{QUOTE_TR_ID}|002|" + "^".join(fields))
+            ws.send(json.dumps({"header": {"tr_id": "PINGPONG", "datetime": time.strftime("%Y%m%d%H%M%S")}}))
+
+def test_quote_feed():
+    print("🏥 실시간 시세 수신기 점검 (로컬 WebSocket 대역 서버)")
+
+    server = serve(stand_in_handler, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"ws://127.0.0.1:{server.socket.getsockname()[1]}"
+
+    feed = QuoteFeed("dummy-approval-key", url=url)
+    feed.set_symbols(["005930"])
+    feed.start()
+
+    try:
+        # 1. 구독 -> 마지막 체결가가 시세표에 반영되는지
+        deadline = time.time() + 5
+        while feed.get_price("005930") is None and time.time() < deadline:
+            time.sleep(0.05)
+        price = feed.get_price("005930")
+        print(f"   삼성전자 실시간가: {price}")
+        assert price == 71100, "마지막 체결가가 반영되지 않았습니다"
+
+        # 2. 구독 교체 -> 빠진 종목은 시세표에서 제거되는지
+        feed.set_symbols(["000660"])
+        deadline = time.time() + 5
+        while feed.get_price("000660") is None and time.time() < deadline:
+            time.sleep(0.05)
+        assert feed.get_price("005930") is None, "해지한 종목 시세가 남아 있습니다"
+        assert feed.get_price("000660") == 71100
+        print("✅ 구독/해지/시세 반영 정상")
+    finally:
+        feed.stop()
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_quote_feed()
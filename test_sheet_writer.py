@@ -0,0 +1,66 @@
+# test_sheet_writer.py
+import time
+from sheet_logger import SheetWriter, log_to_sheet
+
+class QuotaError(Exception):
+    """gspread.exceptions.APIError 흉내 (response.status_code = 429)"""
+    def __init__(self):
+        super().__init__("Quota exceeded for quota metric 'Write requests'")
+        self.response = type("Response", (), {"status_code": 429})()
+
+class FakeSheet:
+    """가짜 gspread 워크시트: 느리게 응답하고, 첫 기록은 할당량 초과로 거절"""
+    def __init__(self, delay=0.3, fail_first=1):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.rows = []
+        self.calls = 0
+
+    def append_rows(self, rows):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.calls <= self.fail_first:
+            raise QuotaError()
+        self.rows.extend(rows)
+
+class FakeMarketIndex:
+    stale = False
+
+    def get(self):
+        return type("Snapshot", (), {"kospi": 0.52, "kosdaq": -1.1, "kospi_value": 2561.2, "kosdaq_value": 841.05})()
+
+def test_sheet_writer():
+    print("🏥 구글 시트 기록기 점검 (가짜 gspread 시트)")
+
+    sheet = FakeSheet()
+    opened = []
+    writer = SheetWriter(sheet_factory=lambda refresh=False: opened.append(refresh) or sheet,
+                         batch_sec=0.2, retry_sec=0.1)
+
+    reports = ("중간점검", "마감정산", "중간점검")
+    start = time.perf_counter()
+    for no, report in enumerate(reports):
+        log_to_sheet(report, 1_000_000, 1_000_000 + no, no, FakeMarketIndex(), writer=writer)
+    enqueue_ms = (time.perf_counter() - start) * 1000
+
+    done = writer.flush(timeout=10)
+    stats = writer.stats
+    print(f"   - log_to_sheet 3회 호출 시간: {enqueue_ms:.1f}ms (매매 루프가 기다린 시간)")
+    print(f"   - append_rows 호출 {sheet.calls}번 (할당량 거절 1번 포함), 시트 열기 {len(opened)}번")
+    print(f"   - 기록된 행: {len(sheet.rows)}개, 첫 행: {sheet.rows[0] if sheet.rows else '-'}")
+    print(f"   - 통계: {stats}")
+
+    assert done, "flush 시간 안에 다 기록하지 못함"
+    assert enqueue_ms < 50
+    # 3행이 한 묶음으로: 첫 시도는 할당량 초과 -> 재시도 1번에 전부 기록
+    assert sheet.calls == 2 and stats['retries'] == 1
+    assert len(sheet.rows) == len(reports)
+    # 넣은 순서 그대로 (구분 / 현재자산), 빠짐 / 중복 없음
+    assert [(row[2], row[4]) for row in sheet.rows] == [(report, f"{1_000_000 + no:,}") for no, report in enumerate(reports)]
+    # 시장 지수는 백그라운드 스냅샷 값으로 채움
+    assert all(row[7:] == ["2561.20 (+0.52%)", "841.05 (-1.10%)"] for row in sheet.rows)
+    assert stats['written'] == len(reports) and stats['failed'] == 0 and stats['dropped'] == 0
+    print("✅ 행이 루프를 막지 않고, 한 번에 묶여서 재시도 끝에 순서대로 기록되었습니다.")
+
+if __name__ == "__main__":
+    test_sheet_writer()
@@ -0,0 +1,116 @@
+# test_sim_server.py
+import os
+import tempfile
+import time
+import datetime as dt
+from contextlib import ExitStack
+from unittest import mock
+from kis_sim_server import KISSimServer
+from symbol_master import SymbolMaster
+import kis_api
+import main
+from metrics import registry
+
+N_TICKS = 5   # 돌려볼 메인 루프 횟수
+
+def connect_bot(server, master_path, **overrides):
+    """
+    이미 import된 봇 모듈(kis_api / main)을 시뮬레이터에 붙입니다. (with 블록이 끝나면 원래대로)
+    config는 import 시점에 환경변수를 읽으므로, 환경변수 대신 모듈에 들어간 값을 직접 바꿉니다.
+    - master_path: 종목 마스터 CSV 경로 (data/ 오염 방지용 임시 파일)
+    - overrides: kis_api의 다른 설정값 (예: TRAFFIC_MODE="record", TRAFFIC_LOG_PATH=...)
+    """
+    values = {
+        "URL_BASE": server.url,
+        "MARKET_INDEX_URL": f"{server.url}/index",
+        "QUOTE_FEED_ENABLED": False,
+        "APP_KEY": "sim-key",
+        "APP_SECRET": "sim-secret",
+        "ACC_NO": "00000000",
+        "SymbolMaster": lambda: SymbolMaster(master_path),
+        **overrides,
+    }
+    stack = ExitStack()
+    for name, value in values.items():
+        stack.enter_context(mock.patch.object(kis_api, name, value))
+    stack.enter_context(mock.patch.object(main, "QUOTE_FEED_ENABLED", False))
+
+    # main이 띄운 백그라운드 갱신기(감시 종목 / 시장 지수)는 블록이 끝날 때 같이 멈춤 (테스트 간 요청이 섞이지 않도록)
+    services = []
+    for name in ("UniverseRefresher", "MarketIndexService"):
+        cls = getattr(main, name)
+        stack.enter_context(mock.patch.object(main, name, lambda *a, cls=cls, **k: services.append(cls(*a, **k)) or services[-1]))
+
+    def stop_services():
+        for service in services:
+            service.stop()
+        for service in services:
+            if service.thread is not None:
+                service.thread.join(timeout=10)   # 진행 중인 요청까지 끝나길 기다림
+    stack.callback(stop_services)
+    return stack
+
+class StopLoop(Exception):
+    pass
+
+class TickClock:
+    """main 루프 시계: 시뮬레이터의 가상 장중 시각을 돌려주고, 10초 대기(틱 끝)를 세다가 N_TICKS가 되면 루프를 멈춤"""
+    def __init__(self, market, n_ticks):
+        self.market = market
+        self.n_ticks = n_ticks
+        self.ticks = 0
+        self.tick_times = []
+        self.last = time.perf_counter()
+
+    def now(self):
+        return dt.datetime.fromtimestamp(self.market.now().timestamp())
+
+    def sleep(self, seconds):
+        if seconds >= 10:
+            now = time.perf_counter()
+            self.tick_times.append(now - self.last)
+            self.last = now
+            self.ticks += 1
+            if self.ticks >= self.n_ticks:
+                raise StopLoop()
+
+def test_sim_server():
+    # 시뮬레이터를 띄우고, 이미 import된 봇 모듈을 여기에 붙임 (다른 테스트와 같이 돌려도 서로 영향 없음)
+    server = KISSimServer(port=0, latency_ms=30, jitter_ms=10, rate_limit=20).start()
+    print(f"🏥 로컬 KIS 시뮬레이터로 메인 루프 점검 ({server.url}, {N_TICKS}틱)")
+
+    clock = TickClock(server.market, N_TICKS)
+    master_path = os.path.join(tempfile.mkdtemp(), "symbol_master.csv")
+    start = time.perf_counter()
+    try:
+        with connect_bot(server, master_path):
+            try:
+                main.main(clock)
+            except StopLoop:
+                pass
+    finally:
+        server.stop()
+    elapsed = time.perf_counter() - start
+
+    stats = server.stats
+    print("\n\n📊 결과")
+    print(f"   - 메인 루프: {clock.ticks}틱 / {elapsed:.1f}초 (틱당 평균 {elapsed / max(clock.ticks, 1):.2f}초, "
+          f"최대 {max(clock.tick_times, default=0):.2f}초)")
+    print(f"   - 서버 요청: {stats['requests']}건 (초당 {stats['requests'] / elapsed:.1f}건), "
+          f"호출 한도 거절 {stats['rate_limited']}건, 에러 주입 {stats['errors']}건")
+    for path, count in sorted(stats['by_path'].items(), key=lambda kv: -kv[1]):
+        print(f"     {count:5d}  {path}")
+    print(f"   - 가상 계좌: 예수금 {int(server.account.cash):,}원, 보유 {len(server.account.holdings)}종목")
+    print(registry.report("bot_stage_seconds"))
+    print(registry.report("kis_http_request_seconds"))
+    print(registry.report("kis_rate_limit_wait_seconds", top=5))
+
+    if stats['rate_limited']:
+        print("⚠️ 클라이언트 호출 한도가 서버 한도보다 높습니다. (config.RATE_LIMIT_* 확인)")
+    else:
+        print("✅ 호출 한도 초과 없이 루프가 완주했습니다.")
+    assert clock.ticks == N_TICKS
+    assert stats['rate_limited'] == 0
+
+if __name__ == "__main__":
+    test_sim_server()
@@ -0,0 +1,57 @@
+# test_symbol_master.py
+import os
+import tempfile
+from symbol_master import SymbolMaster, parse_master_file
+
+# KIS 예제 파서 기준 줄 끝 고정폭 영역 길이 (줄바꿈 포함)
+KIS_TAIL_WITH_NEWLINE = {"KOSPI": 228, "KOSDAQ": 222}
+
+def mst_line(code, std_code, name, group, market):
+    """실제 .mst 한 줄 흉내: 단축코드(9) + 표준코드(12) + 한글명 + 고정폭 영역(증권그룹코드로 시작) + \\n"""
+    fixed = (group + "N" * KIS_TAIL_WITH_NEWLINE[market])[:KIS_TAIL_WITH_NEWLINE[market] - 1] + "\n"
+    return (code.ljust(9) + std_code + name).encode("cp949") + fixed.encode("cp949")
+
+def write_mst(path, market, rows):
+    with open(path, "wb") as f:
+        for row in rows:
+            f.write(mst_line(*row, market))
+
+def test_parse_master_file():
+    print("🏥 종목 마스터 파일(.mst) 파싱 점검")
+    tmp = tempfile.mkdtemp()
+    kospi, kosdaq = os.path.join(tmp, "kospi_code.mst"), os.path.join(tmp, "kosdaq_code.mst")
+    write_mst(kospi, "KOSPI", [
+        ("005930", "KR7005930003", "삼성전자", "ST"),
+        ("005935", "KR7005931001", "삼성전자우", "ST"),
+        ("069500", "KR7069500007", "KODEX 200", "EF"),
+    ])
+    write_mst(kosdaq, "KOSDAQ", [
+        ("247540", "KR7247540008", "에코프로비엠", "ST"),
+        ("450050", "KR7450050000", "하나금융27호스팩", "ST"),
+    ])
+
+    parsed = {info.code: info for info in parse_master_file(kospi, "KOSPI")}
+    parsed.update({info.code: info for info in parse_master_file(kosdaq, "KOSDAQ")})
+    for info in parsed.values():
+        print(f"   - {info.code} {info.name} [{info.market}/{info.group}] dirty={info.dirty}")
+
+    assert {code: info.group for code, info in parsed.items()} == {
+        "005930": "ST", "005935": "ST", "069500": "EF", "247540": "ST", "450050": "ST"}
+    assert parsed["005930"].name == "삼성전자" and parsed["005930"].market == "KOSPI"
+    assert parsed["247540"].name == "에코프로비엠" and parsed["247540"].market == "KOSDAQ"
+    assert parsed["069500"].is_etf
+    assert parsed["005935"].preferred and parsed["450050"].spac
+    # 주권 보통주만 매매 대상
+    assert [code for code, info in parsed.items() if not info.dirty] == ["005930", "247540"]
+
+    # 저장 -> 다시 로드해도 같은 값
+    path = os.path.join(tmp, "symbol_master.csv")
+    SymbolMaster(path).refresh_from_files({"KOSPI": kospi, "KOSDAQ": kosdaq})
+    master = SymbolMaster(path).load()
+    assert len(master) == 5
+    assert master.name("247540") == "에코프로비엠" and master.market("069500") == "KOSPI"
+    assert not master.is_dirty("005930") and master.is_dirty("069500") and master.is_dirty("450050")
+    print("✅ 증권그룹코드 / 종목명 / 시장 / 우선주·스팩 여부가 올바르게 읽혔습니다.")
+
+if __name__ == "__main__":
+    test_parse_master_file()
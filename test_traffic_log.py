@@ -0,0 +1,96 @@
+# test_traffic_log.py
+import os
+import time
+import tempfile
+import datetime as dt
+from unittest import mock
+from kis_sim_server import KISSimServer
+from test_sim_server import connect_bot
+import kis_api
+import main
+
+N_TICKS = 3   # 녹화할 메인 루프 횟수
+
+class StopLoop(Exception):
+    pass
+
+class TickClock:
+    """
+    녹화용 main 루프 시계: 틱마다 10초씩 가는 고정된 가상 장중 시각, 10초 대기(틱 끝)를 세다가 n_ticks가 되면 멈춤
+    (요청 시각도 이 시계로 녹화됨 -> 재생 때 ReplayClock이 같은 시각을 따라가서 10분 주기 미체결 청소 같은 시각 분기가 똑같이 실행됨)
+    """
+    def __init__(self, start, n_ticks):
+        self.start = start
+        self.n_ticks = n_ticks
+        self.ticks = 0
+
+    def now(self):
+        return self.start + dt.timedelta(seconds=10 * self.ticks)
+
+    def sleep(self, seconds):
+        if seconds >= 10:
+            self.ticks += 1
+            if self.ticks >= self.n_ticks:
+                raise StopLoop()
+
+def run_main(server, mode, log_path, clock=None):
+    # 녹화/재생마다 빈 종목 마스터로 시작 (녹화 때 learn()으로 저장된 종목 때문에 재생 요청이 달라지지 않도록)
+    master_path = os.path.join(tempfile.mkdtemp(), "symbol_master.csv")
+    apis = []
+
+    def make_api():
+        api = kis_api.KISApi()
+        # 미체결 장부의 주기 동기화는 실제 경과 시간 기준 -> 대기 없는 재생에서는 횟수가 달라지므로 끔
+        # (미확인 주문이 있을 때의 동기화는 그대로 -> 녹화/재생 모두 같은 요청)
+        api.order_book.reconcile_sec = float("inf")
+        apis.append(api)
+        return api
+
+    start = time.perf_counter()
+    with connect_bot(server, master_path, TRAFFIC_MODE=mode, TRAFFIC_LOG_PATH=log_path, REPLAY_SPEED=0), \
+            mock.patch.object(main, "KISApi", make_api):
+        try:
+            main.main(clock)
+        except StopLoop:
+            pass
+    return time.perf_counter() - start, apis[0]
+
+def test_traffic_log():
+    print(f"🏥 API 트래픽 녹화/재생 점검 ({N_TICKS}틱)")
+
+    # 시뮬레이터 세션을 녹화 -> 서버를 끄고 같은 루프를 재생
+    server = KISSimServer(port=0, latency_ms=30, jitter_ms=10, rate_limit=20).start()
+    clock = TickClock(dt.datetime.combine(server.market.now().date(), dt.time(10, 35)), N_TICKS)
+    log_path = os.path.join(tempfile.mkdtemp(), "kis_traffic.jsonl")
+    try:
+        record_sec, api = run_main(server, "record", log_path, clock)
+        api.recorder.close()
+    finally:
+        server.stop()   # 재생은 네트워크 없이
+    recorded = api.recorder.count
+    with open(log_path, encoding="utf-8") as f:
+        log_text = f.read()
+
+    # 재생은 시계를 넘기지 않음 -> main이 녹화 시각을 따라가는 ReplayClock으로 돌다가 녹화분이 끝나면 스스로 종료
+    replay_sec, api = run_main(server, "replay", log_path)
+    replayer = api.replayer
+    stats = replayer.stats
+    unused = replayer.unused()
+
+    print("\n\n📊 결과")
+    print(f"   - 녹화: {recorded}건, {record_sec:.1f}초 ({os.path.getsize(log_path) / 1024:.0f}KB)")
+    print(f"   - 재생: {replay_sec:.1f}초 | {replayer.summary()}")
+    for e in unused[:10]:
+        print(f"     안 쓴 녹화분: {e['m']} {e['ep']} ({e['tr']}) {e['p'] or e['b']}")
+
+    assert recorded > 0
+    assert "sim-key" not in log_text and "sim-secret" not in log_text, "로그에 앱키/시크릿이 그대로 남음"
+    assert stats['miss'] == 0, f"녹화에 없는 요청 {stats['miss']}건"
+    assert stats['loose'] == 0 and stats['repeat'] == 0, f"정확히 일치하지 않은 요청: {stats}"
+    assert not unused, f"재생에서 쓰이지 않은 녹화분 {len(unused)}건"
+    # 재생 시계는 녹화 시각을 따라감: 마지막 틱 시각까지 가상으로 진행 (실제 대기 없이)
+    assert api.clock.now() >= clock.start + dt.timedelta(seconds=10 * (N_TICKS - 1))
+    print("✅ 모든 요청이 녹화분과 정확히 일치했습니다.")
+
+if __name__ == "__main__":
+    test_traffic_log()
@@ -1,43 +1,25 @@
 # trader.py
 import time
+import asyncio
 from notifier import send_message
-from config import TAKE_PROFIT_RATE, STOP_LOSS_RATE
-# [핵심] collector를 가져와야 AI에게 올바른 데이터를 줄 수 있습니다.
-from collector import preprocess_data
-
-def check_available_budget(api, target_amount):
-    balance = api.get_balance()
-    try:
-        # 모의/실전 데이터 구조 차이 통합 처리
-        if 'output' in balance:
-            val = balance['output'].get('ord_psbl_cash') or balance['output'].get('dnca_tot_amt')
-        else:
-            val = balance['output2'][0].get('ord_psbl_cash') or balance['output2'][0].get('dnca_tot_amt')
-        
-        available_cash = int(val or 0)
-        return (available_cash >= target_amount), available_cash
-    except Exception as e:
-        return False, 0
-
-def check_mode(api):
-    balance = api.get_balance()
-    deposit = 0
-    try:
-        if 'output' in balance:
-            val = balance['output'].get('ord_psbl_cash') or balance['output'].get('dnca_tot_amt')
-        elif 'output2' in balance:
-             val = balance['output2'][0].get('ord_psbl_cash') or balance['output2'][0].get('dnca_tot_amt')
-        deposit = int(val or 0)
-    except:
-        deposit = 0
+from config import TAKE_PROFIT_RATE, STOP_LOSS_RATE, MAX_HOLDINGS, TRAIL_STAGES
+from model import score_batch
+from collector import preprocess_many
+from market_index import as_rates
+
+def check_available_budget(snapshot, target_amount):
+    available_cash = snapshot.orderable_cash
+    return (available_cash >= target_amount), available_cash
+
+def check_mode(api, snapshot):
+    deposit = snapshot.orderable_cash
 
     stock_value = 0
-    my_stocks = api.get_my_stocks()
-    if my_stocks:
-        for symbol, info in my_stocks.items():
-            curr_price = api.get_current_price(symbol)
-            if curr_price == 0: curr_price = info['buy_price']
-            stock_value += curr_price * info['qty']
+    for symbol, info in snapshot.holdings.items():
+        # 잔고조회에 찍힌 현재가 우선 -> 없으면 시세 조회 -> 그래도 없으면 매수가
+        curr_price = info.get('current_price') or api.get_current_price(symbol)
+        if curr_price == 0: curr_price = info['buy_price']
+        stock_value += curr_price * info['qty']
 
     total_asset = deposit + stock_value
     if total_asset == 0: return "ATTACK", 0.005
@@ -46,15 +28,146 @@ def check_mode(api):
     if cash_ratio < 0.3: return "DEFENSE", 0.008  
     else: return "ATTACK", 0.005   
 
-def manage_risk(api, symbol, qty, buy_price, model, predict_func, stock_name, market_rates):
+def is_defense_hold(mode, my_stocks):
+    """[방어 모드] 현금 비중이 낮고 보유 종목이 3개 이상이면 신규 매수 스캔을 건너뜀"""
+    return mode == "DEFENSE" and len(my_stocks) >= 3
+
+def free_slots(api, my_stocks, max_holdings=MAX_HOLDINGS):
+    """[빈 자리] max_holdings - (보유 + 보유 종목 외 미체결). 0 이하면 더 살 수 없음 (로컬 장부 - API 호출 X)"""
+    return max_holdings - len(my_stocks) - api.order_book.pending_count(exclude=my_stocks)
+
+def buy_candidates(api, candidates, scores, threshold, my_stocks, deposit, invest_amount, mode, max_holdings=MAX_HOLDINGS):
+    """
+    [매수 실행] 배치 예측 점수(scores)로 후보 종목을 순서대로 매수합니다.
+    - 보유 + 미체결이 max_holdings 이상이면 중단
+    - 점수가 threshold 초과면 min(invest_amount, 남은 예수금)만큼 시장가 매수
+    - 매수한 종목은 my_stocks에 바로 등록하고 예수금은 메모리에서 차감 (서버 재조회 X)
+    남은 예수금을 반환합니다. (실전 main과 백테스트가 같이 사용)
+    """
+    for symbol in candidates:
+        
+        # 미체결 포함 풀방 체크 (로컬 미체결 장부 - API 호출 X)
+        # 이번 틱 매수분은 my_stocks에 바로 등록되므로 보유 종목의 주문은 제외
+        if free_slots(api, my_stocks, max_holdings) <= 0:
+            print(f"   🔒 [매수 제한] 포트폴리오 가득 참.")
+            break 
+
+        # 1~2. 전처리 + AI 예측 (위에서 배치로 계산한 점수 사용)
+        score = scores.get(symbol)
+        if score is None: continue
+        
+        if score > threshold: 
+            curr_price = api.get_current_price(symbol)
+            if curr_price <= 0: continue
+
+            # 3. [최적화] API 호출 없이, 아까 저장해둔 변수(deposit) 확인
+            target_amt = min(invest_amount, deposit)
+            
+            if target_amt < 10000:
+                # 돈 없으면 루프 종료 (더 봐봤자 못 삼)
+                print(f"   ⚠️ [매수 중단] 잔고 부족 ({deposit:,}원)")
+                break 
+
+            buy_qty = int(target_amt / curr_price)
+            
+            if buy_qty > 0:
+                print(f"   🚀 [{symbol}] 매수 포착! 점수: {score:.4f}")
+                
+                # 실제 매수 주문
+                result = api.buy_market_order(symbol, qty=buy_qty)
+                
+                if result['status'] == 'success':
+                    stock_name = api.get_stock_name(symbol)
+                    msg = (
+                        f"**🚀 매수 체결**\n"
+                        f"종목: {stock_name}\n"
+                        f"가격: {curr_price:,}원\n"
+                        f"수량: {buy_qty:,}주\n"
+                        f"AI점수: {score:.4f}\n"
+                        f"모드: {mode}"
+                    )
+                    send_message("매수 알림", msg, 0x0000ff)
+                    
+                    # 중복 매수 방지 등록
+                    my_stocks[symbol] = {'qty': buy_qty, 'buy_price': curr_price, 'name': stock_name}
+                    
+                    # [중요] 사용한 금액만큼 내 변수에서 차감 (서버 조회 X)
+                    used_amount = curr_price * buy_qty
+                    deposit -= used_amount
+                    print(f"   💰 잔고 차감: -{used_amount:,}원 (남은 돈: {deposit:,}원)")
+
+    return deposit
+
+def manage_risk(api, symbol, qty, buy_price, ai_score, stock_name, market_rates):
     """
-    [리스크 관리 v5]
-    - AI 점수 계산 시 collector.preprocess_data 사용 (0.0 버그 수정)
-    - 시장 지수 반영 로직 유지
+    [리스크 관리 v6]
+    - AI 점수는 main에서 보유 종목 전체를 배치 예측(model.score_batch)한 값을 받음
+    - 시장 지수 반영 로직 유지 (market_rates: (코스피, 코스닥) 등락률 또는 MarketIndexService)
+    (종목 1개용. 보유 종목 전체는 manage_holdings로 병렬 처리)
     """
     current_price = api.get_current_price(symbol)
     if current_price == 0: return False
 
+    decision = decide_risk(symbol, qty, buy_price, current_price, ai_score, stock_name, as_rates(market_rates))
+    return execute_risk_decision(api, decision)
+
+async def manage_holdings(async_api, model, my_stocks, market_rates):
+    """
+    [보유 종목 일괄 관리 - 병렬 파이프라인]
+    1. 전 종목 현재가 + 분봉 전처리를 동시에 조회
+    2. 한 번의 배치 예측으로 AI 점수 계산
+    3. 종목별 익절/손절 판정 (manage_risk와 같은 기준, 시장 지수는 판정 시점의 최신 값)
+    4. 매도 주문을 동시에 제출
+    동시 실행 수/호출 속도는 AsyncKISApi(스레드 풀 + 호출 한도)가 제한합니다.
+    매도 주문이 접수된 종목 코드 목록을 반환합니다. (실패한 주문은 알림 없이 로그만)
+    """
+    symbols = list(my_stocks)
+    if not symbols:
+        return []
+
+    # 1. 조회 (현재가, 전처리) 동시 실행
+    prices, input_tensors = await asyncio.gather(
+        asyncio.gather(*(async_api.get_current_price(sym) for sym in symbols)),
+        preprocess_many(async_api, symbols)
+    )
+
+    # 2. 배치 예측
+    scores = score_batch(model, input_tensors)
+
+    # 3. 판정
+    market_rates = as_rates(market_rates)
+    decisions = []
+    for sym, current_price in zip(symbols, prices):
+        if current_price == 0: continue
+        info = my_stocks[sym]
+        decisions.append(decide_risk(
+            sym, info['qty'], info['buy_price'], current_price,
+            scores.get(sym, 0.0), info.get('name', sym), market_rates
+        ))
+
+    for decision in decisions:
+        if not decision['sell']:
+            print(decision['log'])
+
+    # 4. 매도 주문 동시 제출 -> 주문이 접수된 종목만 알림
+    sells = [d for d in decisions if d['sell']]
+    results = await asyncio.gather(*(async_api.sell_market_order(d['symbol'], d['qty']) for d in sells),
+                                   return_exceptions=True)
+    sold = []
+    for decision, result in zip(sells, results):
+        if isinstance(result, dict) and result.get('status') == 'success':
+            send_message(decision['title'], decision['msg'], color=decision['color'])
+            sold.append(decision['symbol'])
+        else:
+            print(f"   ❌ [{decision['symbol']}] 매도 주문 실패 ({decision['qty']}주): {result}")
+
+    return sold
+
+def decide_risk(symbol, qty, buy_price, current_price, ai_score, stock_name, market_rates):
+    """
+    [매도 판정] API 호출 없이 익절/손절 여부만 계산합니다.
+    반환: {'symbol', 'qty', 'sell', 'title', 'msg', 'color', 'log'}
+    """
     # 수익률 계산
     raw_rate = (current_price - buy_price) / buy_price
     profit_rate = raw_rate * 100
@@ -62,17 +175,10 @@ def manage_risk(api, symbol, qty, buy_price, model, predict_func, stock_name, ma
     display_name = stock_name if stock_name else symbol
 
     # ---------------------------------------------------------
-    # [1] AI 예측 점수 확인 (수정된 부분)
+    # [1] AI 예측 점수 확인
     # ---------------------------------------------------------
-    ai_score = 0.0
-    
-    # 예전 방식(Raw DF)이 아니라, collector를 통해 Tensor를 받아야 함
-    input_tensor = preprocess_data(api, symbol)
-    
-    if input_tensor is not None:
-        # main.py에서 넘겨준 predict 함수 사용
-        ai_score = predict_func(model, input_tensor)
-    
+    # ai_score: main에서 배치 예측으로 미리 계산해서 넘겨줌 (전처리 실패 시 0.0)
+
     # 로그 확인용 (이제 0.0000이 아니라 숫자가 나와야 함)
     # print(f"   🤖 {display_name} AI점수: {ai_score:.4f}")
 
@@ -118,46 +224,61 @@ def manage_risk(api, symbol, qty, buy_price, model, predict_func, stock_name, ma
     # ---------------------------------------------------------
     # [4] 트레일링 스탑 (수익 보존)
     # ---------------------------------------------------------
-    if profit_rate >= 2.0:
-        if final_stop < 0.5: 
-            final_stop = 0.5 
-            status_msg += "(🔒수익보존)"
-    if profit_rate >= 5.0:
-        final_stop = 3.0
+    locked = False
+    for trigger, lock in TRAIL_STAGES:   # +2% -> +0.5% 보존, +5% -> +3% 보존 (config)
+        if profit_rate >= trigger * 100 and final_stop < lock * 100:
+            final_stop = lock * 100
+            locked = True
+    if locked:
+        status_msg += "(🔒수익보존)"
 
     # ---------------------------------------------------------
-    # [5] 매매 실행
+    # [5] 매매 판정
     # ---------------------------------------------------------
+    decision = {'symbol': symbol, 'qty': qty, 'sell': False, 'title': None, 'msg': None, 'color': None}
+
     if profit_rate >= final_target:
         # 익절
-        api.sell_market_order(symbol, qty) 
-        msg = (
+        decision['sell'] = True
+        decision['title'] = "💰 익절 알림"
+        decision['color'] = 0x00ff00
+        decision['msg'] = (
             f"**🎉 익절 성공!** {market_msg}\n"
             f"종목: {display_name}\n"
             f"수익: +{profit_rate:.2f}% ({profit_amount:+,}원)\n"
             f"AI: {status_msg} ({ai_score:.4f})\n"
             f"(목표: {final_target:.2f}%)"
         )
-        send_message("💰 익절 알림", msg, color=0x00ff00)
-        return True
 
     elif profit_rate <= final_stop:
         # 손절
-        api.sell_market_order(symbol, qty)
-        
         title = "🛡️ 수익 보존 매도" if profit_rate > 0 else "💧 손절 매도"
-        color = 0x00ff00 if profit_rate > 0 else 0xff0000
-        
-        msg = (
+        decision['sell'] = True
+        decision['title'] = title
+        decision['color'] = 0x00ff00 if profit_rate > 0 else 0xff0000
+        decision['msg'] = (
             f"**{title}** {market_msg}\n"
             f"종목: {display_name}\n"
             f"수익: {profit_rate:.2f}% ({profit_amount:+,}원)\n"
             f"AI: {status_msg} ({ai_score:.4f})\n"
             f"(기준: {final_stop:.2f}%)"
         )
-        send_message(title, msg, color=color)
-        return True
 
     # 로그 출력 (선택 사항)
-    print(f"목표: {final_target:.2f}%, 손절: {final_stop:.2f}%, 수익: {profit_rate:.2f}% ({ai_score:.4f})")
+    decision['log'] = f"목표: {final_target:.2f}%, 손절: {final_stop:.2f}%, 수익: {profit_rate:.2f}% ({ai_score:.4f})"
+    return decision
+
+def execute_risk_decision(api, decision):
+    """
+    [매매 실행] decide_risk 결과대로 매도 주문 + 알림. 주문이 접수됐으면 True
+    """
+    if decision['sell']:
+        result = api.sell_market_order(decision['symbol'], decision['qty'])
+        if result.get('status') != 'success':
+            print(f"   ❌ [{decision['symbol']}] 매도 주문 실패 ({decision['qty']}주): {result}")
+            return False
+        send_message(decision['title'], decision['msg'], color=decision['color'])
+        return True
+
+    print(decision['log'])
     return False
\ No newline at end of file
@@ -0,0 +1,217 @@
+# traffic_log.py
+import os
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import requests
+
+# 로그에 남기면 안 되는 값 (요청 본문 / 응답 본문)
+SECRET_FIELDS = {"appkey", "appsecret", "secretkey"}
+TOKEN_FIELDS = {"access_token", "approval_key"}
+
+def _redact(obj, fields):
+    if isinstance(obj, dict):
+        return {k: ("***" if k in fields else v) for k, v in obj.items()}
+    return obj
+
+def _parse_body(data):
+    # 요청 본문(json.dumps 문자열) -> dict (JSON이 아니면 문자열 그대로)
+    if data is None or isinstance(data, dict):
+        return data
+    try:
+        return json.loads(data)
+    except (TypeError, ValueError):
+        return data
+
+def _key(method, endpoint, tr_id, params, body):
+    return (method, endpoint, tr_id, json.dumps(params, sort_keys=True), json.dumps(body, sort_keys=True))
+
+class TrafficRecorder:
+    """
+    [API 트래픽 녹화] KISApi._request를 지나는 모든 요청/응답을 한 줄 JSON으로 이어 씁니다 (append-only).
+    한 줄 = {t: 세션 시작 후 초, ts: 시각, m, ep: 경로, tr: tr_id, p: params, b: 요청 본문,
+             st: 상태코드, ms: 응답 시간, r: 응답 본문, err: 예외}
+    앱키/시크릿/토큰 값은 ***로 가려서 저장합니다.
+    """
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.count = 0
+        print(f"⏺️ [트래픽 녹화] {path}")
+
+    def record(self, method, url, tr_id, params, data, started, latency, res=None, error=None, when=None):
+        # when: 봇 시계(main 루프의 now) 기준 요청 시각 -> 재생할 때 ReplayClock이 이 시각을 따라감
+        body = None
+        if res is not None:
+            try:
+                body = _redact(res.json(), TOKEN_FIELDS)
+            except ValueError:
+                body = res.text
+
+        entry = {
+            "t": round(started - self.started, 3),
+            "ts": (when or datetime.now()).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "m": method,
+            "ep": urlparse(url).path,
+            "tr": tr_id,
+            "p": params,
+            "b": _redact(_parse_body(data), SECRET_FIELDS),
+            "st": res.status_code if res is not None else None,
+            "ms": round(latency * 1000, 1),
+            "r": body,
+        }
+        if error is not None:
+            entry["err"] = f"{type(error).__name__}: {error}"
+
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+class TrafficReplayer:
+    """
+    [API 트래픽 재생] 녹화한 로그의 응답을 네트워크 없이 순서대로 돌려줍니다.
+    - 같은 (메서드, 경로, tr_id, params, 본문) 요청에는 녹화된 순서대로 다음 응답을 반환
+    - 정확히 같은 요청이 없으면 같은 (메서드, 경로, tr_id)의 다음 응답으로 대체 (코드가 바뀌어 params가 달라진 경우)
+    - 녹화분을 다 쓰면 마지막 응답을 반복
+    - 요청 본문은 녹화할 때와 똑같이 앱키/시크릿을 가린 뒤 비교 (토큰 발급 요청도 정확히 일치)
+    - strict=True면 정확히 일치하지 않는 요청(대체/반복/없음)은 바로 ConnectionError
+      끝난 뒤 clean()이 False면 재생이 녹화와 달랐다는 뜻 (대체/반복/없음 또는 안 쓴 녹화분)
+    - speed: 녹화된 응답 시간을 몇 배 빠르게 흉내낼지 (1 = 실제와 같게, 0 = 대기 없음)
+      KISApi의 호출 한도도 같은 배속으로 늘어납니다 (0이면 한도 없이 코드 실행 시간만 측정)
+    """
+    def __init__(self, path, speed=0, strict=False):
+        self.path = path
+        self.speed = speed
+        self.strict = strict
+        self.entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self.entries.append(json.loads(line))
+
+        self.exact = defaultdict(deque)   # 정확한 요청 키 -> 녹화 순번들
+        self.loose = defaultdict(deque)   # (메서드, 경로, tr_id) -> 녹화 순번들
+        for no, e in enumerate(self.entries):
+            self.exact[_key(e["m"], e["ep"], e["tr"], e["p"], e["b"])].append(no)
+            self.loose[(e["m"], e["ep"], e["tr"])].append(no)
+        self.served = set()
+        self.last = {}                    # (메서드, 경로, tr_id) -> 마지막으로 돌려준 순번
+        self.current = None               # 마지막으로 돌려준 응답의 녹화 시각
+        self.stats = {"exact": 0, "loose": 0, "repeat": 0, "miss": 0}
+        self.lock = threading.Lock()
+        print(f"⏯️ [트래픽 재생] {path} ({len(self.entries):,}건, 배속 {'대기 없음' if not speed else f'x{speed}'})")
+
+    def _next(self, queue):
+        while queue and queue[0] in self.served:
+            queue.popleft()
+        return queue.popleft() if queue else None
+
+    def _pick(self, method, endpoint, tr_id, params, body):
+        loose_key = (method, endpoint, tr_id)
+        with self.lock:
+            no = self._next(self.exact.get(_key(method, endpoint, tr_id, params, body), deque()))
+            kind = "exact"
+            if no is None:
+                no, kind = self._next(self.loose.get(loose_key, deque())), "loose"
+            if no is None:
+                no, kind = self.last.get(loose_key), "repeat"
+            if no is None:
+                self.stats["miss"] += 1
+                return None
+            self.stats[kind] += 1
+            if self.strict and kind != "exact":
+                return None
+            self.served.add(no)
+            self.last[loose_key] = no
+            entry = self.entries[no]
+            self.current = entry["ts"]
+            return entry
+
+    def request(self, method, url, tr_id=None, params=None, data=None):
+        endpoint = urlparse(url).path
+        # 녹화 로그에는 앱키/시크릿이 ***로 저장되어 있으므로 같은 방식으로 가린 뒤 비교
+        body = _redact(_parse_body(data), SECRET_FIELDS)
+        entry = self._pick(method, endpoint, tr_id, params, body)
+        if entry is None:
+            raise requests.ConnectionError(f"재생 로그와 정확히 일치하는 요청이 없음: {method} {endpoint} ({tr_id})")
+
+        if self.speed and entry["ms"]:
+            time.sleep(entry["ms"] / 1000 / self.speed)
+        if entry.get("err"):
+            raise requests.ConnectionError(f"[재생] {entry['err']}")
+
+        res = requests.Response()
+        res.status_code = entry["st"]
+        res.url = url
+        res.encoding = "utf-8"
+        res.headers["Content-Type"] = "application/json; charset=utf-8"
+        body = entry["r"]
+        res._content = (body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)).encode("utf-8")
+        return res
+
+    def now(self):
+        """재생 중인 녹화 시각 (datetime). 아직 돌려준 응답이 없으면 로그의 첫 시각"""
+        ts = self.current or (self.entries[0]["ts"] if self.entries else None)
+        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S.%f") if ts else datetime.now()
+
+    def finished(self):
+        """녹화분을 전부 돌려줬으면 True (main 루프가 재생을 끝내는 기준)"""
+        return len(self.served) == len(self.entries)
+
+    def unused(self):
+        """한 번도 돌려주지 않은 녹화분 (녹화 때는 했는데 재생에서는 안 한 요청)"""
+        with self.lock:
+            return [e for no, e in enumerate(self.entries) if no not in self.served]
+
+    def clean(self):
+        """모든 요청이 정확히 일치했고 녹화분도 전부 썼으면 True"""
+        return (not (self.stats["loose"] or self.stats["repeat"] or self.stats["miss"])
+                and self.finished())
+
+    def summary(self):
+        used = len(self.served)
+        mark = "✅" if self.clean() else "⚠️ 녹화와 다름"
+        return (f"재생 {sum(self.stats.values()):,}건 (정확 일치 {self.stats['exact']:,}, 대체 {self.stats['loose']:,}, "
+                f"반복 {self.stats['repeat']:,}, 없음 {self.stats['miss']:,}) / 녹화분 사용 {used:,}/{len(self.entries):,} {mark}")
+
+class WallClock:
+    """[실시간 시계] main 루프의 현재 시각 / 대기 (실전, 녹화)"""
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+class ReplayClock:
+    """
+    [재생 시계] main 루프가 녹화된 하루를 따라가도록 하는 시계 (KIS_TRAFFIC_MODE=replay)
+    - now(): 재생 중인 녹화 시각(replayer.now())과 지금까지 잔 가상 시각 중 늦은 쪽
+      (장 시작 전 대기처럼 요청이 없는 구간에서도 시각이 흘러감)
+    - sleep(): 가상 시각을 seconds만큼 진행하고, 실제로는 seconds / speed만 대기 (speed 0 = 대기 없음)
+    """
+    def __init__(self, replayer, speed=0):
+        self.replayer = replayer
+        self.speed = speed
+        self.virtual = replayer.now()
+
+    def now(self):
+        self.virtual = max(self.virtual, self.replayer.now())
+        return self.virtual
+
+    def sleep(self, seconds):
+        self.virtual = self.now() + timedelta(seconds=seconds)
+        if self.speed:
+            time.sleep(seconds / self.speed)
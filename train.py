@@ -2,142 +2,151 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
-import pandas as pd
+from torch.utils.data import Dataset, DataLoader, Subset
 import numpy as np
+import os
 import glob
+import time
+import math
 from model import ScalpingLSTM
 from config import DEVICE
+# 피쳐 계산은 실시간(collector)과 같은 구현을 공유 -> 학습/실전 피쳐 일치
+from features import FEATURES, iter_prepared_files
+from corpus import CorpusDataset, CORPUS_DIR
 
 # [설정]
 SEQ_LEN = 10     # 10개를 보고
 PREDICT_LEN = 1  # 1개를 예측
 BATCH_SIZE = 32  # 배치 사이즈 살짝 증가
-EPOCHS = 100     # 학습 횟수 증가
+EPOCHS = 100     # 최대 학습 횟수 (조기 종료/시간 예산으로 더 일찍 끝날 수 있음)
+LEARNING_RATE = 0.001
+VAL_RATIO = 0.2  # 종목별 최근 20% 구간을 검증용으로 떼어둠
+PATIENCE = 10    # 검증 손실이 이만큼 연속으로 안 좋아지면 조기 종료
+TIME_BUDGET_MIN = 60  # 학습 시간 예산(분). 0이면 무제한
+CHECKPOINT_PATH = "checkpoints/train_ckpt.pth"  # 중간 저장 (중단 후 재실행하면 여기서 이어서)
+MODEL_PATH = "scalping_model.pth"
+PREP_WORKERS = os.cpu_count()  # 파일 전처리 프로세스 수 (1이면 단일 프로세스)
+USE_CORPUS = False  # True: data/corpus 메모리맵 사용 (python corpus.py로 먼저 변환)
 
-def add_advanced_features(df):
+class StockDataset(Dataset):
     """
-    [Feature Engineering] 
-    AI가 시장을 더 잘 이해하도록 보조지표 5개를 추가합니다.
-    총 10개 피쳐: [종가, 시가, 고가, 저가, 거래량] + [이격도5, 이격도20, RSI, 변동성, 거래량변화]
+    [학습 데이터셋]
+    샘플을 미리 만들어 두지 않고, 전체 파일을 이어 붙인 float32 배열 1개 + 시작 위치 인덱스만 보관합니다.
+    __getitem__에서 그 배열의 구간(view)을 잘라 반환 -> 샘플당 메모리 복사 없음
+    (파일 경계를 넘는 구간은 시작 위치에서 제외)
     """
-    df = df.copy()
-    
-    # 0. 기본 전처리 (숫자 변환)
-    cols = ['stck_prpr', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'cntg_vol']
-    for col in cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # [중요] 시간 순서 정렬 (과거 -> 미래)
-    # API 데이터는 보통 역순(최신이 위)이므로 뒤집어줘야 함
-    df = df.iloc[::-1].reset_index(drop=True)
-
-    # 1. 이동평균 이격도 (Disparity)
-    # 가격이 평균보다 얼마나 높냐/낮냐 (1.05 = 5% 비쌈)
-    df['ma5'] = df['stck_prpr'].rolling(window=5).mean()
-    df['ma20'] = df['stck_prpr'].rolling(window=20).mean()
-    df['disp5'] = df['stck_prpr'] / (df['ma5'] + 1e-8)
-    df['disp20'] = df['stck_prpr'] / (df['ma20'] + 1e-8)
-
-    # 2. RSI (상대강도지수)
-    delta = df['stck_prpr'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / (loss + 1e-8)
-    df['rsi'] = 100 - (100 / (1 + rs))
-
-    # 3. 로그 수익률 (변동성)
-    df['log_ret'] = np.log(df['stck_prpr'] / df['stck_prpr'].shift(1))
-
-    # 4. 거래량 변화율
-    df['vol_chg'] = df['cntg_vol'] / (df['cntg_vol'].shift(1) + 1e-8)
-
-    # NaN 제거 (지표 계산하느라 앞부분 20개 정도 빔)
-    df = df.dropna().reset_index(drop=True)
-    
-    return df
-
-class StockDataset(Dataset):
-    def __init__(self, file_paths, seq_len=SEQ_LEN):
-        self.samples = []
+    def __init__(self, file_paths, seq_len=SEQ_LEN, workers=PREP_WORKERS):
+        self.seq_len = seq_len
         
         print(f"📂 학습 데이터 로딩 및 피쳐 생성 중... (파일 {len(file_paths)}개)")
         
-        for path in file_paths:
-            try:
-                raw_df = pd.read_csv(path)
-                if len(raw_df) < 30: continue # 데이터 너무 적으면 패스
-
-                # ★ 보조지표 추가 (Feature Engineering)
-                df = add_advanced_features(raw_df)
-                
-                if len(df) < seq_len + 1: continue
-
-                # 사용할 컬럼 10개 선정
-                features = ['stck_prpr', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'cntg_vol', 
-                            'disp5', 'disp20', 'rsi', 'log_ret', 'vol_chg']
-                
-                data = df[features].values
-                
-                # 정규화 (MinMax Scaling 0~1)
-                # 각 컬럼별로 최대/최소 구해서 정규화
-                min_vals = data.min(axis=0)
-                max_vals = data.max(axis=0)
-                
-                # 분모 0 방지
-                ranges = max_vals - min_vals
-                ranges[ranges == 0] = 1e-8
-                
-                scaled_data = (data - min_vals) / ranges
-
-                # 시퀀스 데이터 생성
-                for i in range(len(scaled_data) - seq_len):
-                    x = scaled_data[i : i+seq_len]      # 10일치 데이터 (10개 컬럼)
-                    # 예측 목표: 다음날의 '종가(Close)' (0번째 컬럼)
-                    y = scaled_data[i+seq_len][0]       
-                    
-                    self.samples.append((
-                        torch.FloatTensor(x), 
-                        torch.FloatTensor([y])
-                    ))
-                    
-            except Exception as e:
-                # print(f"⚠️ 에러({path}): {e}")
-                continue
+        # 파일 읽기 + 피쳐 생성 + 정규화를 프로세스 풀에서 병렬로 (결과는 파일 순서 유지)
+        arrays = [arr for _, arr in iter_prepared_files(file_paths, seq_len, workers)]
+        self._build([arr for arr in arrays if arr is not None])
+
+    def _build(self, arrays):
+        # 파일별 배열을 하나로 이어 붙이고, 각 파일 안에서만 시퀀스 시작 위치를 만듦
+        starts = []
+        self.file_counts = np.array([len(arr) - self.seq_len for arr in arrays], dtype=np.int64)
+        offset = 0
+        for arr in arrays:
+            # 10일치(x) + 다음날(y)이 한 파일 안에 있어야 함
+            starts.append(np.arange(offset, offset + len(arr) - self.seq_len, dtype=np.int64))
+            offset += len(arr)
+
+        if arrays:
+            self.data = torch.from_numpy(np.concatenate(arrays))
+            self.starts = np.concatenate(starts)
+        else:
+            self.data = torch.empty((0, len(FEATURES)), dtype=torch.float32)
+            self.starts = np.empty(0, dtype=np.int64)
 
     def __len__(self):
-        return len(self.samples)
+        return len(self.starts)
 
     def __getitem__(self, idx):
-        return self.samples[idx]
-
-def train():
-    print(f"🔥 학습 시작 (Device: {DEVICE})")
-    
-    file_list = glob.glob("data/raw/*.csv")
-    if not file_list:
-        print("❌ 'data/raw' 폴더에 CSV 파일이 없습니다.")
-        return
+        i = int(self.starts[idx])
+        x = self.data[i : i+self.seq_len]       # 10일치 데이터 (10개 컬럼)
+        # 예측 목표: 다음날의 '종가(Close)' (0번째 컬럼)
+        y = self.data[i+self.seq_len, :1]
+        return x, y
 
-    dataset = StockDataset(file_list)
-    if len(dataset) == 0:
-        print("⚠️ 학습 가능한 데이터가 없습니다.")
-        return
-
-    dataloader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True)
-    print(f"✅ 데이터셋 준비 완료! (총 샘플: {len(dataset)}개)")
-
-    # [모델 생성] input_size=10 (피쳐 개수)
-    model = ScalpingLSTM(input_size=10, hidden_size=64, num_layers=2, output_size=1, dropout=0.2).to(DEVICE)
-    
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+def time_split(dataset, val_ratio=VAL_RATIO):
+    """
+    [학습/검증 분리] 종목(파일)마다 뒤쪽(최근) val_ratio 구간을 검증용으로 사용합니다.
+    무작위로 섞어서 나누면 겹치는 구간 때문에 검증 점수가 부풀려지므로 시간 순서로 자르고,
+    경계에서 seq_len개 샘플은 버려서 학습 샘플과 검증 샘플이 같은 봉을 공유하지 않게 합니다.
+    """
+    train_idx, val_idx = [], []
+    first = 0
+    for count in dataset.file_counts:
+        count = int(count)
+        n_val = int(math.ceil(count * val_ratio)) if val_ratio > 0 else 0
+        n_train = count - n_val - dataset.seq_len
+        if n_val > 0 and n_train > 0:
+            train_idx.extend(range(first, first + n_train))
+            val_idx.extend(range(first + count - n_val, first + count))
+        else:
+            train_idx.extend(range(first, first + count)) # 너무 짧은 종목은 전부 학습용
+        first += count
+    return Subset(dataset, train_idx), Subset(dataset, val_idx)
+
+def evaluate(model, dataloader, criterion):
+    """검증 데이터 평균 손실 (데이터가 없으면 None)"""
+    if len(dataloader) == 0:
+        return None
+    model.eval()
+    total_loss = 0
+    with torch.no_grad():
+        for x, y in dataloader:
+            x, y = x.to(DEVICE), y.to(DEVICE)
+            total_loss += criterion(model(x), y).item()
+    model.train()
+    return total_loss / len(dataloader)
+
+def load_checkpoint(path, model, optimizer):
+    """중간 저장이 있으면 모델/옵티마이저를 복구하고 이어서 학습할 상태를 반환"""
+    if not path or not os.path.exists(path):
+        return None
+    ckpt = torch.load(path, map_location=DEVICE)
+    model.load_state_dict(ckpt['model'])
+    optimizer.load_state_dict(ckpt['optimizer'])
+    print(f"♻️ 체크포인트에서 이어서 학습합니다: {path} (Epoch {ckpt['epoch']} 완료 상태)")
+    return ckpt
+
+def save_checkpoint(path, state):
+    # 임시 파일에 쓰고 교체 -> 저장 도중 꺼져도 기존 체크포인트는 멀쩡함
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def fit(model, train_loader, val_loader, lr=LEARNING_RATE, epochs=EPOCHS, patience=PATIENCE,
+        time_budget_sec=TIME_BUDGET_MIN * 60, checkpoint_path=None, log_every=10):
+    """
+    [학습 루프]
+    - 매 Epoch 검증 손실을 재고, 가장 좋았던 가중치를 기억 (끝나면 그 가중치로 되돌림)
+    - patience번 연속 개선이 없거나 시간 예산을 넘기면 조기 종료
+    - checkpoint_path가 있으면 매 Epoch 저장하고, 다음 실행 때 이어서 학습
+    결과 요약(dict)을 반환합니다.
+    """
+    optimizer = optim.Adam(model.parameters(), lr=lr)
     criterion = nn.MSELoss()
 
+    start_epoch, best_loss, best_state, bad_epochs, elapsed_before = 0, float("inf"), None, 0, 0.0
+    ckpt = load_checkpoint(checkpoint_path, model, optimizer)
+    if ckpt is not None:
+        start_epoch = ckpt['epoch']
+        best_loss, best_state = ckpt['best_loss'], ckpt['best_state']
+        bad_epochs, elapsed_before = ckpt['bad_epochs'], ckpt['elapsed']
+
     model.train()
-    
-    for epoch in range(EPOCHS):
+    started = time.perf_counter()
+    stop_reason = "max_epochs"
+    epochs_done = start_epoch
+
+    for epoch in range(start_epoch, epochs):
         total_loss = 0
-        for x, y in dataloader:
+        for x, y in train_loader:
             x, y = x.to(DEVICE), y.to(DEVICE)
             
             optimizer.zero_grad()
@@ -148,13 +157,85 @@ def train():
             optimizer.step()
             
             total_loss += loss.item()
-            
-        if (epoch+1) % 10 == 0:
-            avg_loss = total_loss / len(dataloader)
-            print(f"Epoch [{epoch+1}/{EPOCHS}] Loss: {avg_loss:.6f}")
 
-    torch.save(model.state_dict(), "scalping_model.pth")
-    print("🎉 학습 완료! 모델 저장됨: scalping_model.pth")
+        epochs_done = epoch + 1
+        train_loss = total_loss / max(len(train_loader), 1)
+        val_loss = evaluate(model, val_loader, criterion)
+        # 검증 데이터가 없으면 학습 손실 기준
+        score = val_loss if val_loss is not None else train_loss
+
+        if score < best_loss:
+            best_loss = score
+            best_state = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+            bad_epochs = 0
+        else:
+            bad_epochs += 1
+
+        elapsed = elapsed_before + time.perf_counter() - started
+        if epochs_done % log_every == 0:
+            val_text = f"{val_loss:.6f}" if val_loss is not None else "-"
+            print(f"Epoch [{epochs_done}/{epochs}] Loss: {train_loss:.6f} | Val: {val_text} | Best: {best_loss:.6f} ({elapsed:.0f}초)")
+
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, {
+                'epoch': epochs_done, 'model': model.state_dict(), 'optimizer': optimizer.state_dict(),
+                'best_loss': best_loss, 'best_state': best_state, 'bad_epochs': bad_epochs, 'elapsed': elapsed
+            })
+
+        if patience and bad_epochs >= patience:
+            stop_reason = "early_stop"
+            print(f"⏹️ 조기 종료: 검증 손실이 {patience} Epoch 연속 개선되지 않았습니다. (Epoch {epochs_done})")
+            break
+        if time_budget_sec and elapsed >= time_budget_sec:
+            stop_reason = "time_budget"
+            print(f"⏱️ 시간 예산 {time_budget_sec:.0f}초 소진 -> 학습 종료 (Epoch {epochs_done})")
+            break
+
+    if best_state is not None:
+        model.load_state_dict(best_state)
+
+    return {
+        'best_loss': best_loss,
+        'epochs': epochs_done,
+        'stop_reason': stop_reason,
+        'train_time': elapsed_before + time.perf_counter() - started
+    }
+
+def train():
+    print(f"🔥 학습 시작 (Device: {DEVICE})")
+    
+    if USE_CORPUS:
+        # 변환해 둔 메모리맵 코퍼스에서 필요한 구간만 읽으며 학습 (전체를 메모리에 올리지 않음)
+        if not os.path.exists(os.path.join(CORPUS_DIR, "meta.json")):
+            print(f"❌ '{CORPUS_DIR}' 코퍼스가 없습니다. 'python corpus.py'로 먼저 변환하세요.")
+            return
+        dataset = CorpusDataset(CORPUS_DIR, seq_len=SEQ_LEN)
+    else:
+        file_list = glob.glob("data/raw/*.csv")
+        if not file_list:
+            print("❌ 'data/raw' 폴더에 CSV 파일이 없습니다.")
+            return
+
+        dataset = StockDataset(sorted(file_list))
+    if len(dataset) == 0:
+        print("⚠️ 학습 가능한 데이터가 없습니다.")
+        return
+
+    train_set, val_set = time_split(dataset)
+    train_loader = DataLoader(train_set, batch_size=BATCH_SIZE, shuffle=True)
+    val_loader = DataLoader(val_set, batch_size=BATCH_SIZE * 4, shuffle=False)
+    print(f"✅ 데이터셋 준비 완료! (총 샘플: {len(dataset)}개 = 학습 {len(train_set)} / 검증 {len(val_set)})")
+
+    # [모델 생성] input_size=10 (피쳐 개수)
+    model = ScalpingLSTM(input_size=10, hidden_size=64, num_layers=2, output_size=1, dropout=0.2).to(DEVICE)
+
+    result = fit(model, train_loader, val_loader, checkpoint_path=CHECKPOINT_PATH)
+
+    torch.save(model.state_dict(), MODEL_PATH)
+    # 정상 종료했으면 중간 저장 삭제 (다음 학습은 새 데이터로 처음부터)
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    print(f"🎉 학습 완료! 모델 저장됨: {MODEL_PATH} (최고 검증 손실 {result['best_loss']:.6f}, {result['epochs']} Epoch, {result['stop_reason']})")
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    train()
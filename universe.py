@@ -0,0 +1,96 @@
+# universe.py
+import time
+import threading
+from config import UNIVERSE_REFRESH_SEC, UNIVERSE_WAIT_SEC
+
+class UniverseSnapshot:
+    """
+    [감시 종목 스냅샷] 한 시점의 감시 대상 목록 (읽기 전용으로 사용)
+    - version: 종목 구성이 바뀔 때마다 1씩 증가 (0 = 아직 한 번도 조회 못 함)
+    - symbols: 종목코드 튜플 (get_top_100이 돌려준 순서 그대로)
+    - added / removed: 직전 버전 대비 들어온 / 빠진 종목
+    """
+    def __init__(self, version, symbols, added=(), removed=()):
+        self.version = version
+        self.symbols = tuple(symbols)
+        self.added = tuple(added)
+        self.removed = tuple(removed)
+        self.refreshed_at = time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.refreshed_at
+
+class UniverseRefresher:
+    """
+    [감시 종목 백그라운드 갱신기]
+    api.get_top_100() (랭킹 API 2~3회 + 잡주 필터)을 메인 루프 대신 별도 스레드에서 refresh_sec마다 실행합니다.
+    메인 루프는 get()으로 최신 스냅샷을 기다림 없이 읽기만 합니다. (참조 교체 방식 -> 읽는 쪽 잠금 불필요)
+    종목 구성이 바뀌면 버전을 올리고 들어온/빠진 종목을 출력합니다.
+    """
+    def __init__(self, api, refresh_sec=UNIVERSE_REFRESH_SEC):
+        self.api = api
+        self.refresh_sec = refresh_sec
+        self.snapshot = UniverseSnapshot(0, ())
+        self.ready = threading.Event()    # 첫 조회 완료
+        self.waited = False               # 첫 조회를 한 번 기다렸는지 (이후로는 기다리지 않음)
+        self.wake = threading.Event()     # 즉시 갱신 요청 / 종료
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="universe", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def request_refresh(self):
+        """다음 주기를 기다리지 않고 바로 갱신"""
+        self.wake.set()
+
+    def get(self, wait=UNIVERSE_WAIT_SEC):
+        """
+        최신 스냅샷. 첫 조회가 아직이면 처음 한 번만 최대 wait초까지 기다림 (그래도 없으면 version 0 빈 목록)
+        조회가 계속 실패해도 이후 호출은 기다리지 않고 바로 반환 (매 틱 멈추지 않도록)
+        """
+        if not self.ready.is_set() and not self.waited:
+            self.waited = True
+            self.ready.wait(wait)
+        return self.snapshot
+
+    def refresh(self):
+        """랭킹을 다시 조회해 스냅샷을 교체합니다. 종목 구성이 바뀌었으면 True"""
+        symbols = self.api.get_top_100()
+        if not symbols:
+            print("   ⚠️ [감시 종목] 조회 결과가 비어 있어 기존 목록을 유지합니다.")
+            return False
+
+        prev = self.snapshot
+        # 스캔 순서 = 새 랭킹 순서 그대로 (방금 편입된 종목도 TOP_N 안에 들 수 있도록)
+        fresh = list(dict.fromkeys(symbols))
+        fresh_set, prev_set = set(fresh), set(prev.symbols)
+        # 들어온/빠진 종목은 로그용으로만 계산
+        added = [sym for sym in fresh if sym not in prev_set]
+        removed = [sym for sym in prev.symbols if sym not in fresh_set]
+
+        changed = bool(added or removed)
+        self.snapshot = UniverseSnapshot(prev.version + 1 if changed else prev.version, fresh,
+                                         added if changed else (), removed if changed else ())
+        self.ready.set()
+        if changed and prev.version > 0:
+            print(f"\n🔄 [감시 종목 v{self.snapshot.version}] +{len(added)} / -{len(removed)} "
+                  f"(편입: {', '.join(added[:10]) or '-'} / 제외: {', '.join(removed[:10]) or '-'})")
+        return changed
+
+    def _run(self):
+        while self.running:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"   ⚠️ [감시 종목] 갱신 실패: {e}")
+            self.wake.wait(self.refresh_sec)
+            self.wake.clear()